@@ -1,7 +1,15 @@
+import contextlib
+import math
+import os
+import sqlite3
 import sys
+import time
+import weakref
 
 from helpers.DRBG_status import DRBGStatus
-from helpers.DRBG_states import DRBGHealthState
+from helpers.DRBG_states import DRBGHealthState, DRBGOutputBuffer
+from helpers.general_helpers import leftmost
+from helpers.reseed_scheduler import ReseedScheduler
 
 from helpers.entropy_source import get_entropy_input, get_nonce
 
@@ -11,6 +19,11 @@ class DRBG:
 
     __supported_prediction_resistance = True
     __states = dict()
+    __buffers = dict()
+    __state_owners = weakref.WeakValueDictionary()
+    __forked_states = dict()
+    __instances = weakref.WeakSet()
+    __reseed_scheduler = None
 
     def __init__(self, DRBG_type, highest_supported_security_strength, max_personalization_string_length,
                  max_additional_input_length, max_number_of_bits_per_request, min_length, max_length):
@@ -42,6 +55,8 @@ class DRBG:
         self._min_length = min_length
         self._max_length = max_length
         self.__health_state = DRBGHealthState(self)
+        self.__test_vectors = dict()
+        self.__instances.add(self)
         self.health_test()
 
     def get_type(self):
@@ -54,6 +69,15 @@ class DRBG:
 
         return self._highest_supported_security_strength
 
+    def get_prediction_resistance_flag(self, state_handle):
+        """Returns the prediction resistance flag of an instantiation, or None if it is not instantiated."""
+
+        with self.__lock_state(state_handle):
+            working_state = self.__load_state(state_handle)
+        if working_state is None:
+            return None
+        return working_state.prediction_resistance_flag
+
     def instantiate(self, requested_instantiation_security_strength=None, prediction_resistance_flag=None,
                     personalization_string=None):
         """Instantiates a state of this DRBG.
@@ -78,26 +102,11 @@ class DRBG:
         if self.has_catastrophic_error():
             return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None
 
-        if requested_instantiation_security_strength is None:
-            requested_instantiation_security_strength = self._highest_supported_security_strength
-        elif requested_instantiation_security_strength > self._highest_supported_security_strength:
-            return DRBGStatus.ERROR_FLAG, None
-
-        if prediction_resistance_flag is None:
-            prediction_resistance_flag = self.__supported_prediction_resistance
-        elif prediction_resistance_flag and not self.__supported_prediction_resistance:
-            return DRBGStatus.ERROR_FLAG, None
-
-        if personalization_string is None:
-            personalization_string = bytes(0)
-        elif len(personalization_string) * 8 > self._max_personalization_string_length:
-            return DRBGStatus.ERROR_FLAG, None
-
-        security_strength = requested_instantiation_security_strength
-        for ss in [112, 128, 192, 256]:
-            if ss >= requested_instantiation_security_strength:
-                security_strength = ss
-                break
+        status, security_strength, prediction_resistance_flag, personalization_string = \
+            self.__instantiation_parameters(requested_instantiation_security_strength, prediction_resistance_flag,
+                                            personalization_string)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
 
         status, entropy_input = get_entropy_input(security_strength, self._min_length, self._max_length,
                                                   prediction_resistance_flag)
@@ -106,6 +115,8 @@ class DRBG:
             return status, None
 
         nonce = get_nonce(security_strength)
+        if nonce is None:
+            return DRBGStatus.ERROR_FLAG, None
 
         status, state = self._instantiate_algorithm(entropy_input, nonce, personalization_string, security_strength,
                                                     prediction_resistance_flag)
@@ -118,6 +129,97 @@ class DRBG:
             return DRBGStatus.ERROR_FLAG, None
         return DRBGStatus.SUCCESS, state_handle
 
+    def instantiate_many(self, n, requested_instantiation_security_strength=None, prediction_resistance_flag=None,
+                         personalization_string=None):
+        """Instantiates n states of this DRBG with the same parameters. The entropy inputs and nonces of all states
+            are requested from the entropy source at once, and the handles are allocated in a single pass.
+
+        Parameters
+        ----------
+        n : int
+            The number of states to instantiate.
+        requested_instantiation_security_strength : int
+            The requested security strength for the instantiations.
+        prediction_resistance_flag : bool
+            A flag used to request prediction resistance for the instantiations.
+        personalization_string : bytes, optional
+            Optional bitstring used to personalize every instantiation.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state_handles : list
+            The handles for the newly instantiated states. Might be None.
+        """
+
+        if self.has_catastrophic_error():
+            return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None
+
+        if n <= 0:
+            return DRBGStatus.ERROR_FLAG, None
+
+        status, security_strength, prediction_resistance_flag, personalization_string = \
+            self.__instantiation_parameters(requested_instantiation_security_strength, prediction_resistance_flag,
+                                            personalization_string)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        entropy_bytes = math.ceil(max(security_strength, self._min_length) / 8)
+        status, entropy_inputs = get_entropy_input(n * entropy_bytes * 8, n * entropy_bytes * 8, n * self._max_length,
+                                                   prediction_resistance_flag)
+
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        nonce_bytes = math.ceil(security_strength / 16)
+        nonces = get_nonce(n * nonce_bytes * 16)
+        if nonces is None:
+            return DRBGStatus.ERROR_FLAG, None
+
+        states = []
+        for i in range(n):
+            status, state = self._instantiate_algorithm(entropy_inputs[i * entropy_bytes:(i + 1) * entropy_bytes],
+                                                        nonces[i * nonce_bytes:(i + 1) * nonce_bytes],
+                                                        personalization_string, security_strength,
+                                                        prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status, None
+            states.append(state)
+
+        state_handles = self.__save_states(states)
+        if state_handles is None:
+            return DRBGStatus.ERROR_FLAG, None
+        return DRBGStatus.SUCCESS, state_handles
+
+    def __instantiation_parameters(self, requested_instantiation_security_strength, prediction_resistance_flag,
+                                   personalization_string):
+        """Validates the parameters of an instantiate request and returns the security strength, prediction
+            resistance flag and personalization string of the instantiation."""
+
+        if requested_instantiation_security_strength is None:
+            requested_instantiation_security_strength = self._highest_supported_security_strength
+        elif requested_instantiation_security_strength > self._highest_supported_security_strength:
+            return DRBGStatus.ERROR_FLAG, None, None, None
+
+        if prediction_resistance_flag is None:
+            prediction_resistance_flag = self.__supported_prediction_resistance
+        elif prediction_resistance_flag and not self.__supported_prediction_resistance:
+            return DRBGStatus.ERROR_FLAG, None, None, None
+
+        if personalization_string is None:
+            personalization_string = bytes(0)
+        elif len(personalization_string) * 8 > self._max_personalization_string_length:
+            return DRBGStatus.ERROR_FLAG, None, None, None
+
+        security_strength = requested_instantiation_security_strength
+        for ss in [112, 128, 192, 256]:
+            if ss >= requested_instantiation_security_strength:
+                security_strength = ss
+                break
+
+        return DRBGStatus.SUCCESS, security_strength, prediction_resistance_flag, personalization_string
+
     def reseed(self, state_handle, prediction_resistance_request=None, additional_input=None):
         """Reseeds a given instantiated state of this DRBG.
 
@@ -139,6 +241,17 @@ class DRBG:
         if self.has_catastrophic_error():
             return DRBGStatus.CATASTROPHIC_ERROR_FLAG
 
+        if self.__forked_states:
+            status = self.__rekey_forked_state(state_handle)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+        with self.__lock_state(state_handle):
+            return self.__reseed(state_handle, prediction_resistance_request, additional_input)
+
+    def __reseed(self, state_handle, prediction_resistance_request, additional_input):
+        """Reseeds an instantiation while its state is locked."""
+
         working_state = self.__load_state(state_handle)
         if working_state is None:
             return DRBGStatus.ERROR_FLAG
@@ -164,11 +277,13 @@ class DRBG:
             return status
 
         self.__save_state(new_working_state, state_handle)
+        self.__invalidate_buffer(state_handle)
         return DRBGStatus.SUCCESS
 
     def generate(self, state_handle, requested_number_of_bits, requested_security_strength=None,
                  prediction_resistance_request=None, additional_input=None):
-        """Generates pseudo-random bits using an instantiation.
+        """Generates pseudo-random bits using an instantiation. If buffering is enabled for the instantiation,
+            requests without prediction resistance or additional input are served from its output buffer.
 
         Parameters
         ----------
@@ -194,6 +309,20 @@ class DRBG:
         if self.has_catastrophic_error():
             return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None
 
+        if self.__forked_states:
+            status = self.__rekey_forked_state(state_handle)
+            if status != DRBGStatus.SUCCESS:
+                return status, None
+
+        with self.__lock_state(state_handle):
+            return self.__generate_request(state_handle, requested_number_of_bits, requested_security_strength,
+                                           prediction_resistance_request, additional_input)
+
+    def __generate_request(self, state_handle, requested_number_of_bits, requested_security_strength,
+                           prediction_resistance_request, additional_input):
+        """Validates and serves a generate request while the state of the instantiation is locked."""
+
+        start = time.perf_counter()
         working_state = self.__load_state(state_handle)
         if working_state is None:
             return DRBGStatus.ERROR_FLAG, None
@@ -216,16 +345,138 @@ class DRBG:
         elif prediction_resistance_request and not working_state.prediction_resistance_flag:
             return DRBGStatus.ERROR_FLAG, None
 
+        output_buffer = self.__table_buffers().get(state_handle)
+        if output_buffer is not None:
+            if prediction_resistance_request or len(additional_input) > 0 or \
+                    requested_number_of_bits > output_buffer.size * 8:
+                output_buffer.invalidate()
+            else:
+                requested_bytes = math.ceil(requested_number_of_bits / 8)
+                if output_buffer.available() < requested_bytes:
+                    status, pseudorandom_bits = self.__generate(state_handle, working_state, output_buffer.size * 8,
+                                                                False, additional_input)
+                    if status != DRBGStatus.SUCCESS:
+                        return status, None
+                    self.__health_state.increment_generate_counter(1, output_buffer.size * 8,
+                                                                   time.perf_counter() - start)
+                    output_buffer.fill(pseudorandom_bits)
+
+                return DRBGStatus.SUCCESS, leftmost(output_buffer.read(requested_bytes), requested_number_of_bits)
+
+        status, pseudorandom_bits = self.__generate(state_handle, working_state, requested_number_of_bits,
+                                                    prediction_resistance_request, additional_input)
+        if status == DRBGStatus.SUCCESS:
+            self.__health_state.increment_generate_counter(1, requested_number_of_bits, time.perf_counter() - start)
+        return status, pseudorandom_bits
+
+    def generate_many(self, state_handles, requested_number_of_bits, prediction_resistance_request=None,
+                      additional_input=None):
+        """Generates the same number of pseudo-random bits using each of several instantiations. The request is
+            validated once for the whole batch, and the health test counter is advanced once by the batch size.
+            Output buffers of the instantiations are bypassed but kept. If a request fails, the instantiations
+            served before it keep their advanced states.
+
+        Parameters
+        ----------
+        state_handles : list
+            The handles for the instantiated states used for bit generation.
+        requested_number_of_bits : int
+            The number of pseudo-random bits to generate with each instantiation.
+        prediction_resistance_request: bool
+            A flag used to request prediction resistance.
+        additional_input : bytes, optional
+            Optional bitstring used to personalize the bit generation.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        pseudorandom_bits : bytes
+            The generated pseudo-random bits of all instantiations, concatenated in the order of the handles.
+            Might be None.
+        offsets : list
+            The offset in bytes of the output of each instantiation. Might be None.
+        """
+
+        start = time.perf_counter()
+        if self.has_catastrophic_error():
+            return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None, None
+
+        if requested_number_of_bits > self._max_number_of_bits_per_request or requested_number_of_bits <= 0:
+            return DRBGStatus.ERROR_FLAG, None, None
+
+        if additional_input is None:
+            additional_input = bytes(0)
+        elif len(additional_input) * 8 > self._max_additional_input_length:
+            return DRBGStatus.ERROR_FLAG, None, None
+
+        stride = math.ceil(requested_number_of_bits / 8)
+        offsets = [i * stride for i in range(len(state_handles))]
+        outputs = []
+
+        if type(self).generate is not DRBG.generate:
+            for state_handle in state_handles:
+                status, pseudorandom_bits = self.generate(state_handle, requested_number_of_bits,
+                                                          prediction_resistance_request=prediction_resistance_request,
+                                                          additional_input=additional_input)
+                if status != DRBGStatus.SUCCESS:
+                    return status, None, None
+                outputs.append(pseudorandom_bits)
+            return DRBGStatus.SUCCESS, b''.join(outputs), offsets
+
+        for state_handle in state_handles:
+            if self.__forked_states:
+                status = self.__rekey_forked_state(state_handle)
+                if status != DRBGStatus.SUCCESS:
+                    return status, None, None
+
+            with self.__lock_state(state_handle):
+                working_state = self.__load_state(state_handle)
+                if working_state is None:
+                    return DRBGStatus.ERROR_FLAG, None, None
+
+                if prediction_resistance_request is None:
+                    state_prediction_resistance = working_state.prediction_resistance_flag
+                elif prediction_resistance_request and not working_state.prediction_resistance_flag:
+                    return DRBGStatus.ERROR_FLAG, None, None
+                else:
+                    state_prediction_resistance = prediction_resistance_request
+
+                status, pseudorandom_bits = self.__generate(state_handle, working_state, requested_number_of_bits,
+                                                            state_prediction_resistance, additional_input)
+            if status != DRBGStatus.SUCCESS:
+                return status, None, None
+            outputs.append(pseudorandom_bits)
+
+        self.__health_state.increment_generate_counter(len(state_handles),
+                                                       len(state_handles) * requested_number_of_bits,
+                                                       time.perf_counter() - start)
+        return DRBGStatus.SUCCESS, b''.join(outputs), offsets
+
+    def __generate(self, state_handle, working_state, requested_number_of_bits, prediction_resistance_request,
+                   additional_input):
+        """Runs the generate algorithm on a validated request, reseeding the instantiation when required."""
+
         reseed_required_flag = False
         while True:
             if reseed_required_flag or prediction_resistance_request:
-                status = self.reseed(state_handle, prediction_resistance_request, additional_input)
-                if status != DRBGStatus.SUCCESS:
-                    return status, None
+                previous_state = working_state
+                prepared_state = None
+                if self.__reseed_scheduler is not None and len(additional_input) == 0:
+                    prepared_state = self.__reseed_scheduler.take(state_handle, working_state)
+
+                if prepared_state is not None:
+                    self.__save_state(prepared_state, state_handle)
+                    self.__invalidate_buffer(state_handle)
+                else:
+                    status = self.reseed(state_handle, prediction_resistance_request, additional_input)
+                    if status != DRBGStatus.SUCCESS:
+                        return status, None
 
                 working_state = self.__load_state(state_handle)
                 if working_state is None:
                     return DRBGStatus.ERROR_FLAG, None
+                working_state = self._generate_reseed_state(previous_state, working_state)
 
                 additional_input = bytes(0)
                 reseed_required_flag = False
@@ -244,7 +495,8 @@ class DRBG:
                 break
 
         self.__save_state(new_working_state, state_handle)
-        self.__health_state.increment_generate_counter()
+        if self.__reseed_scheduler is not None:
+            self.__reseed_scheduler.prepare(state_handle, new_working_state)
         return DRBGStatus.SUCCESS, pseudorandom_bits
 
     def uninstantiate(self, state_handle):
@@ -261,27 +513,303 @@ class DRBG:
             One of the defined DRBG status flags.
         """
 
-        if state_handle not in self.__states.keys():
+        with self.__lock_state(state_handle):
+            if state_handle not in self.__states:
+                return DRBGStatus.ERROR_FLAG
+            del self.__states[state_handle]
+            if isinstance(self.__states, dict):
+                self.__state_owners.pop(state_handle, None)
+
+        self.__invalidate_buffer(state_handle)
+        self.__table_buffers().pop(state_handle, None)
+        if self.__reseed_scheduler is not None:
+            self.__reseed_scheduler.discard(state_handle)
+        if self.__forked_states:
+            self.__forked_states.get(id(self.__states), set()).discard(state_handle)
+        return DRBGStatus.SUCCESS
+
+    def spawn(self, state_handle, n, personalization_string=None):
+        """Derives n child instantiations from an instantiated state without requesting new entropy. A single
+            generate request on the parent provides the seed material of all children, and each child is instantiated
+            with its index prepended to the personalization string, so the children produce independent streams.
+            The children inherit the security strength and prediction resistance flag of the parent.
+
+        Parameters
+        ----------
+        state_handle : int
+            A handle for the instantiated parent state.
+        n : int
+            The number of child instantiations to derive.
+        personalization_string : bytes, optional
+            Optional bitstring used to personalize all child instantiations.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state_handles : list
+            The handles of the child instantiations. Might be None.
+        """
+
+        if self.has_catastrophic_error():
+            return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None
+
+        parent_state = self.__load_state(state_handle)
+        if parent_state is None or n <= 0:
+            return DRBGStatus.ERROR_FLAG, None
+
+        if personalization_string is None:
+            personalization_string = bytes(0)
+        if (len(personalization_string) + 8) * 8 > self._max_personalization_string_length:
+            return DRBGStatus.ERROR_FLAG, None
+
+        security_strength = parent_state.security_strength
+        entropy_bytes = math.ceil(max(security_strength, self._min_length) / 8)
+        nonce_bytes = math.ceil(security_strength / 16)
+        status, seed_material = self.generate(state_handle, (entropy_bytes + nonce_bytes) * 8)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        entropy_input, nonce = seed_material[:entropy_bytes], seed_material[entropy_bytes:]
+        states = []
+        for i in range(n):
+            status, state = self._instantiate_algorithm(entropy_input, nonce,
+                                                        b''.join([i.to_bytes(8, 'big'), personalization_string]),
+                                                        security_strength, parent_state.prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status, None
+            states.append(state)
+
+        state_handles = self.__save_states(states)
+        if state_handles is None:
+            return DRBGStatus.ERROR_FLAG, None
+        return DRBGStatus.SUCCESS, state_handles
+
+    def __rekey_forked_state(self, state_handle):
+        """Reseeds a state inherited from the parent process on its first use after a fork, so the child does not
+            continue the stream of the parent."""
+
+        forked_states = self.__forked_states.get(id(self.__states))
+        if forked_states is None or state_handle not in forked_states:
+            return DRBGStatus.SUCCESS
+
+        forked_states.discard(state_handle)
+        return self.reseed(state_handle, False, b''.join([b'fork', os.getpid().to_bytes(8, 'big')]))
+
+    def enable_buffer(self, state_handle, buffer_bits=2**16):
+        """Enables read-ahead buffering for an instantiation. Requests without prediction resistance or additional
+            input are then served from a buffer refilled by a single generate request of buffer_bits bits. Any request
+            not served from the buffer, as well as a reseed or uninstantiate, discards the buffered output.
+
+        Parameters
+        ----------
+        state_handle : int
+            A handle for the instantiation to buffer.
+        buffer_bits : int
+            The number of bits generated by each buffer refill. Must be a multiple of 8.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        """
+
+        if state_handle not in self.__states:
+            return DRBGStatus.ERROR_FLAG
+
+        if buffer_bits % 8 != 0 or buffer_bits > self._max_number_of_bits_per_request or buffer_bits <= 0:
             return DRBGStatus.ERROR_FLAG
-        del self.__states[state_handle]
+
+        self.__invalidate_buffer(state_handle)
+        self.__table_buffers(create=True)[state_handle] = DRBGOutputBuffer(buffer_bits // 8)
         return DRBGStatus.SUCCESS
 
+    def disable_buffer(self, state_handle):
+        """Disables read-ahead buffering for an instantiation and discards its buffered output."""
+
+        table_buffers = self.__table_buffers()
+        if state_handle not in table_buffers.keys():
+            return DRBGStatus.ERROR_FLAG
+        self.__invalidate_buffer(state_handle)
+        del table_buffers[state_handle]
+        return DRBGStatus.SUCCESS
+
+    def flush_buffer(self, state_handle):
+        """Discards the buffered output of an instantiation, so the next request is generated from its state."""
+
+        if state_handle not in self.__table_buffers().keys():
+            return DRBGStatus.ERROR_FLAG
+        self.__invalidate_buffer(state_handle)
+        return DRBGStatus.SUCCESS
+
+    def __invalidate_buffer(self, state_handle):
+        """Discards the buffered output of an instantiation if it has a buffer."""
+
+        output_buffer = self.__table_buffers().get(state_handle)
+        if output_buffer is not None:
+            output_buffer.invalidate()
+
+    def __table_buffers(self, create=False):
+        """Returns the output buffers of the instantiations in the state table of this instance, indexed by handle.
+            Buffers are kept per table, as instances with their own state stores use the same handle numbers. The
+            buffers of a state store are dropped when it is garbage collected, so a later table reusing its id does not
+            inherit them."""
+
+        table_buffers = self.__buffers.get(id(self.__states))
+        if table_buffers is None:
+            table_buffers = dict()
+            if create:
+                self.__buffers[id(self.__states)] = table_buffers
+                if not isinstance(self.__states, dict):
+                    weakref.finalize(self.__states, self.__buffers.pop, id(self.__states), None)
+        return table_buffers
+
+    def enable_reseed_scheduler(self, reseed_lead=2**10):
+        """Enables background preparation of reseeds for this DRBG instance. Reseeds required by prediction
+            resistance or by the reseed interval then only swap in a state prepared after the previous request, if
+            one is ready. See ReseedScheduler.
+
+        Parameters
+        ----------
+        reseed_lead : int
+            The number of requests before the reseed interval from which reseeds are prepared.
+        """
+
+        self.disable_reseed_scheduler()
+        self.__reseed_scheduler = ReseedScheduler(self, reseed_lead)
+
+    def disable_reseed_scheduler(self):
+        """Disables background preparation of reseeds and discards all prepared reseeds."""
+
+        if self.__reseed_scheduler is not None:
+            self.__reseed_scheduler.shutdown()
+        self.__reseed_scheduler = None
+
+    def set_state_store(self, state_store):
+        """Replaces the in-process state table of this DRBG instance with a state store, such as
+            a MappedHashStateStore or SharedHashStateStore. Instantiations saved in the previous table are no longer
+            accessible, and the output buffered from them is discarded."""
+
+        for output_buffer in self.__table_buffers().values():
+            output_buffer.invalidate()
+        self.__states = state_store
+
+    def __lock_state(self, state_handle):
+        """Returns the lock of a state in a state store shared between processes. States in the in-process table
+            need no locking."""
+
+        if isinstance(self.__states, dict) or not isinstance(state_handle, int):
+            return contextlib.nullcontext()
+        return self.__states.lock(state_handle)
+
+    def _export_states(self, state_handles):
+        """Returns the saved states of the given handles, or of all handles if None is given, indexed by handle. Only
+            states owned by this instance are returned, i.e. the states of its state store, or the states of the
+            in-process table instantiated, spawned or imported by it."""
+
+        if state_handles is None:
+            state_handles = self.__states.keys()
+        return {state_handle: self.__states[state_handle] for state_handle in state_handles
+                if state_handle in self.__states and self.__owns_state(state_handle)}
+
+    def __owns_state(self, state_handle):
+        """Returns whether a saved state is owned by this instance. The in-process table is shared by all instances,
+            so its states are owned by the instance that saved them, while a state store belongs to its instance."""
+
+        if not isinstance(self.__states, dict):
+            return True
+        return self.__state_owners.get(state_handle) is self
+
+    def __claim_states(self, state_handles):
+        """Records this instance as the owner of newly saved states of the in-process table."""
+
+        if isinstance(self.__states, dict):
+            for state_handle in state_handles:
+                self.__state_owners[state_handle] = self
+
+    def _import_states(self, states):
+        """Saves the given states under their handles, or under new handles where their handles are in use. Fails
+            without saving any state if the table cannot hold all of them.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state_handles : list
+            The handles of the saved states, in the order of the given states. Might be None.
+        """
+
+        kept_handles = [state_handle for state_handle in states.keys() if state_handle not in self.__states]
+        remapped = [state_handle for state_handle in states.keys() if state_handle in self.__states]
+        for state_handle in kept_handles:
+            self.__states[state_handle] = states[state_handle]
+        self.__claim_states(kept_handles)
+
+        new_handles = self.__save_states([states[state_handle] for state_handle in remapped])
+        if new_handles is None:
+            for state_handle in kept_handles:
+                del self.__states[state_handle]
+                if isinstance(self.__states, dict):
+                    self.__state_owners.pop(state_handle, None)
+            return DRBGStatus.ERROR_FLAG, None
+
+        handle_map = dict(zip(remapped, new_handles))
+        state_handles = [handle_map.get(state_handle, state_handle) for state_handle in states.keys()]
+        forked_states = self.__forked_states.get(id(self.__states), set())
+        for state_handle in state_handles:
+            forked_states.discard(state_handle)
+        return DRBGStatus.SUCCESS, state_handles
+
     def __save_state(self, state, state_handle=None):
         """Saves an instantiation of this DRBG and returns its handle. The handle will be generated if not provided."""
 
         if state_handle is None:
+            if not isinstance(self.__states, dict):
+                state_handle = self.__states.free_handle()
+                if state_handle is not None:
+                    self.__states[state_handle] = state
+                return state_handle
+
             for i in range(sys.maxsize):
-                if i not in self.__states.keys():
+                if i not in self.__states:
                     self.__states[i] = state
+                    self.__claim_states([i])
                     return i
         else:
             self.__states[state_handle] = state
             return state_handle
 
+    def __save_states(self, states):
+        """Saves new instantiations of this DRBG and returns their handles, allocated in a single pass over the
+            table. No state is saved if the table cannot hold all of them."""
+
+        if not isinstance(self.__states, dict):
+            state_handles = []
+            for state in states:
+                state_handle = self.__save_state(state)
+                if state_handle is None:
+                    for state_handle in state_handles:
+                        del self.__states[state_handle]
+                    return None
+                state_handles.append(state_handle)
+            return state_handles
+
+        state_handles = []
+        i = 0
+        while len(state_handles) < len(states):
+            if i not in self.__states:
+                state_handles.append(i)
+            i += 1
+
+        for state_handle, state in zip(state_handles, states):
+            self.__states[state_handle] = state
+        self.__claim_states(state_handles)
+        return state_handles
+
     def __load_state(self, state_handle):
         """Loads an instantiation of this DRBG."""
 
-        if state_handle not in self.__states.keys():
+        if state_handle not in self.__states:
             return None
         else:
             return self.__states[state_handle]
@@ -307,6 +835,35 @@ class DRBG:
         elif status != DRBGStatus.SUCCESS:
             print("Error encountered during testing of generate algorithm.")
 
+    def set_health_test_policy(self, policy):
+        """Selects the policy of the periodic generate algorithm tests, i.e. their interval, the number of sampled
+            test vectors and the budget of generate time they may use.
+
+        Parameters
+        ----------
+        policy : HealthTestPolicy
+            The health-test policy.
+        """
+
+        self.__health_state.set_policy(policy)
+
+    def get_health_metrics(self):
+        """Returns the achieved coverage of the test vectors and the overhead of the periodic generate algorithm
+            tests, as a dictionary. See DRBGHealthState.get_metrics."""
+
+        return self.__health_state.get_metrics()
+
+    def _generate_test_vectors(self, database, columns, table):
+        """Returns the known-answer test vectors of the generate algorithm from a table of a database, read once and
+            sampled according to the health-test policy during periodic tests. The first column must be the ID."""
+
+        key = (database, columns, table)
+        if key not in self.__test_vectors:
+            conn = sqlite3.connect(database)
+            self.__test_vectors[key] = conn.execute("SELECT " + columns + " from " + table).fetchall()
+            conn.close()
+        return self.__health_state.sample_vectors(self.__test_vectors[key])
+
     def has_catastrophic_error(self):
         """Returns bool value indicating whether the DRBG is in a catastrophic error state."""
 
@@ -332,6 +889,12 @@ class DRBG:
         print("Reseed algorithm for " + self._DRBG_type + " is not implemented.")
         return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None
 
+    def _generate_reseed_state(self, previous_state, reseeded_state):
+        """Returns the state a generate request continues from after the reseed it required, given the state before
+            and after the reseed. The reseeded state by default, inherited classes may override this method."""
+
+        return reseeded_state
+
     def _generate_algorithm(self, working_state, requested_number_of_bits, additional_input):
         """Dummy implementation for the generate algorithm. Inherited classes must override this method."""
 
@@ -356,3 +919,24 @@ class DRBG:
 
         self.trigger_catastrophic_error()
         return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+
+
+def _mark_forked_states():
+    """Runs in the child process after a fork. Marks the states of all in-process tables as inherited, so each is
+        reseeded before its next use, and discards the output buffered by the parent. State stores in shared memory
+        or memory-mapped files are shared with the parent rather than copied, and are left unchanged."""
+
+    tables = [DRBG._DRBG__states] + [instance._DRBG__states for instance in DRBG._DRBG__instances]
+    forked_states = DRBG._DRBG__forked_states
+    forked_states.clear()
+    for table in tables:
+        if isinstance(table, dict) and len(table) > 0:
+            forked_states[id(table)] = set(table.keys())
+
+    for table_buffers in DRBG._DRBG__buffers.values():
+        for output_buffer in table_buffers.values():
+            output_buffer.invalidate()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_mark_forked_states)
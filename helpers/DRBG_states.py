@@ -1,29 +1,130 @@
+import random
+import time
+
 from helpers.DRBG_status import DRBGStatus
 
 
+class HealthTestPolicy:
+    def __init__(self, interval=50, unit="calls", sample_size=None, cpu_budget=None):
+        """The policy of the periodic known-answer tests of the generate algorithm.
+
+        Parameters
+        ----------
+        interval : int, float
+            The interval between tests, in the selected unit.
+        unit : str
+            The unit of the interval, either "calls" for generate calls, "bytes" for generated bytes or "seconds"
+            for wall-clock time.
+        sample_size : int, optional
+            The number of known-answer test vectors sampled for each test. All vectors are tested if not provided.
+        cpu_budget : float, optional
+            The highest share of generate time spent on tests, as a percentage. A test that is due is deferred while
+            the tests have used more. Not capped if not provided.
+        """
+
+        if unit not in ["calls", "bytes", "seconds"]:
+            raise ValueError("Unknown health-test interval unit: " + str(unit))
+
+        self.interval = interval
+        self.unit = unit
+        self.sample_size = sample_size
+        self.cpu_budget = cpu_budget
+
+
 class DRBGHealthState:
-    def __init__(self, drbg_instance):
+    def __init__(self, drbg_instance, policy=None):
         self.__catastrophic_error = False
-        self.__generate_counter = 0
-        self.__generate_test_interval = 50
+        self.__policy = policy if policy is not None else HealthTestPolicy()
+        self.__progress = 0
+        self.__last_test = time.monotonic()
         self.__drbg = drbg_instance
 
+        self.__sampling = False
+        self.__tests = 0
+        self.__deferred_tests = 0
+        self.__deferred = False
+        self.__vectors = 0
+        self.__tested_vectors = set()
+        self.__total_vectors = 0
+        self.__generate_time = 0.
+        self.__test_time = 0.
+
     def set_catastrophic_error(self):
         self.__catastrophic_error = True
 
     def is_catastrophic_error(self):
         return self.__catastrophic_error
 
-    def increment_generate_counter(self):
-        self.__generate_counter += 1
-        if self.__generate_counter >= self.__generate_test_interval:
+    def set_policy(self, policy):
+        """Replaces the health-test policy and restarts the interval."""
+
+        self.__policy = policy
+        self.__progress = 0
+        self.__last_test = time.monotonic()
+
+    def increment_generate_counter(self, count=1, bits=0, elapsed=0.):
+        """Advances the health-test interval by count generate calls producing bits bits in elapsed seconds, and
+            tests the generate algorithm if a test is due and the budget allows it."""
+
+        self.__generate_time += elapsed
+        if self.__policy.unit == "calls":
+            self.__progress += count
+        elif self.__policy.unit == "bytes":
+            self.__progress += bits // 8
+        else:
+            self.__progress = time.monotonic() - self.__last_test
+
+        if self.__progress < self.__policy.interval:
+            return
+
+        if self.__policy.cpu_budget is not None and \
+                self.__test_time > self.__policy.cpu_budget / 100 * self.__generate_time:
+            if not self.__deferred:
+                self.__deferred_tests += 1
+                self.__deferred = True
+            return
+
+        self.__sampling = True
+        start = time.perf_counter()
+        try:
             status = self.__drbg.test_generate()
-            if status == DRBGStatus.CATASTROPHIC_ERROR_FLAG:
-                print("Generate algorithm is invalid.")
-            elif status != DRBGStatus.SUCCESS:
-                print("Error encountered during testing of generate algorithm.")
-            else:
-                self.__generate_counter = 0
+        finally:
+            self.__sampling = False
+        self.__test_time += time.perf_counter() - start
+        self.__tests += 1
+
+        if status == DRBGStatus.CATASTROPHIC_ERROR_FLAG:
+            print("Generate algorithm is invalid.")
+        elif status != DRBGStatus.SUCCESS:
+            print("Error encountered during testing of generate algorithm.")
+        else:
+            self.__progress = 0
+            self.__last_test = time.monotonic()
+            self.__deferred = False
+
+    def sample_vectors(self, vectors):
+        """Returns the known-answer test vectors used by a test, a sample of them during periodic tests if the policy
+            has a sample size. The first column of each vector must be its ID."""
+
+        if not self.__sampling:
+            return vectors
+
+        self.__total_vectors = len(vectors)
+        if self.__policy.sample_size is not None and self.__policy.sample_size < len(vectors):
+            vectors = random.sample(vectors, self.__policy.sample_size)
+        self.__vectors += len(vectors)
+        self.__tested_vectors.update(vector[0] for vector in vectors)
+        return vectors
+
+    def get_metrics(self):
+        """Returns the metrics of the periodic tests: the number of tests run, of due tests deferred by the budget
+            and of vectors tested, the share of all vectors tested at least once, the seconds spent generating and
+            testing, and the test time as a percentage of the generate time."""
+
+        return {"tests": self.__tests, "deferred_tests": self.__deferred_tests, "vectors_tested": self.__vectors,
+                "coverage": len(self.__tested_vectors) / self.__total_vectors if self.__total_vectors > 0 else 0.,
+                "generate_time": self.__generate_time, "test_time": self.__test_time,
+                "overhead": 100 * self.__test_time / self.__generate_time if self.__generate_time > 0 else 0.}
 
 
 class DRBGState:
@@ -38,27 +139,54 @@ class DRBGState:
 
 
 class HashDRBGState(DRBGState):
-    def __init__(self, value, constant, reseed_counter, security_strength, prediction_resistance_flag):
+    def __init__(self, value, constant, reseed_counter, security_strength, prediction_resistance_flag,
+                 constant_bits=None):
         super().__init__(value, reseed_counter, security_strength, prediction_resistance_flag)
         self.__C = constant
+        self.constant_bits = constant_bits
 
     def get_C(self):
         return self.__C
 
 
 class HMACDRBGState(DRBGState):
-    def __init__(self, value, key, reseed_counter, security_strength, prediction_resistance_flag):
+    def __init__(self, value, key, reseed_counter, security_strength, prediction_resistance_flag, seed_key=None):
         super().__init__(value, reseed_counter, security_strength, prediction_resistance_flag)
         self.__Key = key
+        self.seed_key = seed_key
 
     def get_Key(self):
         return self.__Key
 
 
 class CTRDRBGState(DRBGState):
-    def __init__(self, value, key, reseed_counter, security_strength, prediction_resistance_flag):
+    def __init__(self, value, key, reseed_counter, security_strength, prediction_resistance_flag, seed_key=None):
         super().__init__(value, reseed_counter, security_strength, prediction_resistance_flag)
         self.__Key = key
+        self.seed_key = seed_key
 
     def get_Key(self):
         return self.__Key
+
+
+class DRBGOutputBuffer:
+    def __init__(self, size):
+        self.size = size
+        self.__data = bytes(0)
+        self.__offset = 0
+
+    def available(self):
+        return len(self.__data) - self.__offset
+
+    def fill(self, data):
+        self.__data = b''.join([self.__data[self.__offset:], data])
+        self.__offset = 0
+
+    def read(self, no_of_bytes):
+        data = self.__data[self.__offset:self.__offset + no_of_bytes]
+        self.__offset += no_of_bytes
+        return data
+
+    def invalidate(self):
+        self.__data = bytes(0)
+        self.__offset = 0
@@ -0,0 +1,159 @@
+import asyncio
+import collections
+import math
+
+from helpers.DRBG_status import DRBGStatus
+from helpers.general_helpers import leftmost
+
+
+class AsyncDRBG:
+    def __init__(self, drbg, executor=None, coalesce_bits=2**12):
+        """An asyncio facade of a DRBG. Every call to the DRBG runs in an executor, so large requests, health tests
+            and reseeds do not block the event loop. Requests on the same state are served strictly in order, one
+            executor call at a time, and consecutive small requests waiting for a state are coalesced into a single
+            generate request whose output is split between them.
+
+        Parameters
+        ----------
+        drbg : DRBG
+            The DRBG used for bit generation.
+        executor : concurrent.futures.Executor, optional
+            The executor running the DRBG calls. Must be a thread executor, since the states are kept in-process.
+            The default executor of the event loop is used if not provided.
+        coalesce_bits : int
+            The largest request that is coalesced with other requests. Only requests without prediction resistance,
+            additional input or requested security strength are coalesced. A request that leaves prediction
+            resistance unspecified follows the prediction resistance flag of its state, and is coalesced only if the
+            flag is not set.
+        """
+
+        self.__drbg = drbg
+        self.__executor = executor
+        self.__coalesce_bits = coalesce_bits
+        self.__pending = dict()
+        self.__running = set()
+        self.__tasks = set()
+
+    async def instantiate(self, requested_instantiation_security_strength=None, prediction_resistance_flag=None,
+                          personalization_string=None):
+        """Instantiates a state of the DRBG. See DRBG.instantiate."""
+
+        return await self.__run(self.__drbg.instantiate, requested_instantiation_security_strength,
+                                prediction_resistance_flag, personalization_string)
+
+    async def reseed(self, state_handle, prediction_resistance_request=None, additional_input=None):
+        """Reseeds an instantiated state of the DRBG after the requests already waiting for it. See DRBG.reseed."""
+
+        return await self.__enqueue(state_handle, 0, (self.__drbg.reseed, state_handle, prediction_resistance_request,
+                                                      additional_input))
+
+    async def generate(self, state_handle, requested_number_of_bits, requested_security_strength=None,
+                       prediction_resistance_request=None, additional_input=None):
+        """Generates pseudo-random bits using an instantiation. See DRBG.generate. Small requests without prediction
+            resistance, additional input or requested security strength are coalesced with the other requests
+            waiting for the state. If prediction_resistance_request is None, it is resolved against the prediction
+            resistance flag of the state, as in DRBG.generate.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        pseudorandom_bits : bytes
+            Generated pseudo-random bits. Might be None.
+        """
+
+        if prediction_resistance_request is None:
+            prediction_resistance_request = self.__drbg.get_prediction_resistance_flag(state_handle)
+        if prediction_resistance_request is False and additional_input is None and \
+                requested_security_strength is None and 0 < requested_number_of_bits <= self.__coalesce_bits:
+            return await self.__enqueue(state_handle, requested_number_of_bits, None)
+
+        return await self.__enqueue(state_handle, 0, (self.__drbg.generate, state_handle, requested_number_of_bits,
+                                                      requested_security_strength, prediction_resistance_request,
+                                                      additional_input))
+
+    async def uninstantiate(self, state_handle):
+        """Removes an instantiation of the DRBG after the requests already waiting for it. See DRBG.uninstantiate."""
+
+        return await self.__enqueue(state_handle, 0, (self.__drbg.uninstantiate, state_handle))
+
+    async def __run(self, function, *args):
+        """Runs a DRBG call in the executor."""
+
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, function, *args)
+
+    def __enqueue(self, state_handle, requested_number_of_bits, call):
+        """Queues a request on a state and returns a future of its result. A request is either a coalescible
+            generate request of requested_number_of_bits bits, or a call to the DRBG that is made on its own."""
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__pending.setdefault(state_handle, collections.deque()).append((requested_number_of_bits, call, future))
+        if state_handle not in self.__running:
+            self.__running.add(state_handle)
+            task = loop.create_task(self.__serve(state_handle))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+        return future
+
+    async def __serve(self, state_handle):
+        """Serves the queued requests on a state in order until none are left."""
+
+        pending = self.__pending[state_handle]
+        try:
+            while len(pending) > 0:
+                requested_number_of_bits, call, future = pending[0]
+                if call is not None:
+                    pending.popleft()
+                    await self.__serve_call(call, future)
+                else:
+                    await self.__serve_coalesced(state_handle, pending)
+        finally:
+            self.__running.discard(state_handle)
+            del self.__pending[state_handle]
+
+    async def __serve_call(self, call, future):
+        """Makes a single queued DRBG call and resolves its future."""
+
+        try:
+            result = await self.__run(*call)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    async def __serve_coalesced(self, state_handle, pending):
+        """Serves the leading coalescible requests on a state with a single generate request."""
+
+        batch = []
+        batch_bytes = 0
+        max_bytes = self.__drbg._max_number_of_bits_per_request // 8
+        while len(pending) > 0 and pending[0][1] is None:
+            requested_bytes = math.ceil(pending[0][0] / 8)
+            if len(batch) > 0 and batch_bytes + requested_bytes > max_bytes:
+                break
+            batch.append(pending.popleft())
+            batch_bytes += requested_bytes
+
+        try:
+            status, pseudorandom_bits = await self.__run(self.__drbg.generate, state_handle, batch_bytes * 8, None,
+                                                         False, None)
+        except Exception as e:
+            for requested_number_of_bits, call, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for requested_number_of_bits, call, future in batch:
+            requested_bytes = math.ceil(requested_number_of_bits / 8)
+            if future.done():
+                pass
+            elif status != DRBGStatus.SUCCESS:
+                future.set_result((status, None))
+            else:
+                future.set_result((status, leftmost(pseudorandom_bits[offset:offset + requested_bytes],
+                                                    requested_number_of_bits)))
+            offset += requested_bytes
@@ -0,0 +1,94 @@
+import os
+import random
+
+from helpers.DRBG_status import DRBGStatus, DRBG_status_to_string
+
+
+class DRBGRandom(random.Random):
+    def __init__(self, drbg, state_handle, reservoir_bits=2**16, prediction_resistance_request=None):
+        """A random.Random backed by an instantiated DRBG state. Draws are served from an internal reservoir
+            refilled by a single generate request, so small draws do not each pay for a generate call.
+            Like random.SystemRandom, it cannot be seeded and has no state to save or restore.
+
+        Parameters
+        ----------
+        drbg : DRBG
+            The DRBG used for bit generation, e.g. a HashDRBG or KHashDRBG.
+        state_handle : int
+            A handle for the instantiated state used for bit generation.
+        reservoir_bits : int
+            The number of bits requested from the DRBG to refill the reservoir. Must be a multiple of 8 and at least 8.
+        prediction_resistance_request : bool, optional
+            A flag passed to every generate request made by this object.
+        """
+
+        if reservoir_bits < 8:
+            raise ValueError("reservoir must hold at least one byte")
+        self.__drbg = drbg
+        self.__state_handle = state_handle
+        self.__reservoir_bytes = min(reservoir_bits, drbg._max_number_of_bits_per_request) // 8
+        self.__prediction_resistance_request = prediction_resistance_request
+        self.__reservoir = bytes(0)
+        self.__offset = 0
+        self.__pid = os.getpid()
+        super().__init__()
+
+    def random(self):
+        """Returns the next random float in [0, 1) with 53 random bits."""
+
+        return (int.from_bytes(self.__read(7), "big") >> 3) * 2.**-53
+
+    def getrandbits(self, k):
+        """Returns an integer with k random bits."""
+
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        no_of_bytes = (k + 7) // 8
+        return int.from_bytes(self.__read(no_of_bytes), "big") >> (no_of_bytes * 8 - k)
+
+    def randbytes(self, n):
+        """Returns n random bytes."""
+
+        return self.__read(n)
+
+    def seed(self, *args, **kwds):
+        """Stub method. The output is determined by the DRBG state and cannot be seeded."""
+
+        return None
+
+    def getstate(self, *args, **kwds):
+        raise NotImplementedError("DRBG state is not accessible through DRBGRandom")
+
+    def setstate(self, *args, **kwds):
+        raise NotImplementedError("DRBG state is not accessible through DRBGRandom")
+
+    def __read(self, no_of_bytes):
+        """Returns the next bytes of the reservoir, refilling it from the DRBG when it runs out. A reservoir filled
+            before a fork is discarded, so the child does not repeat the draws of the parent."""
+
+        if self.__pid != os.getpid():
+            self.__pid = os.getpid()
+            self.__reservoir = bytes(0)
+            self.__offset = 0
+
+        if self.__offset + no_of_bytes > len(self.__reservoir):
+            chunks = [self.__reservoir[self.__offset:]]
+            available = len(chunks[0])
+            while available < no_of_bytes:
+                chunks.append(self.__generate(self.__reservoir_bytes))
+                available += self.__reservoir_bytes
+            self.__reservoir = b''.join(chunks)
+            self.__offset = 0
+
+        data = self.__reservoir[self.__offset:self.__offset + no_of_bytes]
+        self.__offset += no_of_bytes
+        return data
+
+    def __generate(self, no_of_bytes):
+        """Requests bytes from the DRBG, raising an error if the request fails."""
+
+        status, bits = self.__drbg.generate(self.__state_handle, no_of_bytes * 8,
+                                            prediction_resistance_request=self.__prediction_resistance_request)
+        if status != DRBGStatus.SUCCESS:
+            raise RuntimeError("DRBG generate request failed: " + DRBG_status_to_string(status))
+        return bits
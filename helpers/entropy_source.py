@@ -1,10 +1,119 @@
 import os
 import math
+import struct
+from Crypto.Hash import SHAKE256
+
 from helpers.DRBG_status import DRBGStatus
 
 
+class OSEntropySource:
+    """Entropy source using simple calls to os.urandom. Used by default."""
+
+    def get_bytes(self, no_of_bytes):
+        """Returns the status and no_of_bytes bytes read from the source."""
+
+        return DRBGStatus.SUCCESS, os.urandom(no_of_bytes)
+
+
+class SeededEntropySource:
+    def __init__(self, seed):
+        """Deterministic source expanding a seed with SHAKE256, so runs using it can be reproduced. Only intended for
+            testing and benchmarking, it provides no entropy beyond the seed.
+
+        Parameters
+        ----------
+        seed : bytes, int
+            The seed of the source.
+        """
+
+        if isinstance(seed, int):
+            seed = seed.to_bytes(max(1, math.ceil(seed.bit_length() / 8)), 'big')
+        self.__xof = SHAKE256.new(seed)
+
+    def get_bytes(self, no_of_bytes):
+        return DRBGStatus.SUCCESS, self.__xof.read(no_of_bytes)
+
+
+class RecordingEntropySource:
+    def __init__(self, path, source=None):
+        """Source passing through the output of another source while logging every request to a file, so the run
+            can be repeated with a ReplayEntropySource.
+
+        Parameters
+        ----------
+        path : str
+            The path of the log file, overwritten if it exists.
+        source : optional
+            The recorded entropy source. An OSEntropySource is used if not provided.
+        """
+
+        self.__source = source if source is not None else OSEntropySource()
+        self.__file = open(path, "wb")
+
+    def get_bytes(self, no_of_bytes):
+        status, returned_bits = self.__source.get_bytes(no_of_bytes)
+        if status == DRBGStatus.SUCCESS:
+            self.__file.write(struct.pack('>I', len(returned_bits)))
+            self.__file.write(returned_bits)
+            self.__file.flush()
+        return status, returned_bits
+
+    def close(self):
+        """Closes the log file."""
+
+        self.__file.close()
+
+
+class ReplayEntropySource:
+    def __init__(self, path):
+        """Source returning the requests logged by a RecordingEntropySource in the order they were recorded. A request
+            fails if the log is exhausted or the next recorded request has a different length, which means the run
+            diverged from the recorded one.
+
+        Parameters
+        ----------
+        path : str
+            The path of the log file.
+        """
+
+        with open(path, "rb") as f:
+            self.__log = f.read()
+        self.__offset = 0
+
+    def get_bytes(self, no_of_bytes):
+        if self.__offset + 4 > len(self.__log):
+            return DRBGStatus.ERROR_FLAG, None
+
+        recorded_bytes = struct.unpack_from('>I', self.__log, self.__offset)[0]
+        if recorded_bytes != no_of_bytes or self.__offset + 4 + recorded_bytes > len(self.__log):
+            return DRBGStatus.ERROR_FLAG, None
+
+        returned_bits = self.__log[self.__offset + 4:self.__offset + 4 + recorded_bytes]
+        self.__offset += 4 + recorded_bytes
+        return DRBGStatus.SUCCESS, returned_bits
+
+
+_entropy_source = OSEntropySource()
+
+
+def set_entropy_source(source):
+    """Replaces the entropy source used by all DRBGs, e.g. with a SeededEntropySource or ReplayEntropySource, and
+        returns the previous source."""
+
+    global _entropy_source
+    previous_source = _entropy_source
+    _entropy_source = source
+    return previous_source
+
+
+def get_entropy_source():
+    """Returns the entropy source used by all DRBGs."""
+
+    return _entropy_source
+
+
 def get_entropy_input(min_entropy, min_len, max_len, prediction_resistance):
-    """Uses simple call to os.urandom, not compliant with documentation.
+    """Reads from the selected entropy source, os.urandom by default, not compliant with documentation.
 
     Parameters
     ----------
@@ -27,12 +136,14 @@ def get_entropy_input(min_entropy, min_len, max_len, prediction_resistance):
 
     if min_entropy > min_len:
         min_len = min_entropy
-    returned_bits = os.urandom(math.ceil(min_len / 8))
-    return DRBGStatus.SUCCESS, returned_bits
+    status, returned_bits = _entropy_source.get_bytes(math.ceil(min_len / 8))
+    return status, returned_bits
 
 
 def get_nonce(security_strength):
-    """Uses simple call to os.urandom to get security_strength/2 pseudo-random bits."""
+    """Reads security_strength/2 bits from the selected entropy source. Returns None if the source fails."""
 
-    nonce = os.urandom(math.ceil(security_strength/16))
+    status, nonce = _entropy_source.get_bytes(math.ceil(security_strength/16))
+    if status != DRBGStatus.SUCCESS:
+        return None
     return nonce
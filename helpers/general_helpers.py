@@ -1,103 +1,53 @@
-import math
+import hmac
 
 
 def sum_bytes(bytes1, bytes2, overflow=False):
-    if len(bytes2) > len(bytes1):
-        tmp = bytes1
-        bytes1 = bytes2
-        bytes2 = tmp
-    l1 = len(bytes1) - 1
-    l2 = len(bytes2) - 1
-
-    res = bytearray()
-    carry = 0
-    for i in range(len(bytes2)):
-        s = bytes1[l1 - i] + bytes2[l2 - i] + carry
-        if s > 255:
-            s -= 256
-            carry = 1
-        else:
-            carry = 0
-        res.append(s)
-
-    for i in range(len(bytes2), len(bytes1)):
-        s = bytes1[l1 - i] + carry
-        if s > 255:
-            s -= 256
-            carry = 1
-        else:
-            carry = 0
-        res.append(s)
-
-    if not overflow and carry > 0:
-        res.append(carry)
-    res.reverse()
-
-    return bytes(res)
+    length = max(len(bytes1), len(bytes2))
+    res = int.from_bytes(bytes1, 'big') + int.from_bytes(bytes2, 'big')
+
+    if overflow:
+        return (res & ((1 << (8 * length)) - 1)).to_bytes(length, 'big')
+    if res >> (8 * length):
+        return res.to_bytes(length + 1, 'big')
+    return res.to_bytes(length, 'big')
 
 
 def sum_bytes_multi(bytes_array, overflow=False):
+    """Returns the sum of big-endian words. With overflow, the sum is reduced modulo 2^(8n) for the length n of the
+        longest word. The replaced byte-wise version added the words pairwise from the lexicographically largest one
+        and truncated every partial sum to the longest word added so far, dropping the carries of words shorter than
+        the longest one. The DRBGs always add a word of full length first, so their output is unchanged."""
+
     if len(bytes_array) < 1:
         return None
 
-    longest_word_ind = 0
-    for i in range(1, len(bytes_array)):
-        if bytes_array[longest_word_ind] < bytes_array[i]:
-            longest_word_ind = i
-
-    if longest_word_ind != 0:
-        tmp = bytes_array[0]
-        bytes_array[0] = bytes_array[longest_word_ind]
-        bytes_array[longest_word_ind] = tmp
+    length = max(len(b) for b in bytes_array)
+    res = sum(int.from_bytes(b, 'big') for b in bytes_array)
 
-    res = bytes_array[0]
-    for i in range(1, len(bytes_array)):
-        res = sum_bytes(res, bytes_array[i], overflow)
-
-    return res
+    if overflow:
+        return (res & ((1 << (8 * length)) - 1)).to_bytes(length, 'big')
+    return res.to_bytes(max(length, (res.bit_length() + 7) // 8), 'big')
 
 
 def bytes_equal(bytes1, bytes2):
-    if len(bytes1) != len(bytes2):
-        return False
-
-    for b1, b2 in zip(bytes1, bytes2):
-        if b1 != b2:
-            return False
-
-    return True
+    return hmac.compare_digest(bytes(bytes1), bytes(bytes2))
 
 
 def leftmost(bytes_in, no_of_bits):
-    bytes_out = bytearray()
-    bytes_count = 0
-
-    while bytes_count < len(bytes_in) and (bytes_count + 1)*8 <= no_of_bits:
-        bytes_out.append(bytes_in[bytes_count])
-        bytes_count += 1
+    if no_of_bits <= 0:
+        return bytes(0)
 
-    if bytes_count < len(bytes_in) and bytes_count*8 < no_of_bits:
-        bits_diff = no_of_bits - bytes_count*8
-        byte_in = bytes_in[bytes_count]
-        byte_out = 0
-        for i in range(bits_diff):
-            if byte_in >= 2**(7-i):
-                byte_out += 2**(7-i)
-                byte_in -= 2**(7-i)
+    no_of_bytes, bits_diff = divmod(no_of_bits, 8)
+    if no_of_bytes >= len(bytes_in):
+        return bytes(bytes_in)
+    if bits_diff == 0:
+        return bytes(bytes_in[:no_of_bytes])
 
-        bytes_out.append(byte_out)
-
-    return bytes(bytes_out)
+    return bytes(bytes_in[:no_of_bytes]) + bytes([bytes_in[no_of_bytes] & (0xff00 >> bits_diff) & 0xff])
 
 
 def int_to_bytes(int_in, no_of_bytes):
-    res = bytearray()
-    for i in range(no_of_bytes):
-        res.append(int_in % 256)
-        int_in = math.floor(int_in / 256)
-
-    res.reverse()
-    return bytes(res)
+    return (int_in % (1 << (8 * no_of_bytes))).to_bytes(no_of_bytes, 'big')
 
 
 def bytes_to_string(bytes_in):
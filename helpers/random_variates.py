@@ -0,0 +1,175 @@
+import math
+import numpy as np
+
+from helpers.DRBG_status import DRBGStatus
+
+
+class RandomVariates:
+    def __init__(self, drbg, state_handle, prediction_resistance_request=None):
+        """Produces NumPy arrays of random variates from the output of an instantiated DRBG state.
+
+        Parameters
+        ----------
+        drbg : DRBG
+            The DRBG used for bit generation.
+        state_handle : int
+            A handle for the instantiated state used for bit generation.
+        prediction_resistance_request : bool, optional
+            A flag passed to every generate request made by this object.
+        """
+
+        self.__drbg = drbg
+        self.__state_handle = state_handle
+        self.__prediction_resistance_request = prediction_resistance_request
+        self.__words_per_request = drbg._max_number_of_bits_per_request // 64
+
+    def words(self, size):
+        """Returns an array of size uniformly distributed 64-bit words. Each generate request fills as many words
+            as the DRBG allows per request.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        words : numpy.ndarray
+            The generated uint64 words. Might be None.
+        """
+
+        words = np.empty(size, dtype=np.uint64)
+        filled = 0
+        while filled < size:
+            no_of_words = min(self.__words_per_request, size - filled)
+            status, bits = self.__drbg.generate(self.__state_handle, no_of_words * 64,
+                                                prediction_resistance_request=self.__prediction_resistance_request)
+            if status != DRBGStatus.SUCCESS:
+                return status, None
+
+            words[filled:filled + no_of_words] = np.frombuffer(bits, dtype='<u8')
+            filled += no_of_words
+
+        return DRBGStatus.SUCCESS, words
+
+    def integers(self, low, high, size):
+        """Returns an array of size integers uniformly distributed in [low, high). Words falling into the incomplete
+            last multiple of the range are rejected, so no value is more likely than another. The range must fit the
+            output type, i.e. [0, 2^64) for a non-negative low and [-2^63, 2^63) otherwise.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        integers : numpy.ndarray
+            The generated uint64 integers, or int64 integers for a negative low. Might be None.
+        """
+
+        value_range = high - low
+        if value_range <= 0 or high > 2**64 or (low < 0 and high > 2**63) or low < -2**63:
+            return DRBGStatus.ERROR_FLAG, None
+
+        if value_range == 2**64 or value_range & (value_range - 1) == 0:
+            status, words = self.words(size)
+            if status != DRBGStatus.SUCCESS:
+                return status, None
+            if value_range < 2**64:
+                words &= np.uint64(value_range - 1)
+            return DRBGStatus.SUCCESS, self.__shift(words, low)
+
+        limit = np.uint64(2**64 - 2**64 % value_range)
+        acceptance = int(limit) / 2**64
+        integers = np.empty(size, dtype=np.uint64)
+        filled = 0
+        while filled < size:
+            no_of_words = math.ceil((size - filled) / acceptance) + 16
+            status, words = self.words(no_of_words)
+            if status != DRBGStatus.SUCCESS:
+                return status, None
+
+            accepted = words[words < limit][:size - filled]
+            integers[filled:filled + len(accepted)] = accepted % np.uint64(value_range)
+            filled += len(accepted)
+
+        return DRBGStatus.SUCCESS, self.__shift(integers, low)
+
+    def random(self, size):
+        """Returns an array of size floats uniformly distributed in [0, 1) with 53 random bits each.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        floats : numpy.ndarray
+            The generated float64 values. Might be None.
+        """
+
+        status, words = self.words(size)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        return DRBGStatus.SUCCESS, (words >> np.uint64(11)).astype(np.float64) * 2.**-53
+
+    def normal(self, loc=0., scale=1., size=1):
+        """Returns an array of size normally distributed floats, generated in pairs by the Box-Muller transform.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        floats : numpy.ndarray
+            The generated float64 values. Might be None.
+        """
+
+        no_of_pairs = math.ceil(size / 2)
+        status, uniform = self.random(2 * no_of_pairs)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        radius = np.sqrt(-2. * np.log1p(-uniform[:no_of_pairs]))
+        angle = 2. * np.pi * uniform[no_of_pairs:]
+        normal = np.concatenate([radius * np.cos(angle), radius * np.sin(angle)])[:size]
+        return DRBGStatus.SUCCESS, loc + scale * normal
+
+    def permutation(self, n):
+        """Returns a random permutation of the integers in [0, n), obtained by sorting n random 64-bit keys.
+            The probability of two equal keys, the only source of bias, is below n**2 / 2**65.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        permutation : numpy.ndarray
+            The generated int64 permutation. Might be None.
+        """
+
+        status, keys = self.words(n)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        return DRBGStatus.SUCCESS, np.argsort(keys, kind="stable")
+
+    def shuffle(self, array):
+        """Returns a copy of the array with its first axis randomly permuted.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        shuffled : numpy.ndarray
+            The shuffled copy of the array. Might be None.
+        """
+
+        array = np.asarray(array)
+        status, permutation = self.permutation(len(array))
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        return DRBGStatus.SUCCESS, array[permutation]
+
+    def __shift(self, values, low):
+        """Adds low to the uint64 values, converting them to int64 if low is negative."""
+
+        if low < 0:
+            return values.astype(np.int64) + low
+        elif low > 0:
+            return values + np.uint64(low)
+        else:
+            return values
@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers.DRBG_status import DRBGStatus
+from helpers.entropy_source import get_entropy_input
+
+
+class ReseedScheduler:
+    def __init__(self, drbg, reseed_lead=2**10):
+        """Prepares reseeds of DRBG states on a background thread. After each generate request on a state that
+            will need a reseed, either because it has the prediction resistance flag or because its reseed counter is
+            within reseed_lead requests of the reseed interval, the entropy input is fetched and the reseed algorithm
+            is run on the new state in the background. When the reseed is due at the next request, the prepared state
+            is swapped in if the state has not changed since, so the request does not wait for the entropy source or
+            the reseed algorithm. The entropy of a prepared reseed is fetched before the request that uses it.
+
+        Parameters
+        ----------
+        drbg : DRBG
+            The DRBG whose states are reseeded.
+        reseed_lead : int
+            The number of requests before the reseed interval from which reseeds are prepared.
+        """
+
+        self.__drbg = drbg
+        self.__reseed_lead = reseed_lead
+        self.__executor = ThreadPoolExecutor(max_workers=1)
+        self.__prepared = dict()
+        self.__pid = os.getpid()
+
+    def prepare(self, state_handle, working_state):
+        """Schedules the preparation of the next reseed of a state, if the state will need one."""
+
+        if not working_state.prediction_resistance_flag and \
+                working_state.reseed_counter < self.__drbg._reseed_interval - self.__reseed_lead:
+            return
+
+        if self.__pid != os.getpid():
+            self.__executor = ThreadPoolExecutor(max_workers=1)
+            self.__prepared = dict()
+            self.__pid = os.getpid()
+
+        self.__prepared[state_handle] = self.__executor.submit(self.__reseed, working_state)
+
+    def take(self, state_handle, working_state):
+        """Returns the prepared reseed of a state, or None if it is not ready or was prepared from another state."""
+
+        future = self.__prepared.pop(state_handle, None)
+        if future is None or not future.done() or self.__pid != os.getpid():
+            return None
+
+        status, value, reseed_counter, new_working_state = future.result()
+        if status != DRBGStatus.SUCCESS or value != working_state.get_value() or \
+                reseed_counter != working_state.reseed_counter:
+            return None
+        return new_working_state
+
+    def discard(self, state_handle):
+        """Discards the prepared reseed of a state."""
+
+        self.__prepared.pop(state_handle, None)
+
+    def shutdown(self):
+        """Discards all prepared reseeds and stops the background thread."""
+
+        self.__prepared = dict()
+        self.__executor.shutdown(wait=False)
+
+    def __reseed(self, working_state):
+        """Fetches entropy and runs the reseed algorithm without additional input on the background thread."""
+
+        status, entropy_input = get_entropy_input(working_state.security_strength, self.__drbg._min_length,
+                                                  self.__drbg._max_length, True)
+        if status != DRBGStatus.SUCCESS:
+            return status, None, None, None
+
+        status, new_working_state = self.__drbg._reseed_algorithm(working_state, entropy_input, bytes(0))
+        return status, working_state.get_value(), working_state.reseed_counter, new_working_state
@@ -0,0 +1,138 @@
+import hmac
+import os
+import struct
+from Crypto.Hash import HMAC, SHA256
+
+from helpers.DRBG_status import DRBGStatus
+from helpers.DRBG_states import HashDRBGState
+
+SNAPSHOT_MAGIC = b'KDRS'
+SNAPSHOT_VERSION = 1
+
+_HEADER_FORMAT = '>4sBB16sI'
+_RECORD_FORMAT = '>QQHB'
+_SNAPSHOT_ID_LENGTH = 16
+_consumed_snapshots = set()
+
+
+def pack_hash_states(drbg_name, seedlen, states, key):
+    """Serializes hash DRBG states into a versioned snapshot protected by HMAC-SHA256.
+
+    Parameters
+    ----------
+    drbg_name : str
+        The name of the DRBG and hash function the states belong to, checked on restore.
+    seedlen : int
+        The seed length of the DRBG in bits, which determines the size of V and C in each record.
+    states : dict
+        The HashDRBGState objects to serialize, indexed by their state handles.
+    key : bytes
+        The key used to authenticate the snapshot.
+
+    Returns
+    -------
+    snapshot : bytes
+        The serialized snapshot.
+    """
+
+    name = drbg_name.encode('ascii')
+    header = struct.pack(_HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(name), os.urandom(_SNAPSHOT_ID_LENGTH),
+                         len(states))
+    records = [header, name]
+    for state_handle, state in states.items():
+        flags = 1 if state.prediction_resistance_flag else 0
+        records.append(struct.pack(_RECORD_FORMAT, state_handle, state.reseed_counter, state.security_strength, flags))
+        records.append(state.get_value().rjust(seedlen // 8, bytes(1)))
+        records.append(state.get_C().rjust(seedlen // 8, bytes(1)))
+
+    body = b''.join(records)
+    return b''.join([body, HMAC.new(key, msg=body, digestmod=SHA256).digest()])
+
+
+def unpack_hash_states(snapshot, drbg_name, seedlen, key, journal_path=None):
+    """Verifies and deserializes a snapshot created by pack_hash_states. A snapshot marked as consumed with
+        consume_snapshot, in this process or in the given journal file, is not unpacked again, so the same states are
+        not restored twice.
+
+    Returns
+    -------
+    status : DRBGStatus
+        One of the defined DRBG status flags.
+    states : dict
+        The restored HashDRBGState objects indexed by their state handles. Might be None.
+    snapshot_id : bytes
+        The random identifier of the snapshot. Might be None.
+    """
+
+    header_length = struct.calcsize(_HEADER_FORMAT)
+    record_length = struct.calcsize(_RECORD_FORMAT) + 2 * (seedlen // 8)
+    if len(snapshot) < header_length + SHA256.digest_size:
+        return DRBGStatus.ERROR_FLAG, None, None
+
+    body, tag = snapshot[:-SHA256.digest_size], snapshot[-SHA256.digest_size:]
+    if not hmac.compare_digest(HMAC.new(key, msg=body, digestmod=SHA256).digest(), tag):
+        return DRBGStatus.ERROR_FLAG, None, None
+
+    magic, version, name_length, snapshot_id, count = struct.unpack_from(_HEADER_FORMAT, body)
+    name = body[header_length:header_length + name_length].decode('ascii')
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or name != drbg_name or \
+            len(body) != header_length + name_length + count * record_length:
+        return DRBGStatus.ERROR_FLAG, None, None
+
+    if is_snapshot_consumed(snapshot_id, journal_path):
+        return DRBGStatus.ERROR_FLAG, None, None
+
+    states = dict()
+    offset = header_length + name_length
+    value_offset = struct.calcsize(_RECORD_FORMAT)
+    for i in range(count):
+        state_handle, reseed_counter, security_strength, flags = struct.unpack_from(_RECORD_FORMAT, body, offset)
+        value = body[offset + value_offset:offset + value_offset + seedlen // 8]
+        constant = body[offset + value_offset + seedlen // 8:offset + record_length]
+        states[state_handle] = HashDRBGState(value, constant, reseed_counter, security_strength, flags & 1 == 1)
+        offset += record_length
+
+    return DRBGStatus.SUCCESS, states, snapshot_id
+
+
+def is_snapshot_consumed(snapshot_id, journal_path=None):
+    """Returns whether a snapshot was marked as consumed in this process or in a journal file."""
+
+    if snapshot_id in _consumed_snapshots:
+        return True
+    if journal_path is None or not os.path.exists(journal_path):
+        return False
+
+    with open(journal_path, "rb") as f:
+        journal = f.read()
+    return any(journal[i:i + _SNAPSHOT_ID_LENGTH] == snapshot_id
+               for i in range(0, len(journal), _SNAPSHOT_ID_LENGTH))
+
+
+def consume_snapshot(snapshot_id, journal_path=None):
+    """Marks a snapshot as restored, so it is not unpacked again. The identifier is kept in this process and, if a
+        journal path is given, appended to the journal file, which is replaced atomically and synced to disk before
+        returning, so the snapshot is also refused by later processes using the same journal.
+
+    Returns
+    -------
+    status : DRBGStatus
+        One of the defined DRBG status flags.
+    """
+
+    if journal_path is not None:
+        try:
+            journal = bytes(0)
+            if os.path.exists(journal_path):
+                with open(journal_path, "rb") as f:
+                    journal = f.read()
+            with open(journal_path + ".tmp", "wb") as f:
+                f.write(b''.join([journal, snapshot_id]))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(journal_path + ".tmp", journal_path)
+        except OSError:
+            return DRBGStatus.ERROR_FLAG
+
+    _consumed_snapshots.add(snapshot_id)
+    return DRBGStatus.SUCCESS
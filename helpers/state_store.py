@@ -0,0 +1,232 @@
+import contextlib
+import mmap
+import multiprocessing
+import os
+import struct
+from multiprocessing import shared_memory
+
+from helpers.DRBG_states import HashDRBGState
+
+STORE_MAGIC = b'KDRM'
+STORE_VERSION = 1
+
+_HEADER_FORMAT = '>4sBHQ'
+_RECORD_FORMAT = '>BHQ'
+
+
+def state_table_size(seedlen, capacity):
+    """Returns the number of bytes needed by a hash state table with the given seed length and capacity."""
+
+    return struct.calcsize(_HEADER_FORMAT) + capacity * (struct.calcsize(_RECORD_FORMAT) + 2 * (seedlen // 8))
+
+
+class HashStateTable:
+    def __init__(self, buffer, seedlen, capacity, create):
+        """A table of hash DRBG states kept in fixed-width records of a writable buffer. A state handle is the index
+            of its record, so loading and saving a state are constant-time accesses to a single record. States are
+            only materialized as HashDRBGState objects while they are used.
+
+        Parameters
+        ----------
+        buffer : memoryview, mmap
+            The buffer holding the table, of at least state_table_size(seedlen, capacity) bytes.
+        seedlen : int
+            The seed length of the DRBG in bits, which determines the size of V and C in each record.
+        capacity : int
+            The number of records in the table.
+        create : bool
+            A flag used to initialize the table header. Otherwise, the header is checked against the layout.
+        """
+
+        self._buffer = buffer
+        self.__seedlen_bytes = seedlen // 8
+        self.__capacity = capacity
+        self.__header_length = struct.calcsize(_HEADER_FORMAT)
+        self.__value_offset = struct.calcsize(_RECORD_FORMAT)
+        self.__record_length = self.__value_offset + 2 * self.__seedlen_bytes
+        self.__free_handles = []
+        self.__next_handle = 0
+
+        if create:
+            struct.pack_into(_HEADER_FORMAT, self._buffer, 0, STORE_MAGIC, STORE_VERSION, seedlen, capacity)
+        else:
+            magic, version, stored_seedlen, stored_capacity = struct.unpack_from(_HEADER_FORMAT, self._buffer)
+            if magic != STORE_MAGIC or version != STORE_VERSION or stored_seedlen != seedlen or \
+                    stored_capacity != capacity:
+                raise ValueError("State table does not match the requested layout.")
+
+    def __contains__(self, state_handle):
+        return isinstance(state_handle, int) and 0 <= state_handle < self.__capacity and \
+            self._buffer[self.__offset(state_handle)] & 1 == 1
+
+    def __getitem__(self, state_handle):
+        if state_handle not in self:
+            raise KeyError(state_handle)
+
+        offset = self.__offset(state_handle)
+        flags, security_strength, reseed_counter = struct.unpack_from(_RECORD_FORMAT, self._buffer, offset)
+        value_start = offset + self.__value_offset
+        value = bytes(self._buffer[value_start:value_start + self.__seedlen_bytes])
+        constant = bytes(self._buffer[value_start + self.__seedlen_bytes:value_start + 2 * self.__seedlen_bytes])
+        return HashDRBGState(value, constant, reseed_counter, security_strength, flags & 2 == 2)
+
+    def __setitem__(self, state_handle, state):
+        if not 0 <= state_handle < self.__capacity:
+            raise KeyError(state_handle)
+
+        offset = self.__offset(state_handle)
+        flags = 3 if state.prediction_resistance_flag else 1
+        struct.pack_into(_RECORD_FORMAT, self._buffer, offset, flags, state.security_strength, state.reseed_counter)
+        value_start = offset + self.__value_offset
+        self._buffer[value_start:value_start + 2 * self.__seedlen_bytes] = \
+            b''.join([state.get_value().rjust(self.__seedlen_bytes, bytes(1)),
+                      state.get_C().rjust(self.__seedlen_bytes, bytes(1))])
+
+    def __delitem__(self, state_handle):
+        if state_handle not in self:
+            raise KeyError(state_handle)
+
+        offset = self.__offset(state_handle)
+        self._buffer[offset:offset + self.__record_length] = bytes(self.__record_length)
+        self.__free_handles.append(state_handle)
+
+    def __len__(self):
+        return sum(1 for state_handle in self.keys())
+
+    def keys(self):
+        """Yields the handles of all saved states."""
+
+        for state_handle in range(self.__capacity):
+            if self._buffer[self.__offset(state_handle)] & 1 == 1:
+                yield state_handle
+
+    def free_handle(self):
+        """Reserves an unused record and returns its handle, or None if the table is full. The reserved record
+            counts as used and must be written before it is loaded."""
+
+        with self._allocation_lock():
+            while len(self.__free_handles) > 0:
+                state_handle = self.__free_handles.pop()
+                if state_handle not in self:
+                    self._buffer[self.__offset(state_handle)] = 1
+                    return state_handle
+
+            while self.__next_handle < self.__capacity:
+                state_handle = self.__next_handle
+                self.__next_handle += 1
+                if state_handle not in self:
+                    self._buffer[self.__offset(state_handle)] = 1
+                    return state_handle
+
+        return None
+
+    def lock(self, state_handle):
+        """Returns a context manager held while a state is loaded, used and saved. Tables used by a single process
+            need no locking."""
+
+        return contextlib.nullcontext()
+
+    def _allocation_lock(self):
+        """Returns a context manager held while a free record is reserved."""
+
+        return contextlib.nullcontext()
+
+    def __offset(self, state_handle):
+        return self.__header_length + state_handle * self.__record_length
+
+
+class MappedHashStateStore(HashStateTable):
+    def __init__(self, path, seedlen, capacity):
+        """A hash state table kept in a memory-mapped file, so the states persist after the process exits.
+
+        Parameters
+        ----------
+        path : str
+            The path of the store file. An existing file is opened and must match the seed length and capacity.
+        seedlen : int
+            The seed length of the DRBG in bits, which determines the size of V and C in each record.
+        capacity : int
+            The number of records in the store.
+        """
+
+        size = state_table_size(seedlen, capacity)
+        exists = os.path.exists(path)
+        if exists and os.path.getsize(path) != size:
+            raise ValueError("State store " + path + " does not match the requested layout.")
+
+        self.__file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self.__file.truncate(size)
+        self.__map = mmap.mmap(self.__file.fileno(), size)
+
+        try:
+            super().__init__(self.__map, seedlen, capacity, not exists)
+        except ValueError:
+            self.close()
+            raise
+
+    def flush(self):
+        """Writes all changes of the memory-mapped records to the store file."""
+
+        self.__map.flush()
+
+    def close(self):
+        """Flushes and closes the store file."""
+
+        self.__map.flush()
+        self.__map.close()
+        self.__file.close()
+
+
+class SharedHashStateStore(HashStateTable):
+    def __init__(self, seedlen, capacity, name=None, locks=None, lock_count=64):
+        """A hash state table kept in shared memory, so worker processes can generate on any handle. Each record is
+            guarded by one of lock_count process-shared locks, held for the whole load, use and save of a state,
+            so the updates of every state are strictly sequential.
+
+        Parameters
+        ----------
+        seedlen : int
+            The seed length of the DRBG in bits, which determines the size of V and C in each record.
+        capacity : int
+            The number of records in the table.
+        name : str, optional
+            The name of an existing shared memory block to attach to. A new block is created if not provided.
+        locks : list, optional
+            The locks of the creating process, required when attaching. Obtained with get_attach_arguments.
+        lock_count : int
+            The number of locks created for a new table. Record i is guarded by lock i % lock_count.
+        """
+
+        create = name is None
+        if create:
+            self.__memory = shared_memory.SharedMemory(create=True, size=state_table_size(seedlen, capacity))
+            locks = [multiprocessing.RLock() for i in range(lock_count + 1)]
+        else:
+            self.__memory = shared_memory.SharedMemory(name=name)
+
+        self.__seedlen = seedlen
+        self.__capacity = capacity
+        self.__locks = locks
+        self.__created = create
+        super().__init__(self.__memory.buf, seedlen, capacity, create)
+
+    def get_attach_arguments(self):
+        """Returns the positional arguments with which a worker process attaches to this table. They must be passed
+            to the worker when it is started, e.g. through multiprocessing.Process or a pool initializer."""
+
+        return self.__seedlen, self.__capacity, self.__memory.name, self.__locks
+
+    def lock(self, state_handle):
+        return self.__locks[state_handle % (len(self.__locks) - 1)]
+
+    def _allocation_lock(self):
+        return self.__locks[-1]
+
+    def close(self):
+        """Detaches from the shared memory block, and removes it if it was created by this process."""
+
+        self._buffer = None
+        self.__memory.close()
+        if self.__created:
+            self.__memory.unlink()
@@ -0,0 +1,313 @@
+import math
+import random
+import re
+import sqlite3
+from Crypto.Cipher import AES
+
+from helpers.general_helpers import int_to_bytes, leftmost, bytes_equal
+from helpers.DRBG_status import DRBGStatus
+from helpers.DRBG_states import CTRDRBGState
+from DRBG import DRBG
+
+
+class CTRDRBG(DRBG):
+    def __init__(self, block_cipher):
+        """Initializes a block cipher-based DRBG using a derivation function.
+
+        Parameters
+        ----------
+        block_cipher : str
+            The name of the block cipher to use. Supports AES-128, AES-192, AES-256. AES is used through pycryptodome,
+            which relies on AES-NI instructions where they are available.
+        """
+
+        self._block_cipher = block_cipher.upper()
+        self.__blocklen = 128
+
+        if self._block_cipher == "AES-128":
+            highest_supported_security_strength = 128
+            self.__keylen = 128
+
+        elif self._block_cipher == "AES-192":
+            highest_supported_security_strength = 192
+            self.__keylen = 192
+
+        elif self._block_cipher == "AES-256":
+            highest_supported_security_strength = 256
+            self.__keylen = 256
+
+        else:
+            print("Block cipher " + self._block_cipher + " is not supported.")
+            return
+
+        self.__seedlen = self.__blocklen + self.__keylen
+        self._reseed_interval = 2**48
+        max_personalization_string_length = 2**35
+        max_additional_input_length = 2**35
+        max_number_of_bits_per_request = 2**19
+        max_length = 2**35
+
+        super().__init__("CTRDRBG", highest_supported_security_strength, max_personalization_string_length,
+                         max_additional_input_length, max_number_of_bits_per_request, 112, max_length)
+
+    def get_block_cipher(self):
+        """Returns the name of the block cipher used by this CTR DRBG."""
+
+        return self._block_cipher
+
+    def _instantiate_algorithm(self, entropy_input, nonce, personalization_string, security_strength,
+                               prediction_resistance_flag):
+        """The instantiate algorithm for the CTR DRBG. Instantiates a CTR DRBG state with requested security strength
+            and optional prediction resistance using the entropy input, nonce and personalization string.
+
+        Parameters
+        ----------
+        entropy_input : bytes
+            The entropy input used for this instantiation.
+        nonce : bytes
+            The nonce used for this instantiation.
+        personalization_string : bytes
+            The personalization string used to personalize this instantiation.
+        security_strength : int
+            The requested security strength for this instantiation.
+        prediction_resistance_flag : bool
+            A flag used to request prediction resistance for this instantiation.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state : CTRDRBGState
+            The newly instantiated state.
+        """
+
+        seed_material = b''.join([entropy_input, nonce, personalization_string])
+        seed_material = self.__block_cipher_df(seed_material, self.__seedlen)
+        key, value = self.__update(seed_material, bytes(self.__keylen // 8), bytes(self.__blocklen // 8))
+        state = CTRDRBGState(value, key, 1, security_strength, prediction_resistance_flag)
+        return DRBGStatus.SUCCESS, state
+
+    def _reseed_algorithm(self, working_state, entropy_input, additional_input):
+        """The reseed algorithm for the CTR DRBG. Reseeds the given CTR DRBG state using the entropy input
+            and the additional input.
+
+        Parameters
+        ----------
+        working_state : CTRDRBGState
+            The instantiated state to reseed.
+        entropy_input: bytes
+            The entropy input used to reseed the state.
+        additional_input: bytes
+            The additional input used to personalize the reseed.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state : CTRDRBGState
+            The reseeded state.
+        """
+
+        seed_material = b''.join([bytes(entropy_input), bytes(additional_input)])
+        seed_material = self.__block_cipher_df(seed_material, self.__seedlen)
+        key, value = self.__update(seed_material, working_state.get_Key(), working_state.get_value())
+        state = CTRDRBGState(value, key, 1, working_state.security_strength, working_state.prediction_resistance_flag)
+        return DRBGStatus.SUCCESS, state
+
+    def _generate_algorithm(self, working_state, requested_number_of_bits, additional_input):
+        """The generate algorithm for the CTR DRBG. Generates a requested number of pseudo-random bits using
+            an instantiated state and additional input.
+
+        Parameters
+        ----------
+        working_state : CTRDRBGState
+            The instantiated state to use for bit generation.
+        requested_number_of_bits: int
+            The number of pseudo-random bits to generate.
+        additional_input: bytes
+            The additional input used to personalize the bit generation.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        pseudorandom_bits : bytes
+            Generated pseudo-random bits. Might be None.
+        state : CTRDRBGState
+            The new state to transition into after the bit generation. Might be None.
+        """
+
+        if working_state.reseed_counter > self._reseed_interval:
+            return DRBGStatus.RESEED_REQUIRED, None, None
+
+        if additional_input is not None and len(additional_input) > 0:
+            additional_input = self.__block_cipher_df(additional_input, self.__seedlen)
+            key, value = self.__update(additional_input, working_state.get_Key(), working_state.get_value())
+        else:
+            additional_input = bytes(self.__seedlen // 8)
+            key, value = working_state.get_Key(), working_state.get_value()
+
+        no_of_blocks = math.ceil(requested_number_of_bits / self.__blocklen)
+        temp, value = self.__ctr_blocks(key, value, no_of_blocks)
+        returned_bits = leftmost(temp, requested_number_of_bits)
+
+        key, value = self.__update(additional_input, key, value)
+        new_state = CTRDRBGState(value, key, working_state.reseed_counter + 1, working_state.security_strength,
+                                 working_state.prediction_resistance_flag)
+
+        return DRBGStatus.SUCCESS, returned_bits, new_state
+
+    def __ctr_blocks(self, key, value, no_of_blocks):
+        """Encrypts the next no_of_blocks increments of the counter value in a single CTR mode pass.
+            Returns the output blocks and the last counter value used."""
+
+        counter_modulus = 2**self.__blocklen
+        counter = (int.from_bytes(value, 'big') + 1) % counter_modulus
+        blocks_before_wrap = min(no_of_blocks, counter_modulus - counter)
+
+        cipher = AES.new(key, AES.MODE_CTR, nonce=b'', initial_value=counter)
+        output_blocks = cipher.encrypt(bytes(blocks_before_wrap * self.__blocklen // 8))
+        if blocks_before_wrap < no_of_blocks:
+            cipher = AES.new(key, AES.MODE_CTR, nonce=b'', initial_value=0)
+            output_blocks += cipher.encrypt(bytes((no_of_blocks - blocks_before_wrap) * self.__blocklen // 8))
+
+        last_value = ((counter + no_of_blocks - 1) % counter_modulus).to_bytes(self.__blocklen // 8, 'big')
+        return output_blocks, last_value
+
+    def __update(self, provided_data, key, value):
+        """Updates the internal state of the CTR DRBG using the provided data. Returns the new key and value."""
+
+        temp, _ = self.__ctr_blocks(key, value, math.ceil(self.__seedlen / self.__blocklen))
+        temp = int.from_bytes(leftmost(temp, self.__seedlen), 'big') ^ int.from_bytes(provided_data, 'big')
+        temp = temp.to_bytes(self.__seedlen // 8, 'big')
+        return temp[:self.__keylen // 8], temp[self.__keylen // 8:]
+
+    def __bcc(self, key, data):
+        """Chains the encryption of all data blocks and returns the last output block."""
+
+        return AES.new(key, AES.MODE_CBC, iv=bytes(self.__blocklen // 8)).encrypt(data)[-(self.__blocklen // 8):]
+
+    def __block_cipher_df(self, input_string, no_of_bits_to_return):
+        """Block cipher derivation function used to compress an input string and return the requested number of bits."""
+
+        outlen = self.__blocklen // 8
+        S = b''.join([int_to_bytes(len(input_string), 4), int_to_bytes(no_of_bits_to_return // 8, 4),
+                      input_string, bytes([0x80])])
+        S += bytes(-len(S) % outlen)
+
+        temp = bytearray()
+        K = leftmost(bytes(range(32)), self.__keylen)
+        i = 0
+        while len(temp) * 8 < self.__keylen + self.__blocklen:
+            IV = b''.join([int_to_bytes(i, 4), bytes(outlen - 4)])
+            temp += bytearray(self.__bcc(K, b''.join([IV, S])))
+            i += 1
+
+        K = bytes(temp[:self.__keylen // 8])
+        X = bytes(temp[self.__keylen // 8:self.__keylen // 8 + outlen])
+        no_of_blocks = math.ceil(no_of_bits_to_return / self.__blocklen)
+        temp = AES.new(K, AES.MODE_CBC, iv=X).encrypt(bytes(no_of_blocks * outlen))
+
+        requested_bits = leftmost(temp, no_of_bits_to_return)
+        return requested_bits
+
+    def test_instantiate(self):
+        """Performs known-answer testing on the instantiate algorithm implementation for the CTR DRBG."""
+
+        conn = sqlite3.connect('kat/kat_ctr_instantiate.db')
+        cursor = conn.execute("SELECT ID,ENTROPY,NONCE,PESTR,SESTR,VAL,KEY from " +
+                              re.sub(r'[^a-zA-Z0-9]', '', self._block_cipher))
+        prediction_resistance_flag = True
+
+        for row in cursor:
+            entropy = row[1]
+            nonce = row[2]
+            personalization_string = row[3]
+            security_strength = row[4]
+            V = row[5]
+            Key = row[6]
+
+            status, state = self._instantiate_algorithm(entropy, nonce, personalization_string, security_strength,
+                                                        prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            if not bytes_equal(state.get_value(), V) or not bytes_equal(state.get_Key(), Key) or \
+                    state.reseed_counter != 1 or state.security_strength != security_strength or \
+                    state.prediction_resistance_flag is not True:
+                self.trigger_catastrophic_error()
+                return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+
+        conn.close()
+        return DRBGStatus.SUCCESS
+
+    def test_reseed(self):
+        """Performs known-answer testing on the reseed algorithm implementation for the CTR DRBG."""
+
+        conn = sqlite3.connect('kat/kat_ctr_reseed.db')
+        cursor = conn.execute("SELECT ID,ENTROPY,ADDIN,VAL,KEY,SESTR,NEWVAL,NEWKEY from " +
+                              re.sub(r'[^a-zA-Z0-9]', '', self._block_cipher))
+        prediction_resistance_flag = True
+
+        for row in cursor:
+            entropy = row[1]
+            additional_input = row[2]
+            V_in = row[3]
+            Key_in = row[4]
+            security_strength = row[5]
+            V = row[6]
+            Key = row[7]
+
+            working_state = CTRDRBGState(V_in, Key_in, random.choice(range(512)), security_strength,
+                                         prediction_resistance_flag)
+            status, new_state = self._reseed_algorithm(working_state, entropy, additional_input)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            if not bytes_equal(new_state.get_value(), V) or not bytes_equal(new_state.get_Key(), Key) or \
+                    new_state.reseed_counter != 1 or new_state.security_strength != security_strength or \
+                    new_state.prediction_resistance_flag is not True:
+                self.trigger_catastrophic_error()
+                return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+
+        conn.close()
+        return DRBGStatus.SUCCESS
+
+    def test_generate(self, generate_algorithm=None):
+        """Performs known-answer testing on the generate algorithm implementation for the CTR DRBG, or on the given
+            function with the signature of _generate_algorithm."""
+
+        if generate_algorithm is None:
+            generate_algorithm = self._generate_algorithm
+
+        vectors = self._generate_test_vectors('kat/kat_ctr_generate.db',
+                                              "ID,ADDIN,VAL,KEY,SESTR,REQBITS,RESEED,BITS,NEWVAL,NEWKEY",
+                                              re.sub(r'[^a-zA-Z0-9]', '', self._block_cipher))
+        prediction_resistance_flag = True
+
+        for row in vectors:
+            additional_input = row[1]
+            V_in = row[2]
+            Key_in = row[3]
+            security_strength = row[4]
+            requested_number_of_bits = row[5]
+            reseed_counter = row[6]
+            generated_bits = row[7]
+            V = row[8]
+            Key = row[9]
+
+            working_state = CTRDRBGState(V_in, Key_in, reseed_counter, security_strength, prediction_resistance_flag)
+
+            status, returned_bits, new_state = generate_algorithm(working_state, requested_number_of_bits,
+                                                                  additional_input)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            if not bytes_equal(returned_bits, generated_bits) or not bytes_equal(new_state.get_value(), V) or \
+                    not bytes_equal(new_state.get_Key(), Key) or new_state.reseed_counter != reseed_counter + 1 or \
+                    new_state.security_strength != security_strength or \
+                    new_state.prediction_resistance_flag is not True:
+                self.trigger_catastrophic_error()
+                return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+
+        return DRBGStatus.SUCCESS
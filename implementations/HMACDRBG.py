@@ -0,0 +1,311 @@
+import math
+import random
+import re
+import sqlite3
+from Crypto.Hash import HMAC, SHA224, SHA512, SHA3_224, SHA256, SHA3_256, SHA384, SHA3_384, SHA3_512
+
+from helpers.general_helpers import leftmost, bytes_equal
+from helpers.DRBG_status import DRBGStatus
+from helpers.DRBG_states import HMACDRBGState
+from DRBG import DRBG
+
+
+class HMACDRBG(DRBG):
+    def __init__(self, hash_function):
+        """Initializes an HMAC-based DRBG.
+
+        Parameters
+        ----------
+        hash_function : str
+            The name of the hash function to use. Supports SHA-224, SHA-512/224, SHA3-224, SHA-256, SHA-512/256,
+            SHA3-256, SHA-384, SHA3-384, SHA-512, SHA3-512. SHA-1 is not supported, as there are no known answer
+            tests for the health test run on initialization.
+        """
+
+        self._hash_function = hash_function.upper()
+        self.__hash_implementation = None
+        self.__keyed_hash = (None, None)
+
+        if self._hash_function in ["SHA-224", "SHA-512/224", "SHA3-224"]:
+            highest_supported_security_strength = 192
+            self.__outlen = 224
+            if self._hash_function == "SHA-224":
+                self.__hash_implementation = SHA224
+            elif self._hash_function == "SHA-512/224":
+                self.__hash_implementation = SHA512.new(truncate="224")
+            else:
+                self.__hash_implementation = SHA3_224
+
+        elif self._hash_function in ["SHA-256", "SHA-512/256", "SHA3-256"]:
+            highest_supported_security_strength = 256
+            self.__outlen = 256
+            if self._hash_function == "SHA-256":
+                self.__hash_implementation = SHA256
+            elif self._hash_function == "SHA-512/256":
+                self.__hash_implementation = SHA512.new(truncate="256")
+            else:
+                self.__hash_implementation = SHA3_256
+
+        elif self._hash_function in ["SHA-384", "SHA3-384"]:
+            highest_supported_security_strength = 256
+            self.__outlen = 384
+            if self._hash_function == "SHA-384":
+                self.__hash_implementation = SHA384
+            else:
+                self.__hash_implementation = SHA3_384
+
+        elif self._hash_function in ["SHA-512", "SHA3-512"]:
+            highest_supported_security_strength = 256
+            self.__outlen = 512
+            if self._hash_function == "SHA-512":
+                self.__hash_implementation = SHA512
+            else:
+                self.__hash_implementation = SHA3_512
+
+        else:
+            print("Hash function " + self._hash_function + " is not supported.")
+            return
+
+        self._reseed_interval = 2**48
+        max_personalization_string_length = 2**35
+        max_additional_input_length = 2**35
+        max_number_of_bits_per_request = 2**19
+        max_length = 2**35
+
+        super().__init__("HMACDRBG", highest_supported_security_strength, max_personalization_string_length,
+                         max_additional_input_length, max_number_of_bits_per_request, 112, max_length)
+
+    def get_hash_function(self):
+        """Returns the name of the hash function used by this HMAC DRBG."""
+
+        return self._hash_function
+
+    def _instantiate_algorithm(self, entropy_input, nonce, personalization_string, security_strength,
+                               prediction_resistance_flag):
+        """The instantiate algorithm for the HMAC DRBG. Instantiates an HMAC DRBG state with requested security
+            strength and optional prediction resistance using the entropy input, nonce and personalization string.
+
+        Parameters
+        ----------
+        entropy_input : bytes
+            The entropy input used for this instantiation.
+        nonce : bytes
+            The nonce used for this instantiation.
+        personalization_string : bytes
+            The personalization string used to personalize this instantiation.
+        security_strength : int
+            The requested security strength for this instantiation.
+        prediction_resistance_flag : bool
+            A flag used to request prediction resistance for this instantiation.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state : HMACDRBGState
+            The newly instantiated state.
+        """
+
+        seed_material = b''.join([entropy_input, nonce, personalization_string])
+        key = bytes(self.__outlen // 8)
+        value = bytes([1]) * (self.__outlen // 8)
+        key, value = self.__update(seed_material, key, value)
+        state = HMACDRBGState(value, key, 1, security_strength, prediction_resistance_flag)
+        return DRBGStatus.SUCCESS, state
+
+    def _reseed_algorithm(self, working_state, entropy_input, additional_input):
+        """The reseed algorithm for the HMAC DRBG. Reseeds the given HMAC DRBG state using the entropy input
+            and the additional input.
+
+        Parameters
+        ----------
+        working_state : HMACDRBGState
+            The instantiated state to reseed.
+        entropy_input: bytes
+            The entropy input used to reseed the state.
+        additional_input: bytes
+            The additional input used to personalize the reseed.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state : HMACDRBGState
+            The reseeded state.
+        """
+
+        seed_material = b''.join([bytes(entropy_input), bytes(additional_input)])
+        key, value = self.__update(seed_material, working_state.get_Key(), working_state.get_value())
+        state = HMACDRBGState(value, key, 1, working_state.security_strength,
+                              working_state.prediction_resistance_flag)
+        return DRBGStatus.SUCCESS, state
+
+    def _generate_algorithm(self, working_state, requested_number_of_bits, additional_input):
+        """The generate algorithm for the HMAC DRBG. Generates a requested number of pseudo-random bits using
+            an instantiated state and additional input.
+
+        Parameters
+        ----------
+        working_state : HMACDRBGState
+            The instantiated state to use for bit generation.
+        requested_number_of_bits: int
+            The number of pseudo-random bits to generate.
+        additional_input: bytes
+            The additional input used to personalize the bit generation.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        pseudorandom_bits : bytes
+            Generated pseudo-random bits. Might be None.
+        state : HMACDRBGState
+            The new state to transition into after the bit generation. Might be None.
+        """
+
+        if working_state.reseed_counter > self._reseed_interval:
+            return DRBGStatus.RESEED_REQUIRED, None, None
+
+        if additional_input is not None and len(additional_input) > 0:
+            key, value = self.__update(additional_input, working_state.get_Key(), working_state.get_value())
+        else:
+            additional_input = bytes(0)
+            key, value = working_state.get_Key(), working_state.get_value()
+
+        keyed_hash = self.__get_keyed_hash(key)
+        temp = bytearray()
+        for i in range(math.ceil(requested_number_of_bits / self.__outlen)):
+            value = keyed_hash.copy().update(value).digest()
+            temp += bytearray(value)
+
+        returned_bits = leftmost(bytes(temp), requested_number_of_bits)
+        key, value = self.__update(additional_input, key, value)
+        new_state = HMACDRBGState(value, key, working_state.reseed_counter + 1, working_state.security_strength,
+                                  working_state.prediction_resistance_flag)
+
+        return DRBGStatus.SUCCESS, returned_bits, new_state
+
+    def __get_keyed_hash(self, key):
+        """Returns an HMAC object set up with the key. The object is cached for the last key and must only be used
+            through copies, so the key schedule is not rebuilt for every message authenticated with the same key."""
+
+        cached_key, keyed_hash = self.__keyed_hash
+        if cached_key != key:
+            keyed_hash = HMAC.new(key, digestmod=self.__hash_implementation)
+            self.__keyed_hash = (key, keyed_hash)
+
+        return keyed_hash
+
+    def __update(self, provided_data, key, value):
+        """Updates the internal state of the HMAC DRBG using the provided data. Returns the new key and value."""
+
+        key = self.__get_keyed_hash(key).copy().update(b''.join([value, bytes(1), provided_data])).digest()
+        keyed_hash = self.__get_keyed_hash(key)
+        value = keyed_hash.copy().update(value).digest()
+        if len(provided_data) == 0:
+            return key, value
+
+        key = keyed_hash.copy().update(b''.join([value, bytes([1]), provided_data])).digest()
+        value = self.__get_keyed_hash(key).copy().update(value).digest()
+        return key, value
+
+    def test_instantiate(self):
+        """Performs known-answer testing on the instantiate algorithm implementation for the HMAC DRBG."""
+
+        conn = sqlite3.connect('kat/kat_hmac_instantiate.db')
+        cursor = conn.execute("SELECT ID,ENTROPY,NONCE,PESTR,SESTR,VAL,KEY from " +
+                              re.sub(r'[^a-zA-Z0-9]', '', self._hash_function))
+        prediction_resistance_flag = True
+
+        for row in cursor:
+            entropy = row[1]
+            nonce = row[2]
+            personalization_string = row[3]
+            security_strength = row[4]
+            V = row[5]
+            Key = row[6]
+
+            status, state = self._instantiate_algorithm(entropy, nonce, personalization_string, security_strength,
+                                                        prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            if not bytes_equal(state.get_value(), V) or not bytes_equal(state.get_Key(), Key) or \
+                    state.reseed_counter != 1 or state.security_strength != security_strength or \
+                    state.prediction_resistance_flag is not True:
+                self.trigger_catastrophic_error()
+                return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+
+        conn.close()
+        return DRBGStatus.SUCCESS
+
+    def test_reseed(self):
+        """Performs known-answer testing on the reseed algorithm implementation for the HMAC DRBG."""
+
+        conn = sqlite3.connect('kat/kat_hmac_reseed.db')
+        cursor = conn.execute("SELECT ID,ENTROPY,ADDIN,VAL,KEY,SESTR,NEWVAL,NEWKEY from " +
+                              re.sub(r'[^a-zA-Z0-9]', '', self._hash_function))
+        prediction_resistance_flag = True
+
+        for row in cursor:
+            entropy = row[1]
+            additional_input = row[2]
+            V_in = row[3]
+            Key_in = row[4]
+            security_strength = row[5]
+            V = row[6]
+            Key = row[7]
+
+            working_state = HMACDRBGState(V_in, Key_in, random.choice(range(512)), security_strength,
+                                          prediction_resistance_flag)
+            status, new_state = self._reseed_algorithm(working_state, entropy, additional_input)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            if not bytes_equal(new_state.get_value(), V) or not bytes_equal(new_state.get_Key(), Key) or \
+                    new_state.reseed_counter != 1 or new_state.security_strength != security_strength or \
+                    new_state.prediction_resistance_flag is not True:
+                self.trigger_catastrophic_error()
+                return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+
+        conn.close()
+        return DRBGStatus.SUCCESS
+
+    def test_generate(self, generate_algorithm=None):
+        """Performs known-answer testing on the generate algorithm implementation for the HMAC DRBG, or on the given
+            function with the signature of _generate_algorithm."""
+
+        if generate_algorithm is None:
+            generate_algorithm = self._generate_algorithm
+
+        vectors = self._generate_test_vectors('kat/kat_hmac_generate.db',
+                                              "ID,ADDIN,VAL,KEY,SESTR,REQBITS,RESEED,BITS,NEWVAL,NEWKEY",
+                                              re.sub(r'[^a-zA-Z0-9]', '', self._hash_function))
+        prediction_resistance_flag = True
+
+        for row in vectors:
+            additional_input = row[1]
+            V_in = row[2]
+            Key_in = row[3]
+            security_strength = row[4]
+            requested_number_of_bits = row[5]
+            reseed_counter = row[6]
+            generated_bits = row[7]
+            V = row[8]
+            Key = row[9]
+
+            working_state = HMACDRBGState(V_in, Key_in, reseed_counter, security_strength, prediction_resistance_flag)
+
+            status, returned_bits, new_state = generate_algorithm(working_state, requested_number_of_bits,
+                                                                  additional_input)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            if not bytes_equal(returned_bits, generated_bits) or not bytes_equal(new_state.get_value(), V) or \
+                    not bytes_equal(new_state.get_Key(), Key) or new_state.reseed_counter != reseed_counter + 1 or \
+                    new_state.security_strength != security_strength or \
+                    new_state.prediction_resistance_flag is not True:
+                self.trigger_catastrophic_error()
+                return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+
+        return DRBGStatus.SUCCESS
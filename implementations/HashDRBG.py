@@ -1,4 +1,6 @@
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 import random
 import re
 import sqlite3
@@ -7,6 +9,8 @@ from Crypto.Hash import SHA1, SHA224, SHA512, SHA3_224, SHA256, SHA3_256, SHA384
 from helpers.general_helpers import sum_bytes, sum_bytes_multi, int_to_bytes, leftmost, bytes_equal
 from helpers.DRBG_status import DRBGStatus
 from helpers.DRBG_states import HashDRBGState
+from helpers.state_snapshot import pack_hash_states, unpack_hash_states, consume_snapshot
+from helpers.state_store import MappedHashStateStore, SharedHashStateStore
 from DRBG import DRBG
 
 
@@ -23,6 +27,9 @@ class HashDRBG(DRBG):
 
         self._hash_function = hash_function.upper()
         self.__hash_implementation = None
+        self.__hashgen_executor = None
+        self.__hashgen_workers = 1
+        self.__parallel_min_bits = 0
 
         if self._hash_function == "SHA-1":
             highest_supported_security_strength = 80
@@ -89,6 +96,161 @@ class HashDRBG(DRBG):
 
         return self._hash_function
 
+    def enable_parallel_hashgen(self, workers=None, min_bits=2**16):
+        """Enables block-parallel generation for large requests. The blocks of a request are independent, so
+            requests of at least min_bits bits are split into one range of blocks per worker thread, hashed
+            concurrently and assembled in order. The output is identical to sequential generation.
+
+        Parameters
+        ----------
+        workers : int, optional
+            The number of worker threads. Defaults to the number of CPUs.
+        min_bits : int
+            The smallest request generated in parallel.
+        """
+
+        self.disable_parallel_hashgen()
+        self.__hashgen_workers = workers if workers is not None else os.cpu_count() or 1
+        self.__hashgen_executor = ThreadPoolExecutor(max_workers=self.__hashgen_workers)
+        self.__parallel_min_bits = min_bits
+
+    def disable_parallel_hashgen(self):
+        """Disables block-parallel generation and shuts down its worker threads."""
+
+        if self.__hashgen_executor is not None:
+            self.__hashgen_executor.shutdown()
+        self.__hashgen_executor = None
+        self.__hashgen_workers = 1
+
+    def use_mapped_state_store(self, path, capacity):
+        """Keeps the states of this hash DRBG instance in a memory-mapped file instead of the in-process table.
+
+        Parameters
+        ----------
+        path : str
+            The path of the store file. An existing store file is reopened with its saved states.
+        capacity : int
+            The maximum number of instantiated states.
+
+        Returns
+        -------
+        state_store : MappedHashStateStore
+            The opened store, which should be closed once the DRBG is no longer used.
+        """
+
+        state_store = MappedHashStateStore(path, self.__seedlen, capacity)
+        self.set_state_store(state_store)
+        return state_store
+
+    def use_shared_state_store(self, capacity=None, attach_arguments=None):
+        """Keeps the states of this hash DRBG instance in a table in shared memory, so they can be used by all
+            worker processes attached to it.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            The maximum number of instantiated states of a newly created table.
+        attach_arguments : tuple, optional
+            The result of get_attach_arguments of an existing table, used by worker processes to attach to it.
+
+        Returns
+        -------
+        state_store : SharedHashStateStore
+            The created or attached table, which should be closed once the DRBG is no longer used.
+        """
+
+        if attach_arguments is not None:
+            state_store = SharedHashStateStore(*attach_arguments)
+        else:
+            state_store = SharedHashStateStore(self.__seedlen, capacity)
+        self.set_state_store(state_store)
+        return state_store
+
+    def save_states(self, path, key, state_handles=None):
+        """Writes a compact authenticated snapshot of instantiated states to a file and uninstantiates them,
+            so the saved states can only continue in the process that restores them.
+
+        Parameters
+        ----------
+        path : str
+            The path of the snapshot file.
+        key : bytes
+            The key used to authenticate the snapshot.
+        state_handles : list, optional
+            Handles of the states to save, which must be owned by this instance. All states instantiated, spawned or
+            restored by this instance, or all states of its state store, are saved if not provided.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        """
+
+        states = self._export_states(state_handles)
+        if state_handles is not None and len(states) != len(state_handles):
+            return DRBGStatus.ERROR_FLAG
+
+        snapshot = pack_hash_states(self._DRBG_type + " " + self._hash_function, self.__seedlen, states, key)
+        with open(path + ".tmp", "wb") as f:
+            f.write(snapshot)
+        os.replace(path + ".tmp", path)
+
+        for state_handle in states.keys():
+            self.uninstantiate(state_handle)
+        return DRBGStatus.SUCCESS
+
+    def restore_states(self, path, key, journal_path=None):
+        """Restores the states of a snapshot file written by save_states, under their original handles where those
+            are free and under new handles otherwise. Before the states are returned, the snapshot is recorded as
+            consumed in a journal file, and the snapshot file is removed. A snapshot is never restored twice in the
+            same process, nor by any process using the same journal, which also covers copies of the file and files
+            left behind by a crash before their removal. Copies restored with another journal are not detected.
+
+        Parameters
+        ----------
+        path : str
+            The path of the snapshot file.
+        key : bytes
+            The key used to authenticate the snapshot.
+        journal_path : str, optional
+            The path of the journal of consumed snapshots. Defaults to the snapshot path with a .consumed suffix.
+
+        Returns
+        -------
+        status : DRBGStatus
+            One of the defined DRBG status flags.
+        state_handles : list
+            Handles of the restored states, in the order they were saved. Might be None.
+        """
+
+        if self.has_catastrophic_error():
+            return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None
+
+        try:
+            with open(path, "rb") as f:
+                snapshot = f.read()
+        except OSError:
+            return DRBGStatus.ERROR_FLAG, None
+
+        if journal_path is None:
+            journal_path = path + ".consumed"
+        status, states, snapshot_id = unpack_hash_states(snapshot, self._DRBG_type + " " + self._hash_function,
+                                                         self.__seedlen, key, journal_path)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        status, state_handles = self._import_states(states)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+
+        status = consume_snapshot(snapshot_id, journal_path)
+        if status != DRBGStatus.SUCCESS:
+            for state_handle in state_handles:
+                self.uninstantiate(state_handle)
+            return status, None
+        os.remove(path)
+        return DRBGStatus.SUCCESS, state_handles
+
     def _instantiate_algorithm(self, entropy_input, nonce, personalization_string, security_strength,
                                prediction_resistance_flag):
         """The instantiate algorithm for the hash DRBG. Instantiates a hash DRBG state with requested security strength
@@ -175,20 +337,33 @@ class HashDRBG(DRBG):
         if working_state.reseed_counter > self._reseed_interval:
             return DRBGStatus.RESEED_REQUIRED, None, None
 
+        V, returned_bits = self._generate_output(working_state, requested_number_of_bits, additional_input)
+        return DRBGStatus.SUCCESS, returned_bits, self._finalize_state(working_state, V)
+
+    def _generate_output(self, working_state, requested_number_of_bits, additional_input):
+        """The first half of the generate algorithm, producing the pseudo-random bits. Returns the value V updated
+            with the additional input, needed to finalize the next state, and the pseudo-random bits."""
+
         if additional_input is not None and len(additional_input) > 0:
             w = self.__hash(b''.join([bytes([2]), working_state.get_value(), additional_input]))
             V = sum_bytes(working_state.get_value(), w, True)
         else:
             V = working_state.get_value()
 
-        returned_bits = self.__hashgen(requested_number_of_bits, V)
+        return V, self.__hashgen(requested_number_of_bits, V)
+
+    def _finalize_state(self, working_state, V):
+        """The second half of the generate algorithm, returning the state to transition into after the bit generation
+            from the value V returned by _generate_output."""
+
         H = self.__hash(b''.join([bytes([3]), V]))
         new_value = sum_bytes_multi([V, H, working_state.get_C(), working_state.reseed_counter.
                                     to_bytes(int(math.log2(self._reseed_interval) + 1), 'big')], True)
         new_state = HashDRBGState(new_value, working_state.get_C(), working_state.reseed_counter + 1,
-                                  working_state.security_strength, working_state.prediction_resistance_flag)
+                                  working_state.security_strength, working_state.prediction_resistance_flag,
+                                  working_state.constant_bits)
 
-        return DRBGStatus.SUCCESS, returned_bits, new_state
+        return new_state
 
     def __hash(self, input_string):
         """Returns the digest of the input string digest using the selected hash function."""
@@ -222,15 +397,33 @@ class HashDRBG(DRBG):
         """Auxiliary function used to generate the requested number of bits using a value"""
 
         m = math.ceil(requested_number_of_bits/self.__outlen)
-        data = value
-        W = bytearray()
-        for i in range(m):
-            w = self.__hash(data)
-            W += bytearray(w)
-            data = sum_bytes(data, bytes([1]), True)
-
-        returned_bits = leftmost(bytes(W), requested_number_of_bits)
-        return returned_bits
+        if self.__hashgen_executor is None or requested_number_of_bits < self.__parallel_min_bits:
+            return leftmost(self.__hashgen_blocks(value, 0, m), requested_number_of_bits)
+
+        outlen_bytes = self.__outlen // 8
+        W = bytearray(m * outlen_bytes)
+        ranges_count = min(self.__hashgen_workers, m)
+        bounds = [m * r // ranges_count for r in range(ranges_count + 1)]
+        futures = [self.__hashgen_executor.submit(self.__hashgen_blocks, value, bounds[r], bounds[r + 1] - bounds[r])
+                   for r in range(ranges_count)]
+        for r in range(ranges_count):
+            W[bounds[r] * outlen_bytes:bounds[r + 1] * outlen_bytes] = futures[r].result()
+
+        return leftmost(bytes(W), requested_number_of_bits)
+
+    def __hashgen_blocks(self, value, first_block, no_of_blocks):
+        """Returns the concatenated blocks first_block to first_block + no_of_blocks - 1 of hashgen, where block i
+            is the hash of (value + i) mod 2^seedlen."""
+
+        seedlen_bytes = len(value)
+        modulus = 1 << (8 * seedlen_bytes)
+        data = int.from_bytes(value, 'big') + first_block
+        blocks = []
+        for i in range(no_of_blocks):
+            blocks.append(self.__hash((data % modulus).to_bytes(seedlen_bytes, 'big')))
+            data += 1
+
+        return b''.join(blocks)
 
     def test_instantiate(self):
         """Performs known-answer testing on the instantiate algorithm implementation for the hash DRBG."""
@@ -293,15 +486,19 @@ class HashDRBG(DRBG):
         conn.close()
         return DRBGStatus.SUCCESS
 
-    def test_generate(self):
-        """Performs known-answer testing on the generate algorithm implementation for the hash DRBG."""
+    def test_generate(self, generate_algorithm=None):
+        """Performs known-answer testing on the generate algorithm implementation for the hash DRBG, or on the given
+            function with the signature of _generate_algorithm."""
 
-        conn = sqlite3.connect('kat/kat_hash_generate.db')
-        cursor = conn.execute("SELECT ID,ADDIN,VAL,CONST,SESTR,REQBITS,RESEED,BITS,NEWVAL,NEWCONST from " +
-                              re.sub(r'[^a-zA-Z0-9]', '', self._hash_function))
+        if generate_algorithm is None:
+            generate_algorithm = self._generate_algorithm
+
+        vectors = self._generate_test_vectors('kat/kat_hash_generate.db',
+                                              "ID,ADDIN,VAL,CONST,SESTR,REQBITS,RESEED,BITS,NEWVAL,NEWCONST",
+                                              re.sub(r'[^a-zA-Z0-9]', '', self._hash_function))
         prediction_resistance_flag = True
 
-        for row in cursor:
+        for row in vectors:
             additional_input = row[1]
             V_in = row[2]
             C_in = row[3]
@@ -315,8 +512,8 @@ class HashDRBG(DRBG):
             working_state = HashDRBGState(V_in, C_in, reseed_counter, security_strength,
                                           prediction_resistance_flag)
 
-            status, returned_bits, new_state = self._generate_algorithm(working_state, requested_number_of_bits,
-                                                                        additional_input)
+            status, returned_bits, new_state = generate_algorithm(working_state, requested_number_of_bits,
+                                                                  additional_input)
             if status != DRBGStatus.SUCCESS:
                 return status
 
@@ -327,5 +524,4 @@ class HashDRBG(DRBG):
                 self.trigger_catastrophic_error()
                 return DRBGStatus.CATASTROPHIC_ERROR_FLAG
 
-        conn.close()
         return DRBGStatus.SUCCESS
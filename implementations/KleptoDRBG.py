@@ -0,0 +1,121 @@
+from Crypto.Hash import HMAC, SHA512
+import math
+
+from implementations.HMACDRBG import HMACDRBG
+from implementations.CTRDRBG import CTRDRBG
+from implementations.KleptoHashDRBG import constant_bit_index, score_leaks
+from helpers.DRBG_status import DRBGStatus
+from helpers.DRBG_states import HashDRBGState
+from helpers.general_helpers import sum_bytes
+
+
+def leak_secret(working_state):
+    """Returns the part of a state leaked by the kleptographic subversion, which stays fixed between reseeds, so the
+        bits leaked by successive outputs accumulate towards one secret. This is the constant C for hash DRBG states.
+        The key of HMAC and CTR DRBG states changes with every request, so the key the state was instantiated or
+        reseeded with is leaked instead, or the current key of a state not seeded by a subversion."""
+
+    if isinstance(working_state, HashDRBGState):
+        return working_state.get_C()
+    elif working_state.seed_key is not None:
+        return working_state.seed_key
+    else:
+        return working_state.get_Key()
+
+
+class KleptoDRBG:
+    """Rejection-sampling subversion of the generate algorithm of any DRBG implementation. Must be listed before
+        the subverted DRBG class in the bases of the inheriting class, e.g. KleptoDRBG, HMACDRBG."""
+
+    def __init__(self, parameter, pkey=bytes([72, 68, 56, 154]), extra_attempts=8, leaked_bits=2):
+        """Initializes a subverted DRBG.
+
+        Parameters
+        ----------
+        parameter : str
+            The parameter of the subverted DRBG, e.g. the name of its hash function or block cipher.
+        pkey : bytes
+            The key used to decode the leaked bits from the generated output.
+        extra_attempts : int
+            The number of additional candidate outputs generated for each request.
+        leaked_bits : int
+            The number of secret bits leaked by each generated output.
+        """
+
+        self.__pkey = HMAC.new(pkey, digestmod=SHA512)
+        self.__max_attempts = extra_attempts + 1
+        self.__lbatch_count = math.ceil(leaked_bits / 8)
+        self.__final_lbatch_size = leaked_bits - (self.__lbatch_count - 1) * 8
+        self.__secret_index = (None, None)
+
+        super().__init__(parameter)
+
+    def _instantiate_algorithm(self, entropy_input, nonce, personalization_string, security_strength,
+                               prediction_resistance_flag):
+        status, state = super()._instantiate_algorithm(entropy_input, nonce, personalization_string,
+                                                       security_strength, prediction_resistance_flag)
+        if status == DRBGStatus.SUCCESS and not isinstance(state, HashDRBGState):
+            state.seed_key = state.get_Key()
+        return status, state
+
+    def _reseed_algorithm(self, working_state, entropy_input, additional_input):
+        status, state = super()._reseed_algorithm(working_state, entropy_input, additional_input)
+        if status == DRBGStatus.SUCCESS and not isinstance(state, HashDRBGState):
+            state.seed_key = state.get_Key()
+        return status, state
+
+    def _generate_algorithm(self, working_state, requested_number_of_bits, additional_input):
+        """The subverted generate algorithm. Generates candidate outputs of the subverted algorithm with different
+            additional inputs and returns the one leaking the most secret bits."""
+
+        secret_bits = self.__secret_bits(leak_secret(working_state))
+        full_t = 8 * (self.__lbatch_count - 1) + self.__final_lbatch_size
+        coins = additional_input
+
+        best_t = -1
+        best_block = None
+        new_state = None
+
+        for attempt in range(self.__max_attempts):
+            status, bits, next_state = super()._generate_algorithm(working_state, requested_number_of_bits, coins)
+            if status != DRBGStatus.SUCCESS:
+                return status, None, None
+
+            decoded = self.__pkey.copy().update(bits).digest()
+            t = score_leaks(decoded, secret_bits, self.__lbatch_count, self.__final_lbatch_size)
+
+            if t > best_t:
+                best_block = bits
+                best_t = t
+                new_state = next_state
+
+            if t == full_t:
+                break
+            coins = sum_bytes(coins, bytes([1]))
+
+        if not isinstance(new_state, HashDRBGState):
+            new_state.seed_key = working_state.seed_key
+        return DRBGStatus.SUCCESS, best_block, new_state
+
+    def __secret_bits(self, secret):
+        """Returns the bit index of the leaked secret, reusing the index of the previous request while the secret is
+            unchanged."""
+
+        indexed_secret, secret_bits = self.__secret_index
+        if indexed_secret != secret:
+            secret_bits = constant_bit_index(secret)
+            self.__secret_index = (secret, secret_bits)
+        return secret_bits
+
+    def test_generate(self, generate_algorithm=None):
+        """Performs known-answer testing on the honest generate algorithm of the subverted DRBG."""
+
+        return super().test_generate(super()._generate_algorithm)
+
+
+class KHMACDRBG(KleptoDRBG, HMACDRBG):
+    pass
+
+
+class KCTRDRBG(KleptoDRBG, CTRDRBG):
+    pass
@@ -1,138 +1,158 @@
 from Crypto.Hash import HMAC, SHA512
 import math
-import re
-import sqlite3
 
 from implementations.HashDRBG import HashDRBG
 from helpers.DRBG_status import DRBGStatus
 from helpers.DRBG_states import HashDRBGState
-from helpers.general_helpers import sum_bytes, bytes_equal, sum_bytes_multi, leftmost
+from helpers.general_helpers import sum_bytes
 
 
-class KHashDRBG1(HashDRBG):
-    def __init__(self, hash_function, pkey=bytes([72, 68, 56, 154]), extra_attempts=8, leaked_bits=2):
-        """Initializes a hash-based DRBG.
+def constant_bit_index(constant):
+    """Returns the bits of the constant C indexed from its least significant bit, as a bytes object of 0 and 1 values,
+        so the secret bit at leak location d_loc is a single lookup at index d_loc - 1."""
+
+    value = int.from_bytes(constant, "big")
+    return bytes((value >> i) & 1 for i in range(8 * len(constant)))
+
+
+def score_leaks(decoded, constant_bits, lbatch_count, final_lbatch_size):
+    """Returns the number of bits leaked by a candidate output that match the constant, given the HMAC of the output
+        under the subversion key and the bit index of the constant."""
+
+    t = 0
+    secret_length = len(constant_bits)
+    for b in range(lbatch_count):
+        lbatch = int.from_bytes(decoded[b * 11:(b + 1) * 11], "big")
+        if b < lbatch_count - 1:
+            lbatch_size = 8
+        else:
+            lbatch_size = final_lbatch_size
+
+        for d in range(lbatch_size):
+            if constant_bits[((lbatch >> (78 - 10 * d)) & 1023) % secret_length] == (lbatch >> (7 - d)) & 1:
+                t += 1
+
+    return t
+
+
+class KleptoHashDRBG(HashDRBG):
+    def __init__(self, hash_function, pkey, extra_attempts, leaked_bits):
+        """Hash DRBG base class of the kleptographic subversions. Keeps the bit index of the constant C with each
+            state, built at instantiate and reseed, so candidate outputs are scored by integer lookups. Candidates are
+            generated and scored without their next state, which is finalized only for the chosen candidate.
 
         Parameters
         ----------
         hash_function : str
-            The name of the hash function to use. Supports SHA-224, SHA-512/224, SHA3-224, SHA-256, SHA-512/256,
-            SHA3-256, SHA-384, SHA3-384, SHA-512, SHA3-512. SHA-1 can be initialized, but will refuse to generate.
+            The name of the hash function to use.
+        pkey : bytes
+            The subversion key used to decode the leaked bits.
+        extra_attempts : int
+            The number of candidate outputs tried in addition to the honest one.
+        leaked_bits : int
+            The number of secret bits leaked by each output.
         """
 
+        self.__pkey = HMAC.new(pkey, digestmod=SHA512)
         self.__max_attempts = extra_attempts + 1
         self.__lbatch_count = math.ceil(leaked_bits / 8)
         self.__final_lbatch_size = leaked_bits - (self.__lbatch_count - 1) * 8
-        self.__pkey = pkey
+        self.__candidates = 0
+        self.__finalizations_saved = 0
 
         super().__init__(hash_function)
 
-    def _generate_algorithm(self, working_state, requested_number_of_bits, additional_input):
-        """The generate algorithm for the hash DRBG. Generates a requested number of pseudo-random bits using
-                    an instantiated state and additional input."""
-
-        hash_fun = self._HashDRBG__hash
-        const_binary = format(int.from_bytes(working_state.get_C(), "big"), "b").zfill(8*len(working_state.get_C()))
-        m = math.ceil(requested_number_of_bits / (2 * self.get_highest_supported_security_state()))
-        coins = additional_input
+    def _instantiate_algorithm(self, entropy_input, nonce, personalization_string, security_strength,
+                               prediction_resistance_flag):
+        status, state = super()._instantiate_algorithm(entropy_input, nonce, personalization_string,
+                                                       security_strength, prediction_resistance_flag)
+        if status == DRBGStatus.SUCCESS:
+            state.constant_bits = constant_bit_index(state.get_C())
+        return status, state
+
+    def _reseed_algorithm(self, working_state, entropy_input, additional_input):
+        status, state = super()._reseed_algorithm(working_state, entropy_input, additional_input)
+        if status == DRBGStatus.SUCCESS:
+            state.constant_bits = constant_bit_index(state.get_C())
+        return status, state
+
+    def _constant_bits(self, working_state):
+        """Returns the bit index of the constant of a state, building it for states loaded without one."""
+
+        if working_state.constant_bits is None:
+            working_state.constant_bits = constant_bit_index(working_state.get_C())
+        return working_state.constant_bits
+
+    def _select_candidate(self, working_state, requested_number_of_bits, coins):
+        """Generates candidate outputs with the coins as additional input, incrementing them after each candidate,
+            until one leaks all bits or the attempts run out. Returns the first candidate leaking the most bits and
+            the next state, finalized only for that candidate."""
+
+        constant_bits = self._constant_bits(working_state)
+        full_t = 8 * (self.__lbatch_count - 1) + self.__final_lbatch_size
         attempts = 0
 
         best_t = -1
         best_block = None
-        new_state = None
+        best_value = None
 
         while attempts < self.__max_attempts:
-            if working_state.reseed_counter > self._reseed_interval:
-                working_state.reseed_counter = 1
-
-            if coins is not None and len(coins) > 0:
-                w = hash_fun(b''.join([bytes([2]), working_state.get_value(), coins]))
-                V = sum_bytes(working_state.get_value(), w, True)
-            else:
-                V = working_state.get_value()
-
-            data = V
-            W = bytearray()
-            for i in range(m):
-                w = hash_fun(data)
-                W += bytearray(w)
-                data = sum_bytes(data, bytes([1]), True)
-
-            returned_bits = leftmost(bytes(W), requested_number_of_bits)
-            decoded = HMAC.new(self.__pkey, msg=returned_bits, digestmod=SHA512).digest()
-
-            t = 0
-            for b in range(self.__lbatch_count):
-                lbatch = format(int.from_bytes(decoded[b*11:(b+1)*11], "big"), "b").zfill(88)
-                if b < self.__lbatch_count - 1:
-                    lbatch_size = 8
-                else:
-                    lbatch_size = self.__final_lbatch_size
-
-                for d in range(lbatch_size):
-                    d_loc = (int(lbatch[d*10:(d+1)*10], 2) % (8*len(working_state.get_C()))) + 1
-                    d_value = int(lbatch[80+d])
-
-                    if int(const_binary[-d_loc]) == d_value:
-                        t += 1
+            V, returned_bits = self._generate_output(working_state, requested_number_of_bits, coins)
+            decoded = self.__pkey.copy().update(returned_bits).digest()
+            t = score_leaks(decoded, constant_bits, self.__lbatch_count, self.__final_lbatch_size)
 
             if t > best_t:
                 best_block = returned_bits
+                best_value = V
                 best_t = t
-                H = hash_fun(b''.join([bytes([3]), V]))
-                new_value = sum_bytes_multi([V, H, working_state.get_C(), working_state.reseed_counter.
-                                            to_bytes(int(math.log2(self._reseed_interval) + 1), 'big')], True)
-                new_state = HashDRBGState(new_value, working_state.get_C(), working_state.reseed_counter + 1,
-                                          working_state.security_strength, working_state.prediction_resistance_flag)
-
-            if t == 8 * (self.__lbatch_count - 1) + self.__final_lbatch_size:
-                break
 
             attempts += 1
+            if t == full_t:
+                break
             coins = sum_bytes(coins, bytes([1]))
 
-        return DRBGStatus.SUCCESS, best_block, new_state
+        self.__candidates += attempts
+        self.__finalizations_saved += attempts - 1
+        return best_block, self._finalize_state(working_state, best_value)
 
-    def test_generate(self):
-        """Performs known-answer testing on the generate algorithm implementation for the hash DRBG."""
+    def test_generate(self, generate_algorithm=None):
+        """Performs known-answer testing on the honest generate algorithm of the hash DRBG, which the subversions
+            override."""
 
-        conn = sqlite3.connect('kat/kat_hash_generate.db')
-        cursor = conn.execute("SELECT ID,ADDIN,VAL,CONST,SESTR,REQBITS,RESEED,BITS,NEWVAL,NEWCONST from " +
-                              re.sub(r'[^a-zA-Z0-9]', '', self._hash_function))
-        prediction_resistance_flag = True
+        return super().test_generate(super()._generate_algorithm)
 
-        for row in cursor:
-            additional_input = row[1]
-            V_in = row[2]
-            C_in = row[3]
-            security_strength = row[4]
-            requested_number_of_bits = row[5]
-            reseed_counter = row[6]
-            generated_bits = row[7]
-            V = row[8]
-            C = row[9]
+    def get_candidate_statistics(self):
+        """Returns the number of candidate outputs generated and the number of state finalizations skipped for the
+            candidates that were not chosen, each saving a hash and the additions of the state update."""
 
-            working_state = HashDRBGState(V_in, C_in, reseed_counter, security_strength,
-                                          prediction_resistance_flag)
+        return self.__candidates, self.__finalizations_saved
 
-            status, returned_bits, new_state = super()._generate_algorithm(working_state, requested_number_of_bits,
-                                                                           additional_input)
-            if status != DRBGStatus.SUCCESS:
-                return status
 
-            if not bytes_equal(returned_bits, generated_bits) or not bytes_equal(new_state.get_value(), V) or \
-                    not bytes_equal(new_state.get_C(), C) or new_state.reseed_counter != reseed_counter + 1 or \
-                    new_state.security_strength != security_strength or \
-                    new_state.prediction_resistance_flag is not True:
+class KHashDRBG1(KleptoHashDRBG):
+    def __init__(self, hash_function, pkey=bytes([72, 68, 56, 154]), extra_attempts=8, leaked_bits=2):
+        """Initializes a hash-based DRBG.
 
-                self.trigger_catastrophic_error()
-                return DRBGStatus.CATASTROPHIC_ERROR_FLAG
+        Parameters
+        ----------
+        hash_function : str
+            The name of the hash function to use. Supports SHA-224, SHA-512/224, SHA3-224, SHA-256, SHA-512/256,
+            SHA3-256, SHA-384, SHA3-384, SHA-512, SHA3-512. SHA-1 can be initialized, but will refuse to generate.
+        """
+
+        super().__init__(hash_function, pkey, extra_attempts, leaked_bits)
+
+    def _generate_algorithm(self, working_state, requested_number_of_bits, additional_input):
+        """The generate algorithm for the hash DRBG. Generates a requested number of pseudo-random bits using
+                    an instantiated state and additional input."""
 
-        conn.close()
-        return DRBGStatus.SUCCESS
+        if working_state.reseed_counter > self._reseed_interval:
+            working_state.reseed_counter = 1
+
+        best_block, new_state = self._select_candidate(working_state, requested_number_of_bits, additional_input)
+        return DRBGStatus.SUCCESS, best_block, new_state
 
 
-class KHashDRBG2(HashDRBG):
+class KHashDRBG2(KleptoHashDRBG):
     def __init__(self, hash_function, pkey=bytes([72, 68, 56, 154]), extra_attempts=32, leaked_bits=1):
         """Initializes a hash-based DRBG.
 
@@ -143,125 +163,21 @@ class KHashDRBG2(HashDRBG):
             SHA3-256, SHA-384, SHA3-384, SHA-512, SHA3-512. SHA-1 can be initialized, but will refuse to generate.
         """
 
-        self.__pkey = pkey
-        self.__max_attempts = extra_attempts + 1
-        self.__lbatch_count = math.ceil(leaked_bits / 8)
-        self.__final_lbatch_size = leaked_bits - (self.__lbatch_count - 1) * 8
+        super().__init__(hash_function, pkey, extra_attempts, leaked_bits)
 
-        super().__init__(hash_function)
+    def _generate_reseed_state(self, previous_state, reseeded_state):
+        """Continues a generate request that required a reseed from the state before the reseed, with its reseed
+            counter restarted, so the reseed does not change the constant leaked by the outputs."""
 
-    def generate(self, state_handle, requested_number_of_bits, requested_security_strength=None,
-                 prediction_resistance_request=None, additional_input=None):
-        """Generates pseudo-random bits using an instantiation.
+        return HashDRBGState(previous_state.get_value(), previous_state.get_C(), 1, previous_state.security_strength,
+                             previous_state.prediction_resistance_flag, previous_state.constant_bits)
 
-        Parameters
-        ----------
-        state_handle : int
-            A handle for the instantiated state used for bit generation.
-        requested_number_of_bits : int
-            The number of pseudo-random bits to generate.
-        requested_security_strength : int
-            The requested security strength for the bit generation..
-        prediction_resistance_request: bool
-            A flag used to request prediction resistance.
-        additional_input : bytes, optional
-            Optional bitstring used to personalize the bit generation.
-
-        Returns
-        -------
-        status : DRBGStatus
-            One of the defined DRBG status flags.
-        pseudorandom_bits : bytes
-            Generated pseudo-random bits. Might be None.
-        """
+    def _generate_algorithm(self, working_state, requested_number_of_bits, additional_input):
+        """The generate algorithm for the hash DRBG. Generates a requested number of pseudo-random bits using
+                    an instantiated state and additional input."""
 
-        if self.has_catastrophic_error():
-            return DRBGStatus.CATASTROPHIC_ERROR_FLAG, None
-
-        working_state = self._DRBG__load_state(state_handle)
-        if working_state is None:
-            return DRBGStatus.ERROR_FLAG, None
-
-        if requested_number_of_bits > self._max_number_of_bits_per_request:
-            return DRBGStatus.ERROR_FLAG, None
-
-        if requested_security_strength is None:
-            requested_security_strength = working_state.security_strength
-        elif requested_security_strength > working_state.security_strength:
-            return DRBGStatus.ERROR_FLAG, None
-
-        if additional_input is None:
-            additional_input = bytes(0)
-        elif len(additional_input) * 8 > self._max_additional_input_length:
-            return DRBGStatus.ERROR_FLAG, None
-
-        if prediction_resistance_request is None:
-            prediction_resistance_request = working_state.prediction_resistance_flag
-        elif prediction_resistance_request and not working_state.prediction_resistance_flag:
-            return DRBGStatus.ERROR_FLAG, None
-
-        reseed_required_flag = False
-        while True:
-            if reseed_required_flag or prediction_resistance_request:
-                status = self.reseed(state_handle, prediction_resistance_request, additional_input)
-                if status != DRBGStatus.SUCCESS:
-                    return status, None
-
-                additional_input = bytes(0)
-                reseed_required_flag = False
-                working_state = HashDRBGState(working_state.get_value(), working_state.get_C(), 1,
-                                              working_state.security_strength, working_state.prediction_resistance_flag)
-
-            const_binary = format(int.from_bytes(working_state.get_C(), "big"), "b").zfill(8*len(working_state.get_C()))
-            coins = additional_input
-            attempts = 0
-            t = 0
-
-            best_t = -1
-            best_block = None
-            new_state = None
-
-            while attempts < self.__max_attempts:
-                status, bits, next_state = super()._generate_algorithm(working_state, requested_number_of_bits, coins)
-                if status == DRBGStatus.RESEED_REQUIRED:
-                    reseed_required_flag = True
-                    prediction_resistance_flag = working_state.prediction_resistance_flag
-                    if prediction_resistance_flag:
-                        prediction_resistance_request = True
-                    break
-                elif status != DRBGStatus.SUCCESS:
-                    return status, None
-
-                decoded = HMAC.new(self.__pkey, msg=bits, digestmod=SHA512).digest()
-                t = 0
-                for b in range(self.__lbatch_count):
-                    lbatch = format(int.from_bytes(decoded[b * 11:(b + 1) * 11], "big"), "b").zfill(88)
-                    if b < self.__lbatch_count - 1:
-                        lbatch_size = 8
-                    else:
-                        lbatch_size = self.__final_lbatch_size
-
-                    for d in range(lbatch_size):
-                        d_loc = (int(lbatch[d * 10:(d + 1) * 10], 2) % (8 * len(working_state.get_C()))) + 1
-                        d_value = int(lbatch[80 + d])
-
-                        if int(const_binary[-d_loc]) == d_value:
-                            t += 1
-
-                if t > best_t:
-                    best_block = bits
-                    best_t = t
-                    new_state = next_state
-
-                if t == 8 * (self.__lbatch_count - 1) + self.__final_lbatch_size:
-                    break
-
-                attempts += 1
-                coins = sum_bytes(coins, bytes([1]))
-
-            if attempts == self.__max_attempts or t == 8 * (self.__lbatch_count - 1) + self.__final_lbatch_size:
-                break
+        if working_state.reseed_counter > self._reseed_interval:
+            return DRBGStatus.RESEED_REQUIRED, None, None
 
-        self._DRBG__save_state(new_state, state_handle)
-        self._DRBG__health_state.increment_generate_counter()
-        return DRBGStatus.SUCCESS, best_block
+        best_block, new_state = self._select_candidate(working_state, requested_number_of_bits, additional_input)
+        return DRBGStatus.SUCCESS, best_block, new_state
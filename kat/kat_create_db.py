@@ -5,6 +5,8 @@ import sqlite3
 from helpers.entropy_source import get_entropy_input, get_nonce
 from helpers.DRBG_status import DRBGStatus
 from implementations.HashDRBG import HashDRBG
+from implementations.CTRDRBG import CTRDRBG
+from implementations.HMACDRBG import HMACDRBG
 from implementations.KleptoHashDRBG import KHashDRBG1
 
 
@@ -191,3 +193,198 @@ def create_hash_generate_kat(no_of_tests, db_name='kat/kat_hash_generate.db'):
 
     conn.close()
     return DRBGStatus.SUCCESS
+
+
+def create_ctr_kat(no_of_tests):
+    parameters = ["AES-128", "AES-192", "AES-256"]
+    status = create_keyed_instantiate_kat(CTRDRBG, parameters, no_of_tests, 'kat/kat_ctr_instantiate.db')
+    if status != DRBGStatus.SUCCESS:
+        print("Error encountered while creating CTR instantiate KAT.")
+
+    status = create_keyed_reseed_kat(CTRDRBG, parameters, no_of_tests, 'kat/kat_ctr_reseed.db')
+    if status != DRBGStatus.SUCCESS:
+        print("Error encountered while creating CTR reseed KAT.")
+
+    status = create_keyed_generate_kat(CTRDRBG, parameters, no_of_tests, 'kat/kat_ctr_generate.db')
+    if status != DRBGStatus.SUCCESS:
+        print("Error encountered while creating CTR generate KAT.")
+
+
+def create_hmac_kat(no_of_tests):
+    hash_functions = ["SHA-224", "SHA-512/224", "SHA3-224", "SHA-256", "SHA-512/256", "SHA3-256",
+                      "SHA-384", "SHA3-384", "SHA-512", "SHA3-512"]
+    status = create_keyed_instantiate_kat(HMACDRBG, hash_functions, no_of_tests, 'kat/kat_hmac_instantiate.db')
+    if status != DRBGStatus.SUCCESS:
+        print("Error encountered while creating HMAC instantiate KAT.")
+
+    status = create_keyed_reseed_kat(HMACDRBG, hash_functions, no_of_tests, 'kat/kat_hmac_reseed.db')
+    if status != DRBGStatus.SUCCESS:
+        print("Error encountered while creating HMAC reseed KAT.")
+
+    status = create_keyed_generate_kat(HMACDRBG, hash_functions, no_of_tests, 'kat/kat_hmac_generate.db')
+    if status != DRBGStatus.SUCCESS:
+        print("Error encountered while creating HMAC generate KAT.")
+
+
+def create_keyed_instantiate_kat(DRBGImpl, parameters, no_of_tests, db_name):
+    conn = sqlite3.connect(db_name)
+
+    for parameter in parameters:
+
+        PRNG = DRBGImpl(parameter)
+        conn.execute("DROP TABLE IF EXISTS " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + ";")
+        conn.execute("CREATE TABLE " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + "\n" +
+                     "(ID       INT PRIMARY KEY NOT NULL,\n" +
+                     "ENTROPY  BLOB            NOT NULL,\n" +
+                     "NONCE    BLOB            NOT NULL,\n" +
+                     "PESTR    BLOB            NOT NULL,\n" +
+                     "SESTR    INT             NOT NULL,\n" +
+                     "VAL      BLOB            NOT NULL,\n" +
+                     "KEY      BLOB            NOT NULL);")
+
+        prediction_resistance_flag = True
+        supported_security_strengths = []
+        for ss in [112, 128, 192, 256]:
+            if ss <= PRNG._highest_supported_security_strength:
+                supported_security_strengths.append(ss)
+
+        for i in range(no_of_tests):
+            ss = random.choice(supported_security_strengths)
+            status, entropy = get_entropy_input(ss, PRNG._min_length, PRNG._max_length, prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            nonce = get_nonce(ss)
+            personalization_string = get_nonce(random.choice([0, ss, ss * 2]))
+
+            status, state = PRNG._instantiate_algorithm(entropy, nonce, personalization_string, ss,
+                                                        prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            insert_query = "INSERT INTO " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + \
+                           " (ID,ENTROPY,NONCE,PESTR,SESTR,VAL,KEY) VALUES (?, ?, ?, ?, ?, ?, ?);"
+            insert_data = (i, entropy, nonce, personalization_string, ss, state.get_value(), state.get_Key())
+            conn.execute(insert_query, insert_data)
+            conn.commit()
+
+    conn.close()
+    return DRBGStatus.SUCCESS
+
+
+def create_keyed_reseed_kat(DRBGImpl, parameters, no_of_tests, db_name):
+    conn = sqlite3.connect(db_name)
+
+    for parameter in parameters:
+
+        PRNG = DRBGImpl(parameter)
+        conn.execute("DROP TABLE IF EXISTS " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + ";")
+        conn.execute("CREATE TABLE " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + "\n" +
+                     "(ID       INT PRIMARY KEY NOT NULL,\n" +
+                     "ENTROPY  BLOB            NOT NULL,\n" +
+                     "ADDIN    BLOB            NOT NULL,\n" +
+                     "VAL      BLOB            NOT NULL,\n" +
+                     "KEY      BLOB            NOT NULL,\n" +
+                     "SESTR    INT             NOT NULL,\n" +
+                     "NEWVAL   BLOB            NOT NULL,\n" +
+                     "NEWKEY   BLOB            NOT NULL);")
+
+        prediction_resistance_flag = True
+        supported_security_strengths = []
+        for ss in [112, 128, 192, 256]:
+            if ss <= PRNG._highest_supported_security_strength:
+                supported_security_strengths.append(ss)
+
+        for i in range(no_of_tests):
+            ss = random.choice(supported_security_strengths)
+            status, entropy = get_entropy_input(ss, PRNG._min_length, PRNG._max_length, prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            nonce = get_nonce(ss)
+            personalization_string = get_nonce(random.choice([0, ss, ss * 2]))
+
+            status, working_state = PRNG._instantiate_algorithm(entropy, nonce, personalization_string, ss,
+                                                                prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            status, entropy = get_entropy_input(ss, PRNG._min_length, PRNG._max_length, prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            additional_input = get_nonce(random.choice([0, ss, ss * 2]))
+            status, new_state = PRNG._reseed_algorithm(working_state, entropy, additional_input)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            insert_query = "INSERT INTO " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + \
+                           " (ID,ENTROPY,ADDIN,VAL,KEY,SESTR,NEWVAL,NEWKEY) VALUES (?, ?, ?, ?, ?, ?, ?, ?);"
+            insert_data = (i, entropy, additional_input, working_state.get_value(), working_state.get_Key(), ss,
+                           new_state.get_value(), new_state.get_Key())
+            conn.execute(insert_query, insert_data)
+            conn.commit()
+
+    conn.close()
+    return DRBGStatus.SUCCESS
+
+
+def create_keyed_generate_kat(DRBGImpl, parameters, no_of_tests, db_name):
+    conn = sqlite3.connect(db_name)
+
+    for parameter in parameters:
+
+        PRNG = DRBGImpl(parameter)
+        conn.execute("DROP TABLE IF EXISTS " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + ";")
+        conn.execute("CREATE TABLE " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + "\n" +
+                     "(ID       INT PRIMARY KEY NOT NULL,\n" +
+                     "ADDIN    BLOB            NOT NULL,\n" +
+                     "VAL      BLOB            NOT NULL,\n" +
+                     "KEY      BLOB            NOT NULL,\n" +
+                     "SESTR    INT             NOT NULL,\n" +
+                     "REQBITS  INT             NOT NULL,\n" +
+                     "RESEED   INT             NOT NULL,\n" +
+                     "BITS     BLOB            NOT NULL,\n" +
+                     "NEWVAL   BLOB            NOT NULL,\n" +
+                     "NEWKEY   BLOB            NOT NULL);")
+
+        prediction_resistance_flag = True
+        supported_security_strengths = []
+        for ss in [112, 128, 192, 256]:
+            if ss <= PRNG._highest_supported_security_strength:
+                supported_security_strengths.append(ss)
+
+        for i in range(no_of_tests):
+            ss = random.choice(supported_security_strengths)
+            status, entropy = get_entropy_input(ss, PRNG._min_length, PRNG._max_length, prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            nonce = get_nonce(ss)
+            personalization_string = get_nonce(random.choice([0, ss, ss * 2]))
+
+            status, working_state = PRNG._instantiate_algorithm(entropy, nonce, personalization_string, ss,
+                                                                prediction_resistance_flag)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            requested_number_of_bits = random.choice([32, 128, 512])
+            additional_input = get_nonce(random.choice([0, ss, ss * 2]))
+            working_state.reseed_counter = random.choice(range(PRNG._reseed_interval))
+
+            status, returned_bits, new_state = PRNG._generate_algorithm(working_state, requested_number_of_bits,
+                                                                        additional_input)
+            if status != DRBGStatus.SUCCESS:
+                return status
+
+            insert_query = "INSERT INTO " + re.sub(r'[^a-zA-Z0-9]', '', parameter) + \
+                           " (ID,ADDIN,VAL,KEY,SESTR,REQBITS,RESEED,BITS,NEWVAL,NEWKEY) " + \
+                           "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);"
+            insert_data = (i, additional_input, working_state.get_value(), working_state.get_Key(), ss,
+                           requested_number_of_bits, working_state.reseed_counter, returned_bits,
+                           new_state.get_value(), new_state.get_Key())
+            conn.execute(insert_query, insert_data)
+            conn.commit()
+
+    conn.close()
+    return DRBGStatus.SUCCESS
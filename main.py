@@ -1,14 +1,34 @@
+import argparse
+import collections
+import multiprocessing
+import os
 import re
+import sys
+import time
 
 from implementations.HashDRBG import HashDRBG
+from implementations.HMACDRBG import HMACDRBG
+from implementations.CTRDRBG import CTRDRBG
 from implementations.KleptoHashDRBG import KHashDRBG1, KHashDRBG2
+from implementations.KleptoDRBG import KHMACDRBG, KCTRDRBG
 from helpers.DRBG_status import DRBGStatus, DRBG_status_to_string
-from helpers.general_helpers import bytes_to_string
-from testing.subversion_test import test_throughput, test_speed, plot_efficiency
 
 
-def generate_sample_outputs_hash(HashDRBGImpl, total_bits_per_hash):
+MECHANISMS = {"hash": {"none": HashDRBG, "K1": KHashDRBG1, "K2": KHashDRBG2},
+              "hmac": {"none": HMACDRBG, "generic": KHMACDRBG},
+              "ctr": {"none": CTRDRBG, "generic": KCTRDRBG}}
+HASH_FUNCTIONS = ["SHA-224", "SHA-512/224", "SHA3-224", "SHA-256", "SHA-512/256", "SHA3-256", "SHA-384", "SHA3-384",
+                  "SHA-512", "SHA3-512"]
+PARAMETERS = {"hash": HASH_FUNCTIONS, "hmac": HASH_FUNCTIONS, "ctr": ["AES-128", "AES-192", "AES-256"]}
+DEFAULT_PARAMETERS = {"hash": "SHA-512", "hmac": "SHA-512", "ctr": "AES-256"}
+SIZE_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+_generation_state = None
+
+
+def generate_sample_outputs_hash(HashDRBGImpl, total_bits_per_hash, output_dir="outputs"):
     bits_per_generate = 1024
+    os.makedirs(output_dir, exist_ok=True)
     for hash_fun in ["SHA-224", "SHA-512/224", "SHA3-224", "SHA-256", "SHA-512/256", "SHA3-256",
                      "SHA-384", "SHA3-384", "SHA-512", "SHA3-512"]:
 
@@ -18,7 +38,7 @@ def generate_sample_outputs_hash(HashDRBGImpl, total_bits_per_hash):
             print(DRBG_status_to_string(status))
             exit(1)
 
-        f = open("outputs/K2" + re.sub(r'[^a-zA-Z0-9]', '', hash_fun) + ".bin", "wb")
+        f = open(os.path.join(output_dir, "K2" + re.sub(r'[^a-zA-Z0-9]', '', hash_fun) + ".bin"), "wb")
         total_bits_written = 0
         while total_bits_written < total_bits_per_hash:
 
@@ -33,5 +53,192 @@ def generate_sample_outputs_hash(HashDRBGImpl, total_bits_per_hash):
         f.close()
 
 
+def parse_size(size):
+    """Returns the number of bytes of a size given as a number with an optional binary unit suffix K, M, G or T,
+        e.g. 512K or 10G."""
+
+    match = re.fullmatch(r'\s*(\d+)\s*([KMGT]?)i?B?\s*', size, re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError("invalid size: " + size)
+    return int(match.group(1)) * SIZE_UNITS[match.group(2).upper()]
+
+
+def create_generator(mechanism, parameter, klepto, pkey=None, extra_attempts=None, leaked_bits=None):
+    """Initializes the selected DRBG, subverted if a klepto variant other than none is selected."""
+
+    DRBGImpl = MECHANISMS[mechanism][klepto]
+    if klepto == "none":
+        return DRBGImpl(parameter)
+
+    arguments = dict()
+    for name, value in [("pkey", pkey), ("extra_attempts", extra_attempts), ("leaked_bits", leaked_bits)]:
+        if value is not None:
+            arguments[name] = value
+    return DRBGImpl(parameter, **arguments)
+
+
+def init_generation_worker(mechanism, parameter, klepto, pkey, extra_attempts, leaked_bits):
+    """Initializes the DRBG and a new instantiation of a generating process, personalized by its process ID. A failed
+        instantiation is not raised, as a pool would respawn the process, but its status is returned by every
+        generate_chunk call."""
+
+    global _generation_state
+    PRNG = create_generator(mechanism, parameter, klepto, pkey, extra_attempts, leaked_bits)
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False,
+                                            personalization_string=b"worker" + os.getpid().to_bytes(8, 'big'))
+    if status != DRBGStatus.SUCCESS:
+        _generation_state = None, status
+        return
+    _generation_state = PRNG, state_handle
+
+
+def generate_chunk(no_of_bytes):
+    """Generates a chunk of output with the instantiation of the process, in the largest requests the DRBG allows.
+
+    Returns
+    -------
+    status : DRBGStatus
+        One of the defined DRBG status flags.
+    chunk : bytes
+        The generated chunk. Might be None.
+    """
+
+    PRNG, state_handle = _generation_state
+    if PRNG is None:
+        return state_handle, None
+    max_request_bytes = PRNG._max_number_of_bits_per_request // 8
+    chunk = bytearray()
+    while len(chunk) < no_of_bytes:
+        status, bits = PRNG.generate(state_handle, 8 * min(max_request_bytes, no_of_bytes - len(chunk)),
+                                     prediction_resistance_request=False)
+        if status != DRBGStatus.SUCCESS:
+            return status, None
+        chunk += bits
+    return DRBGStatus.SUCCESS, bytes(chunk)
+
+
+def write_output(total_bytes, chunk_bytes, workers, generator_arguments, output, report_interval=1.):
+    """Streams total_bytes bytes of output in chunks to a binary file object. Chunks are generated in the process, or
+        by a pool of worker processes with their own instantiations, and written in order. At most two chunks per
+        worker are held in memory. The throughput is reported to stderr every report_interval seconds, unless it is
+        None, and the total bytes per second once the output is written.
+
+    Returns
+    -------
+    status : DRBGStatus
+        One of the defined DRBG status flags.
+    bytes_per_second : float
+        The achieved throughput. Might be None.
+    """
+
+    chunk_sizes = (min(chunk_bytes, total_bytes - offset) for offset in range(0, total_bytes, chunk_bytes))
+    written = 0
+    start = time.perf_counter()
+    last_report = start
+
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, init_generation_worker, generator_arguments)
+        results = _generate_in_pool(pool, chunk_sizes, 2 * workers)
+    else:
+        pool = None
+        init_generation_worker(*generator_arguments)
+        results = (generate_chunk(size) for size in chunk_sizes)
+
+    try:
+        for status, chunk in results:
+            if status != DRBGStatus.SUCCESS:
+                return status, None
+            output.write(chunk)
+            written += len(chunk)
+
+            now = time.perf_counter()
+            if report_interval is not None and now - last_report >= report_interval:
+                print("\r%s written, %s/s" % (format_size(written), format_size(written / (now - start))),
+                      end="", file=sys.stderr, flush=True)
+                last_report = now
+    finally:
+        if pool is not None:
+            pool.terminate()
+        output.flush()
+
+    elapsed = time.perf_counter() - start
+    bytes_per_second = written / elapsed if elapsed > 0 else 0.
+    print("\r%d bytes written in %0.2f seconds, %0.0f bytes/s (%s/s)" %
+          (written, elapsed, bytes_per_second, format_size(bytes_per_second)), file=sys.stderr)
+    return DRBGStatus.SUCCESS, bytes_per_second
+
+
+def _generate_in_pool(pool, chunk_sizes, max_pending):
+    """Yields the chunks generated by a pool in order, keeping at most max_pending chunks submitted at a time."""
+
+    pending = collections.deque()
+    for size in chunk_sizes:
+        pending.append(pool.apply_async(generate_chunk, (size,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while len(pending) > 0:
+        yield pending.popleft().get()
+
+
+def format_size(no_of_bytes):
+    """Returns a number of bytes formatted with a binary unit."""
+
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if no_of_bytes < 1024:
+            return "%0.1f %s" % (no_of_bytes, unit)
+        no_of_bytes /= 1024
+    return "%0.1f TiB" % no_of_bytes
+
+
+def main(argv=None):
+    """Command-line entry point generating a stream of output with a selected, optionally subverted, DRBG."""
+
+    parser = argparse.ArgumentParser(description="Generates pseudo-random output with a NIST DRBG or its "
+                                                 "kleptographic subversion.")
+    parser.add_argument("-m", "--mechanism", choices=sorted(MECHANISMS.keys()), default="hash",
+                        help="the DRBG mechanism (default: hash)")
+    parser.add_argument("-p", "--parameter", help="the hash function or block cipher: %s for hash and hmac, %s for "
+                                                  "ctr (default: SHA-512, or AES-256 for ctr)" %
+                                                  (", ".join(HASH_FUNCTIONS), ", ".join(PARAMETERS["ctr"])))
+    parser.add_argument("-k", "--klepto", choices=["none", "K1", "K2", "generic"], default="none",
+                        help="the subversion: K1 or K2 for hash, generic for hmac and ctr (default: none)")
+    parser.add_argument("--pkey", type=bytes.fromhex, help="the subversion key in hex")
+    parser.add_argument("--extra-attempts", type=int, help="the extra candidate outputs per request")
+    parser.add_argument("--leaked-bits", type=int, help="the secret bits leaked per request")
+    parser.add_argument("-s", "--size", type=parse_size, default=parse_size("1M"),
+                        help="the total output size, e.g. 4096, 512K or 10G (default: 1M)")
+    parser.add_argument("-c", "--chunk", type=parse_size, default=parse_size("1M"),
+                        help="the size of the chunks generated and written at once (default: 1M)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="the number of generating processes, each with its own instantiation (default: 1)")
+    parser.add_argument("-o", "--output", default="-", help="the output file, or - for stdout (default: -)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not report the throughput while writing")
+    args = parser.parse_args(argv)
+
+    if args.klepto not in MECHANISMS[args.mechanism]:
+        parser.error("the %s subversion is not available for the %s mechanism" % (args.klepto, args.mechanism))
+    if args.chunk <= 0 or args.workers <= 0:
+        parser.error("the chunk size and the number of workers must be positive")
+    parameter = args.parameter.upper() if args.parameter is not None else DEFAULT_PARAMETERS[args.mechanism]
+    if parameter not in PARAMETERS[args.mechanism]:
+        parser.error("%s is not supported by the %s mechanism, choose from %s" %
+                     (args.parameter, args.mechanism, ", ".join(PARAMETERS[args.mechanism])))
+    generator_arguments = (args.mechanism, parameter, args.klepto, args.pkey, args.extra_attempts, args.leaked_bits)
+
+    if args.output == "-":
+        status, bytes_per_second = write_output(args.size, args.chunk, args.workers, generator_arguments,
+                                                sys.stdout.buffer, None if args.quiet else 1.)
+    else:
+        if os.path.dirname(args.output) != "":
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "wb") as f:
+            status, bytes_per_second = write_output(args.size, args.chunk, args.workers, generator_arguments, f,
+                                                    None if args.quiet else 1.)
+
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status), file=sys.stderr)
+        exit(1)
+
+
 if __name__ == "__main__":
-    generate_sample_outputs_hash(HashDRBG, 1000000)
+    main()
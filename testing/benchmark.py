@@ -0,0 +1,968 @@
+import array
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from implementations.HashDRBG import HashDRBG
+from implementations.CTRDRBG import CTRDRBG
+from implementations.HMACDRBG import HMACDRBG
+from implementations.KleptoHashDRBG import KHashDRBG1, KHashDRBG2
+from helpers.DRBG_status import DRBGStatus, DRBG_status_to_string
+from helpers.random_variates import RandomVariates
+from helpers.drbg_random import DRBGRandom
+from helpers.async_drbg import AsyncDRBG
+from helpers.entropy_source import OSEntropySource, SeededEntropySource, RecordingEntropySource, \
+    ReplayEntropySource, set_entropy_source
+
+
+def use_entropy_source(seed=None, record_path=None, replay_path=None):
+    """Selects the entropy source of the following benchmark and subversion test runs. With a seed, all entropy
+        inputs, nonces and subversion keys are derived from it and the random handle choices of the benchmarks are
+        seeded, so the run is reproduced bit-for-bit and no entropy syscalls are timed. With record_path, the inputs
+        of the run are logged, and with replay_path, the inputs of a recorded run are fed back. Without arguments,
+        os.urandom is used again. Runs with a background reseed scheduler fetch entropy in a nondeterministic order
+        and cannot be replayed.
+
+    Returns
+    -------
+    source
+        The selected entropy source.
+    """
+
+    if replay_path is not None:
+        source = ReplayEntropySource(replay_path)
+    elif seed is not None:
+        source = SeededEntropySource(seed)
+    else:
+        source = OSEntropySource()
+
+    if record_path is not None:
+        source = RecordingEntropySource(record_path, source)
+    if seed is not None:
+        random.seed(seed)
+
+    previous_source = set_entropy_source(source)
+    if isinstance(previous_source, RecordingEntropySource):
+        previous_source.close()
+    return source
+
+
+def benchmark_throughput(mechanisms=None, generate_requests=100, bits_per_request=2**19):
+    """Measures the generate throughput of DRBG mechanisms in bytes per second.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with, e.g. (HashDRBG, "SHA-512").
+    generate_requests : int
+        The number of generate requests timed for each mechanism.
+    bits_per_request : int
+        The number of bits requested by each generate call.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the mechanism, parameter, elapsed time, bytes per second and mean request latency
+        for each measurement.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(HashDRBG, "SHA-256"), (HashDRBG, "SHA-512"), (HMACDRBG, "SHA-256"), (HMACDRBG, "SHA-512"),
+                      (CTRDRBG, "AES-128"), (CTRDRBG, "AES-256")]
+
+    results = []
+    for DRBGImpl, parameter in mechanisms:
+        PRNG = DRBGImpl(parameter)
+        status, state_handle = PRNG.instantiate()
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+
+        start = time.perf_counter()
+        for r in range(generate_requests):
+            status, bits = PRNG.generate(state_handle, bits_per_request, prediction_resistance_request=False)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                break
+        end = time.perf_counter()
+        PRNG.uninstantiate(state_handle)
+
+        bytes_per_second = generate_requests * bits_per_request / 8 / (end - start)
+        latency = (end - start) / generate_requests
+        print("%s %s, %d bits: %0.4f seconds, %0.0f bytes/s, %0.2f us per request" %
+              (PRNG.get_type(), parameter, bits_per_request, end - start, bytes_per_second, latency * 1e6))
+        results.append({"mechanism": PRNG.get_type(), "parameter": parameter, "requests": generate_requests,
+                        "bits_per_request": bits_per_request, "seconds": end - start,
+                        "bytes_per_second": bytes_per_second, "latency": latency})
+
+    return results
+
+
+def benchmark_matrix(mechanisms=None, request_sizes=None, bits_per_size=2**22):
+    """Measures throughput and latency of DRBG mechanisms over a range of request sizes. The number of requests
+        for each size is chosen so that every size generates roughly the same total number of bits.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with. Defaults to those of benchmark_throughput.
+    request_sizes : list, optional
+        The request sizes in bits to measure.
+    bits_per_size : int
+        The approximate total number of bits generated for each request size.
+
+    Returns
+    -------
+    results : list
+        The measurements of benchmark_throughput for all request sizes.
+    """
+
+    if request_sizes is None:
+        request_sizes = [128, 1024, 2**13, 2**16, 2**19]
+
+    results = []
+    for bits_per_request in request_sizes:
+        generate_requests = max(1, bits_per_size // bits_per_request)
+        results += benchmark_throughput(mechanisms, generate_requests, bits_per_request)
+
+    best = dict()
+    for result in results:
+        size = result["bits_per_request"]
+        if size not in best.keys() or result["bytes_per_second"] > best[size]["bytes_per_second"]:
+            best[size] = result
+
+    for size in sorted(best.keys()):
+        print("Best for %d bits: %s %s" % (size, best[size]["mechanism"], best[size]["parameter"]))
+
+    return results
+
+
+def benchmark_small_requests(mechanisms=None, request_sizes=None, generate_requests=10000, buffer_bits=2**16):
+    """Measures generate operations per second for small requests with and without read-ahead buffering.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with. Defaults to those of benchmark_throughput.
+    request_sizes : list, optional
+        The request sizes in bytes to measure.
+    generate_requests : int
+        The number of generate requests timed for each configuration.
+    buffer_bits : int
+        The size of the read-ahead buffer in bits.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the mechanism, parameter, request size, buffering and operations per second for each
+        measurement.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(HashDRBG, "SHA-256"), (HashDRBG, "SHA-512"), (HMACDRBG, "SHA-256"), (HMACDRBG, "SHA-512"),
+                      (CTRDRBG, "AES-128"), (CTRDRBG, "AES-256")]
+    if request_sizes is None:
+        request_sizes = [4, 8, 16]
+
+    results = []
+    for DRBGImpl, parameter in mechanisms:
+        PRNG = DRBGImpl(parameter)
+
+        for request_bytes in request_sizes:
+            for buffered in [False, True]:
+                status, state_handle = PRNG.instantiate()
+                if status != DRBGStatus.SUCCESS:
+                    print(DRBG_status_to_string(status))
+                    exit(1)
+                if buffered:
+                    PRNG.enable_buffer(state_handle, buffer_bits)
+
+                start = time.perf_counter()
+                for r in range(generate_requests):
+                    status, bits = PRNG.generate(state_handle, request_bytes * 8, prediction_resistance_request=False)
+                    if status != DRBGStatus.SUCCESS:
+                        print(DRBG_status_to_string(status))
+                        break
+                end = time.perf_counter()
+                PRNG.uninstantiate(state_handle)
+
+                operations_per_second = generate_requests / (end - start)
+                print("%s %s, %d bytes, %s: %0.0f ops/s" % (PRNG.get_type(), parameter, request_bytes,
+                                                             "buffered" if buffered else "unbuffered",
+                                                             operations_per_second))
+                results.append({"mechanism": PRNG.get_type(), "parameter": parameter,
+                                "request_bytes": request_bytes, "buffered": buffered,
+                                "operations_per_second": operations_per_second})
+
+    return results
+
+
+def benchmark_variates(mechanisms=None, size=10**6):
+    """Measures the number of random variates per second produced by RandomVariates for each distribution.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with.
+    size : int
+        The number of variates generated by each call.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the mechanism, parameter, distribution and variates per second for each measurement.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(HashDRBG, "SHA-512"), (CTRDRBG, "AES-128")]
+
+    results = []
+    for DRBGImpl, parameter in mechanisms:
+        PRNG = DRBGImpl(parameter)
+        status, state_handle = PRNG.instantiate()
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+
+        variates = RandomVariates(PRNG, state_handle, prediction_resistance_request=False)
+        distributions = [("words", lambda: variates.words(size)),
+                         ("integers", lambda: variates.integers(0, 10**9 + 7, size)),
+                         ("random", lambda: variates.random(size)),
+                         ("normal", lambda: variates.normal(size=size)),
+                         ("permutation", lambda: variates.permutation(size))]
+
+        for distribution, sample in distributions:
+            start = time.perf_counter()
+            status, values = sample()
+            end = time.perf_counter()
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                break
+
+            variates_per_second = size / (end - start)
+            print("%s %s, %s: %0.0f variates/s" % (PRNG.get_type(), parameter, distribution, variates_per_second))
+            results.append({"mechanism": PRNG.get_type(), "parameter": parameter, "distribution": distribution,
+                            "variates_per_second": variates_per_second})
+
+        PRNG.uninstantiate(state_handle)
+
+    return results
+
+
+def benchmark_random(DRBGImpl=HashDRBG, parameter="SHA-512", operations=100000):
+    """Measures operations per second of the random.Random API backed by a DRBG against random.SystemRandom.
+
+    Parameters
+    ----------
+    DRBGImpl : type
+        The DRBG class backing the random.Random adapter.
+    parameter : str
+        The parameter the DRBG class is initialized with.
+    operations : int
+        The number of calls timed for each method.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the generator, method and operations per second for each measurement.
+    """
+
+    PRNG = DRBGImpl(parameter)
+    status, state_handle = PRNG.instantiate()
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status))
+        exit(1)
+
+    sequence = list(range(1000))
+    generators = [(PRNG.get_type() + " " + parameter, DRBGRandom(PRNG, state_handle,
+                                                                 prediction_resistance_request=False)),
+                  ("SystemRandom", random.SystemRandom())]
+
+    results = []
+    for name, generator in generators:
+        methods = [("random", generator.random, ()),
+                   ("getrandbits", generator.getrandbits, (32,)),
+                   ("randrange", generator.randrange, (10**6,)),
+                   ("choice", generator.choice, (sequence,)),
+                   ("shuffle", generator.shuffle, (sequence,))]
+
+        for method, function, args in methods:
+            calls = operations if method != "shuffle" else max(1, operations // len(sequence))
+            start = time.perf_counter()
+            for r in range(calls):
+                function(*args)
+            end = time.perf_counter()
+
+            operations_per_second = calls / (end - start)
+            print("%s, %s: %0.0f ops/s" % (name, method, operations_per_second))
+            results.append({"generator": name, "method": method, "operations_per_second": operations_per_second})
+
+    PRNG.uninstantiate(state_handle)
+    return results
+
+
+def benchmark_state_store(handles=10**6, generate_requests=10**5, parameter="SHA-256", path="testing/tmp_states.bin",
+                          compare_dict=True):
+    """Measures saving and generating on random handles of a memory-mapped state store holding a large number of
+        states, and optionally of the in-process state table with the same number of states. The table is filled
+        with copies of a single instantiated state, which is only acceptable for benchmarking.
+
+    Parameters
+    ----------
+    handles : int
+        The number of states held in the table.
+    generate_requests : int
+        The number of 128-bit generate requests timed on random handles.
+    parameter : str
+        The hash function of the HashDRBG.
+    path : str
+        The path of the temporary store file, removed after the benchmark.
+    compare_dict : bool
+        A flag used to also measure the in-process state table.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the table type, number of handles, saves per second and generates per second.
+    """
+
+    results = []
+    for table in ["mapped", "dict"] if compare_dict else ["mapped"]:
+        PRNG = HashDRBG(parameter)
+        status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+        state = PRNG._DRBG__load_state(state_handle)
+        PRNG.uninstantiate(state_handle)
+
+        if table == "mapped":
+            if os.path.exists(path):
+                os.remove(path)
+            states = PRNG.use_mapped_state_store(path, handles)
+        else:
+            states = dict()
+            PRNG.set_state_store(states)
+
+        start = time.perf_counter()
+        for h in range(handles):
+            states[h] = state
+        end = time.perf_counter()
+        saves_per_second = handles / (end - start)
+
+        state_handles = [random.randrange(handles) for r in range(generate_requests)]
+        start = time.perf_counter()
+        for h in state_handles:
+            status, bits = PRNG.generate(h, 128)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                break
+        end = time.perf_counter()
+        generates_per_second = generate_requests / (end - start)
+
+        if table == "mapped":
+            states.close()
+            os.remove(path)
+
+        print("%s table, %d handles: %0.0f saves/s, %0.0f generates/s" % (table, handles, saves_per_second,
+                                                                          generates_per_second))
+        results.append({"table": table, "handles": handles, "saves_per_second": saves_per_second,
+                        "generates_per_second": generates_per_second})
+
+    return results
+
+
+def shared_generate_worker(parameter, attach_arguments, generate_requests, bits_per_request, results):
+    """Worker process of benchmark_shared_state_store. Generates on random handles of a shared state table."""
+
+    PRNG = HashDRBG(parameter)
+    state_store = PRNG.use_shared_state_store(attach_arguments=attach_arguments)
+    handles = attach_arguments[1]
+
+    start = time.perf_counter()
+    for r in range(generate_requests):
+        status, bits = PRNG.generate(random.randrange(handles), bits_per_request)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            break
+    end = time.perf_counter()
+
+    state_store.close()
+    results.put(end - start)
+
+
+def benchmark_shared_state_store(worker_counts=None, handles=1000, generate_requests=20000, bits_per_request=128,
+                                 parameter="SHA-256"):
+    """Measures the generate throughput of worker processes sharing a state table in shared memory against a single
+        process using the in-process state table. Each worker makes generate_requests requests on random handles.
+        After each run, the reseed counters of all states must account for every request, which confirms that no
+        concurrent state update was lost.
+
+    Parameters
+    ----------
+    worker_counts : list, optional
+        The numbers of worker processes to measure.
+    handles : int
+        The number of states in the table.
+    generate_requests : int
+        The number of generate requests made by each worker.
+    bits_per_request : int
+        The number of bits requested by each generate call.
+    parameter : str
+        The hash function of the HashDRBG.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the number of workers and the total generate requests per second for each measurement.
+    """
+
+    if worker_counts is None:
+        worker_counts = [1, 2, 4, 8]
+
+    PRNG = HashDRBG(parameter)
+    state_handles = []
+    for h in range(handles):
+        status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+        state_handles.append(state_handle)
+
+    start = time.perf_counter()
+    for r in range(generate_requests):
+        status, bits = PRNG.generate(random.choice(state_handles), bits_per_request)
+    end = time.perf_counter()
+    baseline = generate_requests / (end - start)
+    print("Single process: %0.0f generates/s" % baseline)
+    results = [{"workers": 0, "generates_per_second": baseline}]
+
+    for state_handle in state_handles:
+        PRNG.uninstantiate(state_handle)
+
+    for workers in worker_counts:
+        SharedPRNG = HashDRBG(parameter)
+        state_store = SharedPRNG.use_shared_state_store(capacity=handles)
+        for h in range(handles):
+            status, state_handle = SharedPRNG.instantiate(prediction_resistance_flag=False)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                exit(1)
+
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=shared_generate_worker,
+                                             args=(parameter, state_store.get_attach_arguments(), generate_requests,
+                                                   bits_per_request, queue)) for w in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        elapsed = [queue.get() for process in processes]
+        end = time.perf_counter()
+        for process in processes:
+            process.join()
+
+        updates = sum(state_store[h].reseed_counter - 1 for h in range(handles))
+        generates_per_second = workers * generate_requests / (end - start)
+        print("%d workers: %0.0f generates/s, %0.2f speedup, %d of %d state updates" %
+              (workers, generates_per_second, generates_per_second / baseline, updates, workers * generate_requests))
+        results.append({"workers": workers, "generates_per_second": generates_per_second,
+                        "worker_seconds": max(elapsed)})
+        state_store.close()
+
+    return results
+
+
+def benchmark_spawn(mechanisms=None, children=1000):
+    """Measures the time needed to create child instantiations for a process pool, by a full instantiate of each
+        child against spawning them from a single parent instantiation.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with, e.g. (HashDRBG, "SHA-512").
+    children : int
+        The number of child instantiations created by each method.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the mechanism, parameter, method and instantiations per second for each measurement.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(HashDRBG, "SHA-512"), (HMACDRBG, "SHA-512"), (CTRDRBG, "AES-256")]
+
+    results = []
+    for DRBGImpl, parameter in mechanisms:
+        PRNG = DRBGImpl(parameter)
+        status, parent_handle = PRNG.instantiate(prediction_resistance_flag=False)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+
+        for method in ["instantiate", "spawn"]:
+            start = time.perf_counter()
+            if method == "instantiate":
+                state_handles = []
+                for c in range(children):
+                    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+                    state_handles.append(state_handle)
+            else:
+                status, state_handles = PRNG.spawn(parent_handle, children)
+            end = time.perf_counter()
+
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                exit(1)
+            for state_handle in state_handles:
+                PRNG.uninstantiate(state_handle)
+
+            instantiations_per_second = children / (end - start)
+            print("%s %s, %s: %0.0f instantiations/s" % (PRNG.get_type(), parameter, method,
+                                                         instantiations_per_second))
+            results.append({"mechanism": PRNG.get_type(), "parameter": parameter, "method": method,
+                            "instantiations_per_second": instantiations_per_second})
+
+        PRNG.uninstantiate(parent_handle)
+
+    return results
+
+
+def benchmark_batch(mechanisms=None, handles=1000, rounds=20, bits_per_request=128):
+    """Measures the per-handle cost of instantiating and generating with many handles, by a call per handle against
+        a single instantiate_many or generate_many call for all handles.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with, e.g. (HashDRBG, "SHA-512").
+    handles : int
+        The number of instantiated states.
+    rounds : int
+        The number of times a request is made with every handle.
+    bits_per_request : int
+        The number of bits requested with each handle.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the mechanism, parameter, method, and microseconds per instantiation and per generate
+        request for each measurement.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(HashDRBG, "SHA-256"), (HMACDRBG, "SHA-256"), (CTRDRBG, "AES-128")]
+
+    results = []
+    for DRBGImpl, parameter in mechanisms:
+        PRNG = DRBGImpl(parameter)
+        for method in ["single", "batch"]:
+            start = time.perf_counter()
+            if method == "single":
+                state_handles = []
+                for h in range(handles):
+                    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+                    state_handles.append(state_handle)
+            else:
+                status, state_handles = PRNG.instantiate_many(handles, prediction_resistance_flag=False)
+            end = time.perf_counter()
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                exit(1)
+            instantiate_latency = (end - start) / handles
+
+            start = time.perf_counter()
+            for r in range(rounds):
+                if method == "single":
+                    for state_handle in state_handles:
+                        status, bits = PRNG.generate(state_handle, bits_per_request)
+                else:
+                    status, bits, offsets = PRNG.generate_many(state_handles, bits_per_request)
+                if status != DRBGStatus.SUCCESS:
+                    print(DRBG_status_to_string(status))
+                    exit(1)
+            end = time.perf_counter()
+            generate_latency = (end - start) / (rounds * handles)
+
+            for state_handle in state_handles:
+                PRNG.uninstantiate(state_handle)
+
+            print("%s %s, %s: %0.2f us per instantiation, %0.2f us per generate" %
+                  (PRNG.get_type(), parameter, method, instantiate_latency * 1e6, generate_latency * 1e6))
+            results.append({"mechanism": PRNG.get_type(), "parameter": parameter, "method": method,
+                            "instantiate_latency": instantiate_latency, "generate_latency": generate_latency})
+
+    return results
+
+
+async def measure_event_loop(PRNG, state_handles, use_facade, clients, requests_per_client, request_sizes,
+                             tick=0.001):
+    """Measures how late a periodic timer fires on the event loop while clients make generate requests, either
+        directly on the loop thread or through an AsyncDRBG facade. Used by benchmark_event_loop."""
+
+    loop = asyncio.get_running_loop()
+    facade = AsyncDRBG(PRNG) if use_facade else None
+    lags = []
+    finished = False
+
+    async def ticker():
+        while not finished:
+            expected = loop.time() + tick
+            await asyncio.sleep(tick)
+            lags.append(loop.time() - expected)
+
+    async def client(c):
+        for r in range(requests_per_client):
+            bits = request_sizes[(c + r) % len(request_sizes)]
+            if use_facade:
+                status, output = await facade.generate(state_handles[c], bits, prediction_resistance_request=False)
+            else:
+                status, output = PRNG.generate(state_handles[c], bits, prediction_resistance_request=False)
+                await asyncio.sleep(0)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                return
+
+    ticker_task = loop.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*[client(c) for c in range(clients)])
+    end = time.perf_counter()
+    finished = True
+    await ticker_task
+    return sorted(lags), end - start
+
+
+def benchmark_event_loop(DRBGImpl=HashDRBG, parameter="SHA-512", clients=16, requests_per_client=50,
+                         request_sizes=None):
+    """Measures the event loop latency under load, with generate requests made directly on the loop thread against
+        requests made through the AsyncDRBG facade. The latency is the delay of a 1 ms timer beyond its deadline.
+
+    Parameters
+    ----------
+    DRBGImpl : class
+        The DRBG class, e.g. HashDRBG.
+    parameter : str
+        The parameter the DRBG is initialized with.
+    clients : int
+        The number of concurrent clients, each using its own instantiation.
+    requests_per_client : int
+        The number of generate requests made by each client.
+    request_sizes : list, optional
+        The request sizes in bits that each client cycles through.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the mode, requests per second, and median, 99th percentile and maximum loop latency.
+    """
+
+    if request_sizes is None:
+        request_sizes = [128, 128, 256, 1024, 128, 2**19]
+
+    PRNG = DRBGImpl(parameter)
+    status, state_handles = PRNG.instantiate_many(clients, prediction_resistance_flag=False)
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status))
+        exit(1)
+
+    results = []
+    for mode in ["direct", "facade"]:
+        lags, seconds = asyncio.run(measure_event_loop(PRNG, state_handles, mode == "facade", clients,
+                                                       requests_per_client, request_sizes))
+        requests_per_second = clients * requests_per_client / seconds
+        median = lags[len(lags) // 2]
+        percentile_99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+        print("%s: %0.0f requests/s, loop latency median %0.2f ms, p99 %0.2f ms, max %0.2f ms" %
+              (mode, requests_per_second, median * 1e3, percentile_99 * 1e3, lags[-1] * 1e3))
+        results.append({"mode": mode, "requests_per_second": requests_per_second, "median_latency": median,
+                        "p99_latency": percentile_99, "max_latency": lags[-1]})
+
+    for state_handle in state_handles:
+        PRNG.uninstantiate(state_handle)
+    return results
+
+
+def benchmark_parallel_hashgen(parameter="SHA-512", worker_counts=None, request_sizes=None, bits_per_size=2**22):
+    """Measures the generate throughput of the hash DRBG with block-parallel hashgen by number of worker threads
+        and request size, and reports for each number of workers the smallest request size at which it is faster
+        than sequential generation.
+
+    Parameters
+    ----------
+    parameter : str
+        The hash function of the HashDRBG.
+    worker_counts : list, optional
+        The numbers of worker threads to measure. Defaults to powers of two up to the number of CPUs.
+    request_sizes : list, optional
+        The request sizes in bits to measure.
+    bits_per_size : int
+        The total number of bits generated for each request size.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the number of workers, request size, bytes per second and speedup over sequential
+        generation for each measurement.
+    """
+
+    if worker_counts is None:
+        worker_counts = [2**i for i in range(int(os.cpu_count() or 1).bit_length())]
+        worker_counts = sorted(set(worker_counts + [os.cpu_count() or 1]))
+    if request_sizes is None:
+        request_sizes = [2**i for i in range(12, 20)]
+
+    PRNG = HashDRBG(parameter)
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status))
+        exit(1)
+
+    results = []
+    sequential = dict()
+    for workers in [1] + [w for w in worker_counts if w > 1]:
+        if workers > 1:
+            PRNG.enable_parallel_hashgen(workers, min_bits=0)
+
+        crossover = None
+        for bits_per_request in request_sizes:
+            generate_requests = max(1, bits_per_size // bits_per_request)
+            start = time.perf_counter()
+            for r in range(generate_requests):
+                status, bits = PRNG.generate(state_handle, bits_per_request, prediction_resistance_request=False)
+            end = time.perf_counter()
+
+            bytes_per_second = generate_requests * bits_per_request / 8 / (end - start)
+            if workers == 1:
+                sequential[bits_per_request] = bytes_per_second
+            speedup = bytes_per_second / sequential[bits_per_request]
+            if crossover is None and speedup > 1:
+                crossover = bits_per_request
+            results.append({"workers": workers, "bits_per_request": bits_per_request,
+                            "bytes_per_second": bytes_per_second, "speedup": speedup})
+            print("%d workers, %d bits: %0.0f bytes/s, %0.2f speedup" % (workers, bits_per_request,
+                                                                        bytes_per_second, speedup))
+
+        if workers > 1:
+            PRNG.disable_parallel_hashgen()
+            print("%d workers: parallel generation pays off from %s bits" % (workers, crossover))
+
+    PRNG.uninstantiate(state_handle)
+    return results
+
+
+def benchmark_prediction_resistance(mechanisms=None, generate_requests=2000, bits_per_request=256, idle_time=0.0005):
+    """Measures the latency distribution of prediction-resistant generate requests with synchronous reseeds against
+        reseeds prepared by the background reseed scheduler. Requests are separated by idle_time seconds, as
+        between the requests of a server.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with, e.g. (HashDRBG, "SHA-512").
+    generate_requests : int
+        The number of timed generate requests.
+    bits_per_request : int
+        The number of bits requested by each generate call.
+    idle_time : float
+        The time in seconds between two requests.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the mechanism, parameter, mode, and median, 90th, 99th percentile and maximum latency.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(HashDRBG, "SHA-512"), (HMACDRBG, "SHA-512"), (CTRDRBG, "AES-256")]
+
+    results = []
+    for DRBGImpl, parameter in mechanisms:
+        PRNG = DRBGImpl(parameter)
+        for mode in ["synchronous", "scheduled"]:
+            if mode == "scheduled":
+                PRNG.enable_reseed_scheduler()
+            status, state_handle = PRNG.instantiate(prediction_resistance_flag=True)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                exit(1)
+
+            latencies = []
+            for r in range(generate_requests):
+                time.sleep(idle_time)
+                start = time.perf_counter()
+                status, bits = PRNG.generate(state_handle, bits_per_request, prediction_resistance_request=True)
+                latencies.append(time.perf_counter() - start)
+                if status != DRBGStatus.SUCCESS:
+                    print(DRBG_status_to_string(status))
+                    break
+
+            PRNG.uninstantiate(state_handle)
+            PRNG.disable_reseed_scheduler()
+
+            latencies.sort()
+            percentiles = [latencies[min(len(latencies) - 1, int(len(latencies) * q))] for q in [0.5, 0.9, 0.99]]
+            print("%s %s, %s: median %0.1f us, p90 %0.1f us, p99 %0.1f us, max %0.1f us" %
+                  (PRNG.get_type(), parameter, mode, percentiles[0] * 1e6, percentiles[1] * 1e6,
+                   percentiles[2] * 1e6, latencies[-1] * 1e6))
+            results.append({"mechanism": PRNG.get_type(), "parameter": parameter, "mode": mode,
+                            "median_latency": percentiles[0], "p90_latency": percentiles[1],
+                            "p99_latency": percentiles[2], "max_latency": latencies[-1]})
+
+    return results
+
+
+def count_allocations(function, *arguments):
+    """Calls a function and returns the number of memory blocks it allocated, including the temporaries freed before
+        it returns. sys.getallocatedblocks is sampled at every opcode and call event, and its increases are summed,
+        so a block allocated and freed within one opcode or C call is not counted. The count is deterministic, and
+        includes the frame object created for tracing each Python call."""
+
+    counter = [0, 0]
+
+    def sample(frame, event, argument):
+        counter[0] += max(sys.getallocatedblocks() - counter[1], 0)
+        counter[1] = sys.getallocatedblocks()
+
+    def trace(frame, event, argument):
+        frame.f_trace_opcodes = True
+        counter[0] += max(sys.getallocatedblocks() - counter[1], 0)
+        counter[1] = sys.getallocatedblocks()
+        return trace
+
+    previous_profile = sys.getprofile()
+    previous_trace = sys.gettrace()
+    counter[1] = sys.getallocatedblocks()
+    sys.setprofile(sample)
+    sys.settrace(trace)
+    try:
+        function(*arguments)
+    finally:
+        sys.settrace(previous_trace)
+        sys.setprofile(previous_profile)
+    return counter[0]
+
+
+def benchmark_allocations(mechanisms=None, request_sizes=None, generate_requests=200, counted_requests=5,
+                          baseline_path=None, update_baseline=False, tolerance=0.1):
+    """Profiles the memory allocated by generate requests with tracemalloc. For each DRBG variant and request size,
+        measures the peak memory allocated during a call above the memory in use before it, i.e. the output and
+        the temporaries alive at the same time, and the memory blocks and bytes still allocated after the calls,
+        i.e. growth of the states, buffers and caches. The number of blocks allocated per call, including short-lived
+        temporaries, is counted with count_allocations over the first counted_requests requests. A warm-up request is
+        made before the profiled ones.
+
+        With a baseline file, the run fails with a non-zero exit code if the mean peak bytes, the retained blocks or
+        the allocations per call of any measurement exceed the baseline by more than the tolerance. Retained blocks
+        are also allowed half a block per call above it, since a few blocks are retained once, while a leak retains
+        one or more blocks per call. With update_baseline, the measurements are written to the baseline file instead.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with. Defaults to those of benchmark_throughput
+        and the subverted hash DRBGs.
+    request_sizes : list, optional
+        The request sizes in bits to profile.
+    generate_requests : int
+        The number of profiled generate requests for each variant and size.
+    counted_requests : int
+        The number of generate requests whose allocations are counted, which is slowed down by the tracing.
+    baseline_path : str, optional
+        The path of a JSON file with the allocation thresholds.
+    update_baseline : bool
+        Writes the measurements to the baseline file instead of checking them.
+    tolerance : float
+        The relative increase over the baseline that fails the run.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the variant, parameter, request size, mean and maximum peak bytes per call, the retained
+        blocks and bytes per call and the allocations per call for each measurement.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(HashDRBG, "SHA-256"), (HashDRBG, "SHA-512"), (HMACDRBG, "SHA-256"), (HMACDRBG, "SHA-512"),
+                      (CTRDRBG, "AES-128"), (CTRDRBG, "AES-256"), (KHashDRBG1, "SHA-512"), (KHashDRBG2, "SHA-512")]
+    if request_sizes is None:
+        request_sizes = [128, 1024, 2**13, 2**16]
+
+    results = []
+    for DRBGImpl, parameter in mechanisms:
+        for bits_per_request in request_sizes:
+            PRNG = DRBGImpl(parameter)
+            status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                exit(1)
+            PRNG.generate(state_handle, bits_per_request, prediction_resistance_request=False)
+
+            peaks = array.array('q', bytes(8 * generate_requests))
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            for r in range(generate_requests):
+                tracemalloc.reset_peak()
+                current = tracemalloc.get_traced_memory()[0]
+                status, bits = PRNG.generate(state_handle, bits_per_request, prediction_resistance_request=False)
+                peaks[r] = tracemalloc.get_traced_memory()[1] - current
+                if status != DRBGStatus.SUCCESS:
+                    print(DRBG_status_to_string(status))
+                    break
+                del bits
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            allocations = [count_allocations(PRNG.generate, state_handle, bits_per_request, None, False)
+                           for r in range(counted_requests)]
+            PRNG.uninstantiate(state_handle)
+
+            statistics = after.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)]).compare_to(
+                before.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)]), "filename")
+            retained_blocks = sum(stat.count_diff for stat in statistics) / generate_requests
+            retained_bytes = sum(stat.size_diff for stat in statistics) / generate_requests
+
+            result = {"mechanism": DRBGImpl.__name__, "parameter": parameter, "bits_per_request": bits_per_request,
+                      "peak_bytes": sum(peaks) / len(peaks), "max_peak_bytes": max(peaks),
+                      "retained_blocks": retained_blocks, "retained_bytes": retained_bytes,
+                      "allocations": sum(allocations) / len(allocations) if len(allocations) > 0 else 0.}
+            print("%s %s, %d bits: %0.0f peak bytes per call (max %d), %0.2f blocks and %0.1f bytes retained per "
+                  "call, %0.1f allocations per call" % (DRBGImpl.__name__, parameter, bits_per_request,
+                                                        result["peak_bytes"], result["max_peak_bytes"],
+                                                        retained_blocks, retained_bytes, result["allocations"]))
+            results.append(result)
+
+    if baseline_path is None:
+        return results
+
+    if update_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump({"%s %s %d" % (result["mechanism"], result["parameter"], result["bits_per_request"]):
+                       {"peak_bytes": result["peak_bytes"], "retained_blocks": result["retained_blocks"],
+                        "allocations": result["allocations"]}
+                       for result in results}, f, indent=2, sort_keys=True)
+        return results
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = 0
+    for result in results:
+        thresholds = baseline.get("%s %s %d" % (result["mechanism"], result["parameter"], result["bits_per_request"]))
+        if thresholds is None:
+            continue
+        for metric in ["peak_bytes", "retained_blocks", "allocations"]:
+            if metric not in thresholds:
+                continue
+            if result[metric] > thresholds[metric] * (1 + tolerance) + (0.5 if metric == "retained_blocks" else 0):
+                print("Regression in %s %s, %d bits: %0.2f %s per call, baseline %0.2f" %
+                      (result["mechanism"], result["parameter"], result["bits_per_request"], result[metric],
+                       metric.replace("_", " "), thresholds[metric]))
+                regressions += 1
+
+    if regressions > 0:
+        exit(1)
+    return results
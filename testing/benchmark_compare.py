@@ -0,0 +1,226 @@
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import sys
+import time
+import numpy as np
+
+from implementations.HashDRBG import HashDRBG
+from implementations.KleptoHashDRBG import KHashDRBG1, KHashDRBG2
+from helpers.DRBG_status import DRBGStatus, DRBG_status_to_string
+
+
+def collect_samples(mechanisms=None, hash_functions=None, request_sizes=None, repetitions=15, generate_requests=50):
+    """Measures repeated throughput samples of hash DRBGs and their subversions. Every repetition times a batch of
+        generate requests for each configuration in turn, so drift of the machine affects all configurations alike.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        The DRBG classes to measure, initialized with the hash function only.
+    hash_functions : list, optional
+        The hash functions to measure.
+    request_sizes : list, optional
+        The request sizes in bits to measure.
+    repetitions : int
+        The number of samples of each configuration.
+    generate_requests : int
+        The number of generate requests timed for each sample.
+
+    Returns
+    -------
+    run : dict
+        The host, time and Python version of the run, and the samples in bytes per second of each configuration,
+        indexed by a key of the mechanism, hash function and request size.
+    """
+
+    if mechanisms is None:
+        mechanisms = [HashDRBG, KHashDRBG1, KHashDRBG2]
+    if hash_functions is None:
+        hash_functions = ["SHA-256", "SHA-512", "SHA3-256"]
+    if request_sizes is None:
+        request_sizes = [512, 2**16]
+
+    configurations = []
+    for DRBGImpl in mechanisms:
+        for hash_function in hash_functions:
+            PRNG = DRBGImpl(hash_function)
+            status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                exit(1)
+            for bits_per_request in request_sizes:
+                configurations.append(("%s %s %d" % (DRBGImpl.__name__, hash_function, bits_per_request), PRNG,
+                                       state_handle, bits_per_request))
+
+    samples = dict((key, []) for key, PRNG, state_handle, bits_per_request in configurations)
+    for r in range(repetitions):
+        for key, PRNG, state_handle, bits_per_request in configurations:
+            start = time.perf_counter()
+            for b in range(generate_requests):
+                status, bits = PRNG.generate(state_handle, bits_per_request, prediction_resistance_request=False)
+                if status != DRBGStatus.SUCCESS:
+                    print(DRBG_status_to_string(status))
+                    exit(1)
+            samples[key].append(generate_requests * bits_per_request / 8 / (time.perf_counter() - start))
+
+    return {"host": socket.gethostname(), "created": time.time(), "python": platform.python_version(),
+            "repetitions": repetitions, "generate_requests": generate_requests, "samples": samples}
+
+
+def save_baseline(name, run, path="testing/benchmark_baselines.json"):
+    """Stores a run as a named baseline of its host, replacing an earlier baseline of the same name."""
+
+    baselines = dict()
+    if os.path.exists(path):
+        with open(path) as f:
+            baselines = json.load(f)
+
+    baselines.setdefault(run["host"], dict())[name] = run
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=1, sort_keys=True)
+
+
+def load_baseline(name, host=None, path="testing/benchmark_baselines.json"):
+    """Returns a named baseline of a host, the current host by default, or None if it is not stored."""
+
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baselines = json.load(f)
+    return baselines.get(host if host is not None else socket.gethostname(), dict()).get(name)
+
+
+def mann_whitney_u(x, y):
+    """Returns the Mann-Whitney U statistic of x and the two-sided p-value of the hypothesis that x and y come from
+        the same distribution, using the normal approximation with tie correction."""
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n1 = len(x)
+    n2 = len(y)
+    values = np.concatenate([x, y])
+
+    order = np.argsort(values, kind="mergesort")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(1, len(values) + 1)
+    unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inverse, weights=ranks) / counts)[inverse]
+
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - np.sum(counts ** 3 - counts) / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return u, min(1., math.erfc(max(z, 0.) / math.sqrt(2)))
+
+
+def bootstrap_ratio_interval(current, baseline, confidence=0.95, resamples=5000, seed=0):
+    """Returns a bootstrap confidence interval of the ratio of the median of the current samples to the median of
+        the baseline samples."""
+
+    rng = np.random.default_rng(seed)
+    current = np.asarray(current, dtype=np.float64)
+    baseline = np.asarray(baseline, dtype=np.float64)
+    ratios = np.median(rng.choice(current, (resamples, len(current))), axis=1) / \
+        np.median(rng.choice(baseline, (resamples, len(baseline))), axis=1)
+    return tuple(np.quantile(ratios, [(1 - confidence) / 2, (1 + confidence) / 2]))
+
+
+def compare_runs(current, baseline, threshold=0.05, alpha=0.01):
+    """Compares the samples of a run with a baseline and prints a table of the speedups. A configuration regresses
+        if the Mann-Whitney test finds a significant difference at level alpha and its median throughput is lower
+        than the baseline median by more than the threshold.
+
+    Returns
+    -------
+    results : list
+        A dictionary for each configuration in both runs with its key, the baseline and current medians, the
+        speedup and its bootstrap interval, the p-value and whether it regressed.
+    """
+
+    results = []
+    print("%-12s %-12s %8s %14s %14s %8s %19s %9s  %s" % ("Mechanism", "Hash", "Bits", "Baseline B/s", "Current B/s",
+                                                         "Speedup", "95% interval", "p-value", "Verdict"))
+    for key in sorted(set(current["samples"].keys()) & set(baseline["samples"].keys())):
+        current_samples = current["samples"][key]
+        baseline_samples = baseline["samples"][key]
+        baseline_median = float(np.median(baseline_samples))
+        current_median = float(np.median(current_samples))
+        speedup = current_median / baseline_median
+        low, high = bootstrap_ratio_interval(current_samples, baseline_samples)
+        u, p_value = mann_whitney_u(current_samples, baseline_samples)
+
+        if p_value >= alpha:
+            verdict = "unchanged"
+        elif speedup < 1 - threshold:
+            verdict = "REGRESSION"
+        elif speedup < 1:
+            verdict = "slower"
+        else:
+            verdict = "faster"
+
+        mechanism, hash_function, bits_per_request = key.split(" ")
+        print("%-12s %-12s %8s %14.0f %14.0f %7.3fx %8.3fx - %6.3fx %9.2g  %s" %
+              (mechanism, hash_function, bits_per_request, baseline_median, current_median, speedup, low, high,
+               p_value, verdict))
+        results.append({"key": key, "baseline_median": baseline_median, "current_median": current_median,
+                        "speedup": speedup, "interval": (low, high), "p_value": p_value,
+                        "regression": verdict == "REGRESSION"})
+
+    return results
+
+
+def main(argv=None):
+    """Command-line entry point running the benchmark and saving it as a baseline or comparing it with one."""
+
+    parser = argparse.ArgumentParser(description="Stores and compares baselines of the hash DRBG benchmarks.")
+    parser.add_argument("action", choices=["run", "save", "compare"],
+                        help="run the benchmark and write it to --output, save it as a baseline, or compare it with "
+                             "a baseline")
+    parser.add_argument("name", nargs="?", default="default", help="the name of the baseline (default: default)")
+    parser.add_argument("--input", help="a run written by the run action, used instead of running the benchmark")
+    parser.add_argument("--output", help="the file the run is written to")
+    parser.add_argument("--baselines", default="testing/benchmark_baselines.json",
+                        help="the baseline file (default: testing/benchmark_baselines.json)")
+    parser.add_argument("--host", help="the host of the compared baseline (default: the host of the run)")
+    parser.add_argument("--repetitions", type=int, default=15, help="the samples per configuration (default: 15)")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="the relative slowdown that fails the comparison (default: 0.05)")
+    parser.add_argument("--alpha", type=float, default=0.01, help="the significance level (default: 0.01)")
+    args = parser.parse_args(argv)
+
+    if args.input is not None:
+        with open(args.input) as f:
+            run = json.load(f)
+    else:
+        run = collect_samples(repetitions=args.repetitions)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=1, sort_keys=True)
+
+    if args.action == "save":
+        save_baseline(args.name, run, args.baselines)
+        print("Saved baseline %s of %s with %d configurations" % (args.name, run["host"], len(run["samples"])))
+    elif args.action == "compare":
+        host = args.host if args.host is not None else run["host"]
+        baseline = load_baseline(args.name, host, args.baselines)
+        if baseline is None:
+            print("No baseline %s of %s in %s" % (args.name, host, args.baselines))
+            exit(2)
+
+        results = compare_runs(run, baseline, args.threshold, args.alpha)
+        regressions = [result["key"] for result in results if result["regression"]]
+        if len(regressions) > 0:
+            print("%d regressions beyond %0.1f%%: %s" % (len(regressions), 100 * args.threshold,
+                                                         ", ".join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import math
+import random
+import timeit
+
+from helpers.general_helpers import sum_bytes, sum_bytes_multi, bytes_equal, leftmost, int_to_bytes
+
+
+def reference_sum_bytes(bytes1, bytes2, overflow=False):
+    """The byte-wise implementation of sum_bytes replaced by the integer one."""
+
+    if len(bytes2) > len(bytes1):
+        tmp = bytes1
+        bytes1 = bytes2
+        bytes2 = tmp
+    l1 = len(bytes1) - 1
+    l2 = len(bytes2) - 1
+
+    res = bytearray()
+    carry = 0
+    for i in range(len(bytes2)):
+        s = bytes1[l1 - i] + bytes2[l2 - i] + carry
+        if s > 255:
+            s -= 256
+            carry = 1
+        else:
+            carry = 0
+        res.append(s)
+
+    for i in range(len(bytes2), len(bytes1)):
+        s = bytes1[l1 - i] + carry
+        if s > 255:
+            s -= 256
+            carry = 1
+        else:
+            carry = 0
+        res.append(s)
+
+    if not overflow and carry > 0:
+        res.append(carry)
+    res.reverse()
+
+    return bytes(res)
+
+
+def reference_sum_bytes_multi(bytes_array, overflow=False):
+    """The pairwise implementation of sum_bytes_multi replaced by the integer one. With overflow, every partial sum is
+        truncated to the longest word added so far, so it differs from the modular sum of sum_bytes_multi when words
+        shorter than the longest one carry. See sum_bytes_multi."""
+
+    if len(bytes_array) < 1:
+        return None
+
+    bytes_array = list(bytes_array)
+    longest_word_ind = 0
+    for i in range(1, len(bytes_array)):
+        if bytes_array[longest_word_ind] < bytes_array[i]:
+            longest_word_ind = i
+
+    if longest_word_ind != 0:
+        tmp = bytes_array[0]
+        bytes_array[0] = bytes_array[longest_word_ind]
+        bytes_array[longest_word_ind] = tmp
+
+    res = bytes_array[0]
+    for i in range(1, len(bytes_array)):
+        res = reference_sum_bytes(res, bytes_array[i], overflow)
+
+    return res
+
+
+def modular_sum_bytes_multi(bytes_array):
+    """The sum of the words modulo 2^(8n) for the length n of the longest word, which sum_bytes_multi returns with
+        overflow."""
+
+    length = max(len(word) for word in bytes_array)
+    total = sum(int.from_bytes(word, 'big') for word in bytes_array)
+    return (total % (1 << (8 * length))).to_bytes(length, 'big')
+
+
+def reference_bytes_equal(bytes1, bytes2):
+    """The short-circuiting implementation of bytes_equal replaced by the constant-time one."""
+
+    if len(bytes1) != len(bytes2):
+        return False
+
+    for b1, b2 in zip(bytes1, bytes2):
+        if b1 != b2:
+            return False
+
+    return True
+
+
+def reference_leftmost(bytes_in, no_of_bits):
+    """The bit-by-bit implementation of leftmost replaced by slicing and masking."""
+
+    bytes_out = bytearray()
+    bytes_count = 0
+
+    while bytes_count < len(bytes_in) and (bytes_count + 1)*8 <= no_of_bits:
+        bytes_out.append(bytes_in[bytes_count])
+        bytes_count += 1
+
+    if bytes_count < len(bytes_in) and bytes_count*8 < no_of_bits:
+        bits_diff = no_of_bits - bytes_count*8
+        byte_in = bytes_in[bytes_count]
+        byte_out = 0
+        for i in range(bits_diff):
+            if byte_in >= 2**(7-i):
+                byte_out += 2**(7-i)
+                byte_in -= 2**(7-i)
+
+        bytes_out.append(byte_out)
+
+    return bytes(bytes_out)
+
+
+def reference_int_to_bytes(int_in, no_of_bytes):
+    """The division-based implementation of int_to_bytes replaced by int.to_bytes. Its float division is only exact
+        for integers below 2^53."""
+
+    res = bytearray()
+    for i in range(no_of_bytes):
+        res.append(int_in % 256)
+        int_in = math.floor(int_in / 256)
+
+    res.reverse()
+    return bytes(res)
+
+
+def random_bytes(rng, max_length=80):
+    """Returns random bytes, biased towards the edge cases of empty words and words of 0x00 and 0xff bytes."""
+
+    length = rng.choice([0, 1, rng.randint(0, max_length)])
+    kind = rng.random()
+    if kind < 0.15:
+        return bytes(length)
+    if kind < 0.3:
+        return bytes([255]) * length
+    return bytes(rng.getrandbits(8) for i in range(length))
+
+
+def check_equivalence(cases=20000, seed=0):
+    """Checks the helpers against the replaced implementations on random inputs biased towards edge cases, and
+        sum_bytes_multi with overflow against the modular sum. Returns the number of mismatches, printing the first
+        few."""
+
+    rng = random.Random(seed)
+    mismatches = []
+
+    for c in range(cases):
+        bytes1 = random_bytes(rng)
+        bytes2 = rng.choice([random_bytes(rng), bytes1, bytes1[:-1] + bytes([rng.getrandbits(8)]) if bytes1 else b''])
+        overflow = rng.random() < 0.5
+        no_of_bits = rng.randint(-8, 8 * len(bytes1) + 16)
+        int_in = rng.choice([0, rng.getrandbits(rng.randint(1, 53)), -rng.getrandbits(rng.randint(1, 53))])
+        no_of_bytes = rng.randint(0, 9)
+
+        words = [random_bytes(rng) for i in range(rng.randint(1, 5))]
+
+        checks = [("sum_bytes", (bytes1, bytes2, overflow), sum_bytes, reference_sum_bytes),
+                  ("sum_bytes_multi", (words, overflow), sum_bytes_multi,
+                   (lambda words, overflow: modular_sum_bytes_multi(words)) if overflow else reference_sum_bytes_multi),
+                  ("bytes_equal", (bytes1, bytes2), bytes_equal, reference_bytes_equal),
+                  ("leftmost", (bytes1, no_of_bits), leftmost, reference_leftmost),
+                  ("leftmost", (bytearray(bytes1), no_of_bits), leftmost, reference_leftmost),
+                  ("int_to_bytes", (int_in, no_of_bytes), int_to_bytes, reference_int_to_bytes)]
+
+        for name, arguments, function, reference in checks:
+            result = function(*arguments)
+            expected = reference(*arguments)
+            if result != expected or type(result) is not type(expected):
+                mismatches.append((name, arguments, result, expected))
+
+    for name, arguments, result, expected in mismatches[:5]:
+        print("%s%r: %r, expected %r" % (name, arguments, result, expected))
+    print("%d cases, %d mismatches" % (cases, len(mismatches)))
+    return len(mismatches)
+
+
+def benchmark_helpers(number=20000):
+    """Times the helpers against the replaced implementations on inputs of the sizes used by the DRBGs, and returns
+        the time per call in microseconds of each."""
+
+    value = bytes(range(55))
+    constant = bytes(range(100, 155))
+    digest = bytes(range(32))
+    output = bytes(range(256)) * 4
+    calls = [("sum_bytes", sum_bytes, reference_sum_bytes, (value, constant, True)),
+             ("sum_bytes_multi", sum_bytes_multi, reference_sum_bytes_multi,
+              ([value, digest, constant, (7).to_bytes(7, 'big')], True)),
+             ("bytes_equal", bytes_equal, reference_bytes_equal, (output, bytes(output))),
+             ("leftmost", leftmost, reference_leftmost, (output, 8 * len(output) - 3)),
+             ("int_to_bytes", int_to_bytes, reference_int_to_bytes, (2**19, 4))]
+
+    results = []
+    for name, function, reference, arguments in calls:
+        new = timeit.timeit(lambda: function(*arguments), number=number) / number * 1e6
+        old = timeit.timeit(lambda: reference(*arguments), number=number) / number * 1e6
+        print("%s: %0.2f us, replaced %0.2f us, %0.1fx faster" % (name, new, old, old / new))
+        results.append({"helper": name, "microseconds": new, "replaced_microseconds": old})
+
+    return results
+
+
+if __name__ == "__main__":
+    if check_equivalence() > 0:
+        exit(1)
+    benchmark_helpers()
@@ -0,0 +1,139 @@
+import json
+import math
+import os
+import platform
+import socket
+import sqlite3
+import time
+
+
+class ResultsStore:
+    def __init__(self, path="testing/results.db", timeout=60.):
+        """A SQLite store of experiment results. Every run of an experiment is recorded with its metadata, i.e. the
+            host, mechanism, hash function or cipher, seed and parameters, and its results are rows of a metric
+            measured at a number of leaked bits and extra attempts. The database is in write-ahead logging mode and
+            every call uses its own short transaction, so worker processes can append to the same store concurrently
+            through their own ResultsStore objects.
+
+        Parameters
+        ----------
+        path : str
+            The path of the database file, created if it does not exist.
+        timeout : float
+            The number of seconds a call waits for a concurrent writer to finish.
+        """
+
+        self.__path = path
+        self.__timeout = timeout
+
+        with self.__connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS RUNS (ID INTEGER PRIMARY KEY, EXPERIMENT TEXT NOT NULL, "
+                         "MECHANISM TEXT, PARAMETER TEXT, SEED TEXT, HOST TEXT, PLATFORM TEXT, PYTHON TEXT, "
+                         "STARTED REAL, PARAMETERS TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS RESULTS (RUN INTEGER NOT NULL REFERENCES RUNS(ID), "
+                         "LEAKEDBITS INTEGER, EXTRAATTEMPTS INTEGER, METRIC TEXT NOT NULL, VALUE REAL, ELAPSED REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS RESULTS_METRIC ON RESULTS (METRIC, RUN)")
+        conn.close()
+
+    def start_run(self, experiment, mechanism=None, parameter=None, seed=None, **parameters):
+        """Records the metadata of a new run of an experiment and returns its identifier. The keyword arguments are
+            stored as the parameters of the run."""
+
+        with self.__connect() as conn:
+            cursor = conn.execute("INSERT INTO RUNS (EXPERIMENT, MECHANISM, PARAMETER, SEED, HOST, PLATFORM, PYTHON, "
+                                  "STARTED, PARAMETERS) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  (experiment, mechanism, parameter, None if seed is None else str(seed),
+                                   socket.gethostname(), platform.platform(), platform.python_version(), time.time(),
+                                   json.dumps(parameters, sort_keys=True, default=str)))
+            run_id = cursor.lastrowid
+        conn.close()
+        return run_id
+
+    def add_result(self, run_id, leaked_bits, extra_attempts, metric, value, elapsed=None):
+        """Appends the value of a metric measured at a number of leaked bits and extra attempts to a run."""
+
+        self.add_results(run_id, [(leaked_bits, extra_attempts, metric, value, elapsed)])
+
+    def add_results(self, run_id, rows):
+        """Appends rows of leaked bits, extra attempts, metric, value and elapsed time to a run in one transaction."""
+
+        with self.__connect() as conn:
+            conn.executemany("INSERT INTO RESULTS (RUN, LEAKEDBITS, EXTRAATTEMPTS, METRIC, VALUE, ELAPSED) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", [(run_id,) + tuple(row) for row in rows])
+        conn.close()
+
+    def runs(self, experiment=None, mechanism=None, parameter=None):
+        """Returns the metadata of the matching runs as dictionaries, oldest first."""
+
+        conditions, arguments = self.__run_conditions(experiment, mechanism, parameter, None)
+        conn = self.__connect()
+        cursor = conn.execute("SELECT ID, EXPERIMENT, MECHANISM, PARAMETER, SEED, HOST, PLATFORM, PYTHON, STARTED, "
+                              "PARAMETERS FROM RUNS" + conditions + " ORDER BY ID", arguments)
+        runs = [{"id": row[0], "experiment": row[1], "mechanism": row[2], "parameter": row[3], "seed": row[4],
+                 "host": row[5], "platform": row[6], "python": row[7], "started": row[8],
+                 "parameters": json.loads(row[9])} for row in cursor]
+        conn.close()
+        return runs
+
+    def aggregate(self, metric, experiment=None, mechanism=None, parameter=None, run_ids=None):
+        """Aggregates a metric across the matching runs at each number of leaked bits and extra attempts.
+
+        Returns
+        -------
+        values : dict
+            The mean, standard deviation and number of values of the metric, indexed by the number of leaked bits
+            and then by the number of extra attempts.
+        """
+
+        conditions, arguments = self.__run_conditions(experiment, mechanism, parameter, run_ids)
+        conn = self.__connect()
+        cursor = conn.execute("SELECT LEAKEDBITS, EXTRAATTEMPTS, AVG(VALUE), AVG(VALUE * VALUE), COUNT(VALUE) "
+                              "FROM RESULTS WHERE METRIC = ? AND RUN IN (SELECT ID FROM RUNS" + conditions + ") "
+                              "GROUP BY LEAKEDBITS, EXTRAATTEMPTS ORDER BY LEAKEDBITS, EXTRAATTEMPTS",
+                              [metric] + arguments)
+
+        values = dict()
+        for leaked_bits, extra_attempts, mean, mean_square, count in cursor:
+            std = math.sqrt(max(0., mean_square - mean * mean) * count / (count - 1)) if count > 1 else 0.
+            values.setdefault(leaked_bits, dict())[extra_attempts] = (mean, std, count)
+        conn.close()
+        return values
+
+    def import_text_results(self, path, experiment, metric, mechanism=None, parameter=None):
+        """Imports a results file of comma-separated leaked bits, extra attempts and values, as written by earlier
+            versions of the subversion tests, as a new run. Returns its identifier."""
+
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                values = line.split(",")
+                if len(values) == 3:
+                    rows.append((int(values[0].strip()), int(values[1].strip()), metric, float(values[2].strip()),
+                                 None))
+
+        run_id = self.start_run(experiment, mechanism, parameter, source=os.path.basename(path))
+        self.add_results(run_id, rows)
+        return run_id
+
+    def __connect(self):
+        return sqlite3.connect(self.__path, timeout=self.__timeout)
+
+    @staticmethod
+    def __run_conditions(experiment, mechanism, parameter, run_ids):
+        """Returns the WHERE clause selecting the matching runs and its arguments."""
+
+        conditions = []
+        arguments = []
+        for column, value in [("EXPERIMENT", experiment), ("MECHANISM", mechanism), ("PARAMETER", parameter)]:
+            if value is not None:
+                conditions.append(column + " = ?")
+                arguments.append(value)
+        if run_ids is not None:
+            run_ids = list(run_ids)
+            conditions.append("ID IN (" + ", ".join("?" * len(run_ids)) + ")")
+            arguments += run_ids
+
+        if len(conditions) == 0:
+            return "", arguments
+        return " WHERE " + " AND ".join(conditions), arguments
@@ -0,0 +1,337 @@
+import math
+import multiprocessing
+import os
+import re
+import numpy as np
+
+from implementations.HashDRBG import HashDRBG
+from implementations.KleptoHashDRBG import KHashDRBG1, KHashDRBG2
+from helpers.DRBG_status import DRBGStatus, DRBG_status_to_string
+
+TEST_NAMES = ["frequency", "block_frequency", "runs", "longest_run", "serial_1", "serial_2", "approximate_entropy"]
+
+_LONGEST_RUN_PARAMETERS = [
+    (750000, 10000, 10, [0.0882, 0.2092, 0.2483, 0.1933, 0.1208, 0.0675, 0.0727]),
+    (6272, 128, 4, [0.1174035788, 0.242955959, 0.249363483, 0.17517706, 0.102701071, 0.112398847]),
+    (128, 8, 1, [0.21484375, 0.3671875, 0.23046875, 0.1875])
+]
+
+
+def igamc(a, x):
+    """Returns the regularized upper incomplete gamma function Q(a, x), by its series for x < a + 1 and by its
+        continued fraction otherwise."""
+
+    if x <= 0:
+        return 1.
+    log_prefactor = a * math.log(x) - x - math.lgamma(a)
+
+    if x < a + 1:
+        term = 1. / a
+        total = term
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0., 1. - total * math.exp(log_prefactor))
+
+    b = x + 1. - a
+    c = 1. / 1e-300
+    d = 1. / b
+    h = d
+    i = 1
+    while True:
+        an = -i * (i - a)
+        b += 2.
+        d = an * d + b
+        d = 1e-300 if abs(d) < 1e-300 else d
+        c = b + an / c
+        c = 1e-300 if abs(c) < 1e-300 else c
+        d = 1. / d
+        delta = d * c
+        h *= delta
+        i += 1
+        if abs(delta - 1.) < 1e-15:
+            break
+    return math.exp(log_prefactor) * h
+
+
+class BatteryAccumulator:
+    def __init__(self, n, block_frequency_m=128, serial_m=None, approximate_entropy_m=None):
+        """Accumulates the statistics of the frequency, block frequency, runs, longest run of ones, serial and
+            approximate entropy tests of SP 800-22 over a bit sequence given in consecutive chunks, so sequences
+            larger than memory can be tested. Overlapping patterns of the serial and approximate entropy tests are
+            counted cyclically, with the first bits of the sequence appended after its end.
+
+        Parameters
+        ----------
+        n : int
+            The total number of bits in the sequence. The longest run test is skipped for fewer than 128 bits.
+        block_frequency_m : int
+            The block length of the block frequency test.
+        serial_m : int, optional
+            The pattern length of the serial test. Defaults to the largest recommended length, at most 16.
+        approximate_entropy_m : int, optional
+            The pattern length of the approximate entropy test. Defaults to the largest recommended length, at most 10.
+        """
+
+        log_n = int(math.log2(n))
+        self.__n = n
+        self.__block_frequency_m = block_frequency_m
+        self.__serial_m = serial_m if serial_m is not None else max(2, min(16, log_n - 3))
+        self.__approximate_entropy_m = approximate_entropy_m if approximate_entropy_m is not None else \
+            max(1, min(10, log_n - 6))
+        self.__pattern_length = max(self.__serial_m, self.__approximate_entropy_m + 1)
+
+        self.__longest_run_m, self.__longest_run_min, self.__longest_run_pi = None, None, None
+        for min_n, m, v_min, pi in _LONGEST_RUN_PARAMETERS:
+            if n >= min_n:
+                self.__longest_run_m, self.__longest_run_min, self.__longest_run_pi = m, v_min, pi
+                break
+
+        self.__seen = 0
+        self.__ones = 0
+        self.__transitions = 0
+        self.__last_bit = None
+        self.__block_chi = 0.
+        self.__blocks = 0
+        self.__block_frequency_carry = np.zeros(0, dtype=np.uint8)
+        self.__longest_run_counts = np.zeros(len(self.__longest_run_pi or []), dtype=np.int64)
+        self.__longest_run_carry = np.zeros(0, dtype=np.uint8)
+        self.__pattern_counts = np.zeros(2**self.__pattern_length, dtype=np.int64)
+        self.__head = np.zeros(0, dtype=np.uint8)
+        self.__tail = np.zeros(0, dtype=np.uint8)
+
+    def update(self, bits):
+        """Adds the next chunk of the sequence, given as an array of 0 and 1 values."""
+
+        bits = np.asarray(bits, dtype=np.uint8)
+        if len(bits) == 0:
+            return
+        self.__seen += len(bits)
+        self.__ones += int(np.count_nonzero(bits))
+
+        self.__transitions += int(np.count_nonzero(bits[1:] != bits[:-1]))
+        if self.__last_bit is not None and self.__last_bit != bits[0]:
+            self.__transitions += 1
+        self.__last_bit = bits[-1]
+
+        blocks, self.__block_frequency_carry = self.__blocks_of(self.__block_frequency_carry, bits,
+                                                                self.__block_frequency_m)
+        if len(blocks) > 0:
+            proportions = blocks.sum(axis=1, dtype=np.int64) / self.__block_frequency_m
+            self.__block_chi += float(np.sum((proportions - 0.5) ** 2))
+            self.__blocks += len(blocks)
+
+        if self.__longest_run_m is not None:
+            blocks, self.__longest_run_carry = self.__blocks_of(self.__longest_run_carry, bits, self.__longest_run_m)
+            if len(blocks) > 0:
+                longest_runs = self.__longest_runs(blocks)
+                classes = np.clip(longest_runs - self.__longest_run_min, 0, len(self.__longest_run_pi) - 1)
+                self.__longest_run_counts += np.bincount(classes, minlength=len(self.__longest_run_pi))
+
+        if len(self.__head) < self.__pattern_length - 1:
+            self.__head = np.concatenate([self.__head, bits[:self.__pattern_length - 1 - len(self.__head)]])
+        stream = np.concatenate([self.__tail, bits])
+        if len(stream) >= self.__pattern_length:
+            self.__pattern_counts += self.__window_counts(stream)
+        self.__tail = stream[len(stream) - (self.__pattern_length - 1):] if self.__pattern_length > 1 else stream[:0]
+
+    def p_values(self):
+        """Returns the p-values of all tests once the whole sequence was added, indexed by the names in TEST_NAMES.
+            The p-value of a skipped test is None."""
+
+        if self.__seen != self.__n:
+            raise ValueError("Expected %d bits, %d were added." % (self.__n, self.__seen))
+
+        n = self.__n
+        p_values = dict()
+        s_obs = abs(2 * self.__ones - n) / math.sqrt(n)
+        p_values["frequency"] = math.erfc(s_obs / math.sqrt(2))
+
+        chi_squared = 4 * self.__block_frequency_m * self.__block_chi
+        p_values["block_frequency"] = igamc(self.__blocks / 2, chi_squared / 2)
+
+        pi = self.__ones / n
+        if abs(pi - 0.5) >= 2 / math.sqrt(n):
+            p_values["runs"] = 0.
+        else:
+            v_obs = self.__transitions + 1
+            p_values["runs"] = math.erfc(abs(v_obs - 2 * n * pi * (1 - pi)) / (2 * math.sqrt(2 * n) * pi * (1 - pi)))
+
+        if self.__longest_run_m is None:
+            p_values["longest_run"] = None
+        else:
+            blocks = int(self.__longest_run_counts.sum())
+            expected = blocks * np.array(self.__longest_run_pi)
+            chi_squared = float(np.sum((self.__longest_run_counts - expected) ** 2 / expected))
+            p_values["longest_run"] = igamc((len(self.__longest_run_pi) - 1) / 2, chi_squared / 2)
+
+        pattern_counts = self.__pattern_counts.copy()
+        wrap = np.concatenate([self.__tail, self.__head])
+        if len(wrap) >= self.__pattern_length:
+            pattern_counts += self.__window_counts(wrap)
+
+        m = self.__serial_m
+        psi = [self.__psi_squared(pattern_counts, k) for k in [m, m - 1, m - 2]]
+        p_values["serial_1"] = igamc(2 ** (m - 2), (psi[0] - psi[1]) / 2)
+        p_values["serial_2"] = igamc(2 ** (m - 3), (psi[0] - 2 * psi[1] + psi[2]) / 2)
+
+        m = self.__approximate_entropy_m
+        approximate_entropy = self.__phi(pattern_counts, m) - self.__phi(pattern_counts, m + 1)
+        chi_squared = 2 * n * (math.log(2) - approximate_entropy)
+        p_values["approximate_entropy"] = igamc(2 ** (m - 1), chi_squared / 2)
+
+        return p_values
+
+    def __blocks_of(self, carry, bits, m):
+        """Returns the complete blocks of m bits formed by the carried bits and the chunk, and the new carry."""
+
+        stream = np.concatenate([carry, bits]) if len(carry) > 0 else bits
+        no_of_blocks = len(stream) // m
+        return stream[:no_of_blocks * m].reshape(no_of_blocks, m), stream[no_of_blocks * m:].copy()
+
+    def __longest_runs(self, blocks):
+        """Returns the longest run of ones of each row of a bit matrix."""
+
+        positions = np.arange(blocks.shape[1], dtype=np.int32)
+        last_zero = np.maximum.accumulate(np.where(blocks == 0, positions, -1).astype(np.int32), axis=1)
+        return (positions - last_zero).max(axis=1)
+
+    def __window_counts(self, stream):
+        """Counts the patterns of all windows of pattern_length bits fully contained in the stream."""
+
+        windows = len(stream) - self.__pattern_length + 1
+        values = np.zeros(windows, dtype=np.uint32)
+        for j in range(self.__pattern_length):
+            values = (values << np.uint32(1)) | stream[j:j + windows]
+        return np.bincount(values, minlength=2**self.__pattern_length)
+
+    def __pattern_counts_of_length(self, pattern_counts, m):
+        """Derives the cyclic counts of m-bit patterns from the counts of the longer patterns."""
+
+        return pattern_counts.reshape(2**m, -1).sum(axis=1)
+
+    def __psi_squared(self, pattern_counts, m):
+        if m <= 0:
+            return 0.
+        counts = self.__pattern_counts_of_length(pattern_counts, m)
+        return 2**m / self.__n * float(np.sum(counts.astype(np.float64) ** 2)) - self.__n
+
+    def __phi(self, pattern_counts, m):
+        if m <= 0:
+            return 0.
+        counts = self.__pattern_counts_of_length(pattern_counts, m)
+        proportions = counts[counts > 0] / self.__n
+        return float(np.sum(proportions * np.log(proportions)))
+
+
+def test_bits(bits, **parameters):
+    """Runs the battery on a sequence given as an array or string of 0 and 1 values and returns its p-values."""
+
+    if isinstance(bits, str):
+        bits = np.frombuffer(bits.encode('ascii'), dtype=np.uint8) - ord('0')
+    accumulator = BatteryAccumulator(len(bits), **parameters)
+    accumulator.update(bits)
+    return accumulator.p_values()
+
+
+def test_file(path, chunk_bytes=10**6, **parameters):
+    """Runs the battery on a binary output file, memory-mapped and processed in chunks of chunk_bytes bytes, and
+        returns its p-values."""
+
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    accumulator = BatteryAccumulator(8 * len(data), **parameters)
+    for offset in range(0, len(data), chunk_bytes):
+        accumulator.update(np.unpackbits(data[offset:offset + chunk_bytes]))
+    return accumulator.p_values()
+
+
+def test_files(paths, processes=None, chunk_bytes=10**6):
+    """Runs the battery on several binary output files, one file per worker process.
+
+    Returns
+    -------
+    reports : list
+        The p-values of each file, in the order of the paths.
+    """
+
+    with multiprocessing.Pool(processes) as pool:
+        return pool.starmap(test_file, [(path, chunk_bytes) for path in paths])
+
+
+def write_output_file(DRBGImpl, parameter, path, total_bits, bits_per_generate=2**16):
+    """Writes total_bits bits generated by a single instantiation of the DRBG to a binary file."""
+
+    PRNG = DRBGImpl(parameter)
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status))
+        exit(1)
+
+    with open(path, "wb") as f:
+        total_bits_written = 0
+        while total_bits_written < total_bits:
+            status, bits = PRNG.generate(state_handle, min(bits_per_generate, total_bits - total_bits_written))
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                break
+            f.write(bits)
+            total_bits_written += 8 * len(bits)
+
+    PRNG.uninstantiate(state_handle)
+
+
+def compare_generators(generators=None, total_bits=10**7, output_dir="outputs",
+                       report_file="testing/statistical_report.txt", processes=None, significance=0.01):
+    """Writes an output file of each generator, runs the battery on all files in parallel and reports the p-values
+        of every test side by side. A p-value below the significance level is marked as a failure.
+
+    Parameters
+    ----------
+    generators : list, optional
+        Pairs of a DRBG class and the parameter it is initialized with, e.g. (KHashDRBG1, "SHA-256").
+    total_bits : int
+        The number of bits written for each generator. Should be a multiple of 8.
+    output_dir : str
+        The directory of the output files.
+    report_file : str
+        The path of the written report.
+    processes : int, optional
+        The number of worker processes. Defaults to the number of CPUs.
+    significance : float
+        The significance level of the tests.
+
+    Returns
+    -------
+    reports : dict
+        The p-values of each generator, indexed by its label.
+    """
+
+    if generators is None:
+        generators = [(HashDRBG, "SHA-256"), (KHashDRBG1, "SHA-256"), (KHashDRBG2, "SHA-256")]
+
+    os.makedirs(output_dir, exist_ok=True)
+    labels = [DRBGImpl.__name__ + " " + parameter for DRBGImpl, parameter in generators]
+    paths = [os.path.join(output_dir, DRBGImpl.__name__ + re.sub(r'[^a-zA-Z0-9]', '', parameter) + ".bin")
+             for DRBGImpl, parameter in generators]
+    for (DRBGImpl, parameter), path in zip(generators, paths):
+        write_output_file(DRBGImpl, parameter, path, total_bits)
+
+    reports = dict(zip(labels, test_files(paths, processes)))
+    lines = ["%-22s" % "test" + "".join(["%-24s" % label for label in labels])]
+    for test_name in TEST_NAMES:
+        line = "%-22s" % test_name
+        for label in labels:
+            p_value = reports[label][test_name]
+            if p_value is None:
+                line += "%-24s" % "-"
+            else:
+                line += "%-24s" % ("%0.6f %s" % (p_value, "PASS" if p_value >= significance else "FAIL"))
+        lines.append(line)
+
+    with open(report_file, "w") as f:
+        f.write("%d bits per generator, significance level %0.2f\n" % (total_bits, significance))
+        f.write("\n".join(lines) + "\n")
+    print("\n".join(lines))
+    return reports
@@ -0,0 +1,210 @@
+import hashlib
+import hmac
+import math
+import os
+import time
+import numpy as np
+
+from implementations.HashDRBG import HashDRBG
+from implementations.KleptoHashDRBG import KHashDRBG1
+from helpers.DRBG_status import DRBGStatus, DRBG_status_to_string
+from testing.statistical_tests import igamc
+
+
+class SubversionDetector:
+    def __init__(self, pkeys, secret_length, block_bytes=64, leaked_bits=2, secret=None):
+        """Decodes the leak positions and values of the kleptographic subversion from output blocks in bulk, for
+            each candidate key, and tests whether the output leaks a secret. Blocks can be added incrementally, so
+            the detector can follow an output stream.
+
+            With a hypothesized secret, e.g. the constant C of a hash DRBG state, the test checks whether the rate of
+            leaked values matching the secret departs from 1/2. Without one, it checks whether the leaked values are
+            consistent per secret bit position, as they are when a fixed secret is leaked, using a chi-squared test
+            on the votes for each position.
+
+        Parameters
+        ----------
+        pkeys : list
+            The candidate keys used to decode the leaked bits.
+        secret_length : int
+            The length of the leaked secret in bytes, e.g. seedlen / 8 for the constant C of a hash DRBG.
+        block_bytes : int
+            The length in bytes of each output block, i.e. of each generate request.
+        leaked_bits : int
+            The number of secret bits leaked by each block.
+        secret : bytes, optional
+            The hypothesized secret.
+        """
+
+        self.__pkeys = list(pkeys)
+        self.__secret_bits = 8 * secret_length
+        self.__block_bytes = block_bytes
+        self.__leaked_bits = leaked_bits
+        self.__secret = None
+        if secret is not None:
+            self.__secret = np.unpackbits(np.frombuffer(secret, dtype=np.uint8))
+        self.__keyed_hashes = [hmac.new(pkey, digestmod=hashlib.sha512) for pkey in self.__pkeys]
+
+        self.__blocks = 0
+        self.__hits = np.zeros(len(self.__pkeys), dtype=np.int64)
+        self.__ones = np.zeros((len(self.__pkeys), self.__secret_bits), dtype=np.int64)
+        self.__votes = np.zeros((len(self.__pkeys), self.__secret_bits), dtype=np.int64)
+        self.__file_offsets = dict()
+
+    def update(self, data):
+        """Adds the output blocks in a bytes-like object or uint8 array. Its length must be a multiple of the block
+            length."""
+
+        data = memoryview(data).cast('B')
+        no_of_blocks = len(data) // self.__block_bytes
+        if no_of_blocks == 0:
+            return
+
+        for k, keyed_hash in enumerate(self.__keyed_hashes):
+            digests = bytearray(64 * no_of_blocks)
+            for i in range(no_of_blocks):
+                h = keyed_hash.copy()
+                h.update(data[i * self.__block_bytes:(i + 1) * self.__block_bytes])
+                digests[64 * i:64 * (i + 1)] = h.digest()
+
+            positions, values = self.__decode(np.frombuffer(digests, dtype=np.uint8).reshape(no_of_blocks, 64))
+            self.__ones[k] += np.bincount(positions.ravel(), weights=values.ravel(),
+                                          minlength=self.__secret_bits).astype(np.int64)
+            self.__votes[k] += np.bincount(positions.ravel(), minlength=self.__secret_bits)
+            if self.__secret is not None:
+                self.__hits[k] += int(np.count_nonzero(self.__secret[positions] == values))
+
+        self.__blocks += no_of_blocks
+
+    def update_from_file(self, path, chunk_blocks=2**16):
+        """Adds the complete output blocks appended to a dump file since its previous call, reading the file
+            memory-mapped in chunks of chunk_blocks blocks. Returns the number of blocks added."""
+
+        offset = self.__file_offsets.get(path, 0)
+        size = os.path.getsize(path)
+        no_of_blocks = (size - offset) // self.__block_bytes
+        if no_of_blocks == 0:
+            return 0
+
+        dump = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(no_of_blocks * self.__block_bytes,))
+        chunk_bytes = chunk_blocks * self.__block_bytes
+        for start in range(0, len(dump), chunk_bytes):
+            self.update(dump[start:start + chunk_bytes])
+        del dump
+
+        self.__file_offsets[path] = offset + no_of_blocks * self.__block_bytes
+        return no_of_blocks
+
+    def report(self):
+        """Returns the test results for each candidate key.
+
+        Returns
+        -------
+        results : list
+            A dictionary for each key with the key, the number of blocks, and the chi-squared statistic and p-value
+            of the position consistency test. With a hypothesized secret, also the hit rate, its z-score and the
+            one-sided p-value of a hit rate above 1/2.
+        """
+
+        results = []
+        for k, pkey in enumerate(self.__pkeys):
+            votes = self.__votes[k]
+            voted = votes > 0
+            chi_squared = float(np.sum((2 * self.__ones[k][voted] - votes[voted]) ** 2 / votes[voted]))
+            result = {"pkey": pkey, "blocks": self.__blocks, "consistency_chi_squared": chi_squared,
+                      "consistency_p_value": igamc(np.count_nonzero(voted) / 2, chi_squared / 2)
+                      if np.count_nonzero(voted) > 0 else 1.}
+
+            if self.__secret is not None:
+                trials = self.__blocks * self.__leaked_bits
+                hit_rate = self.__hits[k] / trials if trials > 0 else 0.5
+                z = (self.__hits[k] - trials / 2) / math.sqrt(trials / 4) if trials > 0 else 0.
+                result.update({"hit_rate": hit_rate, "z": z, "p_value": 0.5 * math.erfc(z / math.sqrt(2))})
+            results.append(result)
+
+        return results
+
+    def estimated_secret(self, pkey_index=0):
+        """Returns the secret estimated by a majority vote of the leaked values at each position, using a candidate
+            key. Positions without votes are estimated as 0."""
+
+        bits = (2 * self.__ones[pkey_index] > self.__votes[pkey_index]).astype(np.uint8)
+        return np.packbits(bits).tobytes()
+
+    def __decode(self, digests):
+        """Returns the secret bit indices and the leaked values decoded from the keyed digests of the blocks, as
+            arrays with a column per leaked bit. The indices count from the most significant bit of the secret."""
+
+        lbatch_count = math.ceil(self.__leaked_bits / 8)
+        digest_bits = np.unpackbits(digests[:, :11 * lbatch_count], axis=1)
+        weights = 1 << np.arange(9, -1, -1, dtype=np.int64)
+
+        positions = []
+        values = []
+        for d in range(self.__leaked_bits):
+            b, bit = divmod(d, 8)
+            location = digest_bits[:, 88 * b + 10 * bit:88 * b + 10 * bit + 10].astype(np.int64) @ weights
+            positions.append(self.__secret_bits - 1 - location % self.__secret_bits)
+            values.append(digest_bits[:, 88 * b + 80 + bit])
+
+        return np.stack(positions, axis=1), np.stack(values, axis=1)
+
+
+def write_dump(PRNG, path, no_of_blocks, block_bytes=64):
+    """Writes no_of_blocks output blocks of a new instantiation without prediction resistance to a dump file and
+        returns its state handle and the generation rate in blocks per second."""
+
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status))
+        exit(1)
+
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        for i in range(no_of_blocks):
+            status, bits = PRNG.generate(state_handle, 8 * block_bytes)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                break
+            f.write(bits)
+    end = time.perf_counter()
+
+    return state_handle, no_of_blocks / (end - start)
+
+
+def measure_detection(parameter="SHA-256", no_of_blocks=20000, pkey=bytes([72, 68, 56, 154]), leaked_bits=2,
+                      dump_dir="testing"):
+    """Writes output dumps of an honest and a subverted hash DRBG, runs the detector over both with the subversion
+        key and a wrong key, and compares the detection rate in blocks per second with the generation rate.
+
+    Returns
+    -------
+    results : list
+        A dictionary with the generator, its generation rate, the detection rate and the detector report.
+    """
+
+    results = []
+    for PRNG in [HashDRBG(parameter), KHashDRBG1(parameter, pkey, leaked_bits=leaked_bits)]:
+        path = os.path.join(dump_dir, "tmp_dump_" + type(PRNG).__name__ + ".bin")
+        state_handle, generation_rate = write_dump(PRNG, path, no_of_blocks)
+        secret = PRNG._DRBG__load_state(state_handle).get_C()
+        PRNG.uninstantiate(state_handle)
+
+        detector = SubversionDetector([pkey, os.urandom(len(pkey))], len(secret), leaked_bits=leaked_bits,
+                                      secret=secret)
+        start = time.perf_counter()
+        detector.update_from_file(path)
+        end = time.perf_counter()
+        os.remove(path)
+
+        detection_rate = no_of_blocks / (end - start)
+        report = detector.report()
+        print("%s: generated %0.0f blocks/s, detected %0.0f blocks/s" % (type(PRNG).__name__, generation_rate,
+                                                                         detection_rate))
+        for key_name, result in zip(["subversion key", "wrong key"], report):
+            print("  %s: hit rate %0.4f, p-value %0.3g, consistency p-value %0.3g" %
+                  (key_name, result["hit_rate"], result["p_value"], result["consistency_p_value"]))
+        results.append({"generator": type(PRNG).__name__, "generation_rate": generation_rate,
+                        "detection_rate": detection_rate, "report": report})
+
+    return results
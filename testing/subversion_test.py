@@ -1,187 +1,393 @@
 import math
+import multiprocessing
 import time
-import random
 
 from Crypto.Hash import SHA512, HMAC
 import matplotlib.pyplot as plt
 
 from implementations.HashDRBG import HashDRBG
+from implementations.HMACDRBG import HMACDRBG
+from implementations.CTRDRBG import CTRDRBG
+from implementations.KleptoHashDRBG import KHashDRBG2
+from implementations.KleptoDRBG import KHMACDRBG, KCTRDRBG, leak_secret
 from helpers.DRBG_status import DRBGStatus, DRBG_status_to_string
+from helpers.entropy_source import get_entropy_source, set_entropy_source, SeededEntropySource
+from testing.results_store import ResultsStore
 
 
-def test_throughput(KHashDRBGImpl, instantiations=100, requests_per_instantiation=100,
-                    max_leaked_bits=8, max_extra_attempts=10):
-    hash_fun = "SHA-512"
-    hash_implementation = SHA512
-    seedlen = 888
+def measure_information(KPRNG, pkey, leaked_bits, instantiations, requests_per_instantiation):
+    """Counts the correctly and incorrectly leaked secret bits decoded from the output of a subverted DRBG.
+        The secret is read from the state before every request, since it changes with every reseed. See leak_secret."""
 
-    pkey = bytes([random.randrange(256) for r in range(32)])
-    fig, axes = plt.subplots(figsize=(12, 8))
-    f = open("testing/tmp_info.txt", "w")
+    lbatch_count = math.ceil(leaked_bits / 8)
+    final_lbatch_size = leaked_bits - (lbatch_count - 1) * 8
+    correct_leaks = 0
+    incorrect_leaks = 0
 
-    for leaked_bits in range(1, max_leaked_bits + 1):
-        leaked_info = []
+    for a in range(instantiations):
+        status, state_handle = KPRNG.instantiate()
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
 
-        for extra_attempts in range(max_extra_attempts + 1):
-            KHashPRNG = KHashDRBGImpl(hash_fun, pkey, extra_attempts, leaked_bits)
-            lbatch_count = math.ceil(leaked_bits / 8)
-            final_lbatch_size = leaked_bits - (lbatch_count - 1) * 8
-            correct_leaks = 0
-            incorrect_leaks = 0
-
-            for a in range(instantiations):
-                status, state_handle = KHashPRNG.instantiate()
-                if status != DRBGStatus.SUCCESS:
-                    print(DRBG_status_to_string(status))
-                    exit(1)
-                else:  # generated constant in bits
-                    secret = format(int.from_bytes(KHashPRNG._DRBG__states[state_handle].get_C(),
-                                                   "big"), "b").zfill(seedlen)
-
-                for b in range(requests_per_instantiation):
-                    status, bits = KHashPRNG.generate(state_handle, 512, prediction_resistance_request=False)
-                    if status != DRBGStatus.SUCCESS:
-                        print(DRBG_status_to_string(status))
-                        break
-
-                    decoded = HMAC.new(pkey, msg=bits, digestmod=SHA512).digest()
-
-                    for b in range(lbatch_count):
-                        lbatch = format(int.from_bytes(decoded[b * 11:(b + 1) * 11], "big"), "b").zfill(88)
-                        if b < lbatch_count - 1:
-                            lbatch_size = 8
-                        else:
-                            lbatch_size = final_lbatch_size
-
-                        for d in range(lbatch_size):
-                            d_loc = (int(lbatch[d * 10:(d + 1) * 10], 2) % seedlen) + 1
-                            d_value = lbatch[80 + d]
-
-                            if secret[-d_loc] == d_value:
-                                correct_leaks += 1
-                            else:
-                                incorrect_leaks += 1
-
-            accuracy = correct_leaks / (correct_leaks + incorrect_leaks)
-            if accuracy <= 0.9999:
-                missing_information = - accuracy * math.log2(accuracy) - (1 - accuracy) * math.log2(1 - accuracy)
-            else:
-                missing_information = 0.
-
-            gained_info = leaked_bits * (1. - missing_information)
-            print("%d bits, %d attempts: %d correct, %d incorrect, %0.4f accuracy, %0.4f information" %
-                  (leaked_bits, extra_attempts, correct_leaks, incorrect_leaks,
-                   accuracy, gained_info))
-            leaked_info.append(gained_info)
-            f.write("%d, %d, %f\n" % (leaked_bits, extra_attempts, gained_info))
+        for b in range(requests_per_instantiation):
+            secret_bytes = leak_secret(KPRNG._DRBG__states[state_handle])
+            secret = format(int.from_bytes(secret_bytes, "big"), "b").zfill(8 * len(secret_bytes))
 
-        axes.plot(list(range(max_extra_attempts + 1)), leaked_info, label=str(leaked_bits) + "BIT")
+            status, bits = KPRNG.generate(state_handle, 512, prediction_resistance_request=False)
+            if status != DRBGStatus.SUCCESS:
+                print(DRBG_status_to_string(status))
+                break
 
-    f.close()
-    plt.legend(loc="lower right")
-    plt.show()
-    fig.savefig("testing/information.png")
-    plt.close()
+            decoded = HMAC.new(pkey, msg=bits, digestmod=SHA512).digest()
+
+            for b in range(lbatch_count):
+                lbatch = format(int.from_bytes(decoded[b * 11:(b + 1) * 11], "big"), "b").zfill(88)
+                if b < lbatch_count - 1:
+                    lbatch_size = 8
+                else:
+                    lbatch_size = final_lbatch_size
+
+                for d in range(lbatch_size):
+                    d_loc = (int(lbatch[d * 10:(d + 1) * 10], 2) % len(secret)) + 1
+                    d_value = lbatch[80 + d]
+
+                    if secret[-d_loc] == d_value:
+                        correct_leaks += 1
+                    else:
+                        incorrect_leaks += 1
+
+        KPRNG.uninstantiate(state_handle)
+
+    return correct_leaks, incorrect_leaks
+
+
+def gained_information(leaked_bits, correct_leaks, incorrect_leaks):
+    """Returns the information in bits gained per request from the leak accuracy."""
 
+    accuracy = correct_leaks / (correct_leaks + incorrect_leaks)
+    if 0.0001 <= accuracy <= 0.9999:
+        missing_information = - accuracy * math.log2(accuracy) - (1 - accuracy) * math.log2(1 - accuracy)
+    else:
+        missing_information = 0.
 
-def test_speed(KHashDRBGImpl, generate_requests=10000, max_leaked_bits=8, max_extra_attempts=10):
-    hash_fun = "SHA-512"
-    hash_implementation = SHA512
+    return leaked_bits * (1. - missing_information)
 
-    HashPRNG = HashDRBG(hash_fun)
-    status, state_handle = HashPRNG.instantiate()
+
+def measure_time(PRNG, generate_requests):
+    """Returns the process time used by a number of 512-bit generate requests on a new instantiation."""
+
+    status, state_handle = PRNG.instantiate()
     if status != DRBGStatus.SUCCESS:
         print(DRBG_status_to_string(status))
         exit(1)
 
     start = time.process_time()
     for b in range(generate_requests):
-        status, bits = HashPRNG.generate(state_handle, 512, prediction_resistance_request=False)
+        status, bits = PRNG.generate(state_handle, 512, prediction_resistance_request=False)
         if status != DRBGStatus.SUCCESS:
             print(DRBG_status_to_string(status))
             break
     end = time.process_time()
-    print("Original: %0.4f seconds" % (end - start))
-    original = end - start
 
-    pkey = bytes([random.randrange(256) for r in range(32)])
-    fig, axes = plt.subplots(figsize=(12, 8))
-    f = open("testing/tmp_speed.txt", "w")
+    PRNG.uninstantiate(state_handle)
+    return end - start
 
-    for leaked_bits in range(1, max_leaked_bits + 1):
-        slowing = []
 
-        for extra_attempts in range(max_extra_attempts + 1):
-            KHashPRNG = KHashDRBGImpl(hash_fun, pkey, extra_attempts, leaked_bits)
-            status, state_handle = KHashPRNG.instantiate()
+def measure_attempt_rate(KDRBGImpl, parameter="SHA-512", extra_attempts=32, leaked_bits=16, generate_requests=200):
+    """Returns the number of candidate outputs generated and scored per second of process time by a subverted DRBG.
+        With 16 leaked bits, a candidate leaking all of them is practically never found, so every request tries all
+        extra_attempts + 1 candidates."""
+
+    KPRNG = KDRBGImpl(parameter, bytes(range(32)), extra_attempts, leaked_bits)
+    status, state_handle = KPRNG.instantiate(prediction_resistance_flag=False)
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status))
+        exit(1)
+
+    start = time.process_time()
+    for r in range(generate_requests):
+        status, bits = KPRNG.generate(state_handle, 512, prediction_resistance_request=False)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            break
+    end = time.process_time()
+
+    KPRNG.uninstantiate(state_handle)
+    return generate_requests * (extra_attempts + 1) / (end - start)
+
+
+def measure_saved_work(KDRBGImpl, parameter="SHA-512", attempt_budgets=(0, 1, 4, 16, 64), leaked_bits=2,
+                       generate_requests=200):
+    """Measures the work saved per request by finalizing the next state only for the chosen candidate, as the
+        attempt budget grows. Each skipped finalization saves a hash of the value and the three additions of the
+        state update.
+
+    Returns
+    -------
+    results : list
+        A dictionary for each number of extra attempts with the candidates generated, hashes and additions saved
+        per request, and the number of requests per second of process time.
+    """
+
+    results = []
+    for extra_attempts in attempt_budgets:
+        KPRNG = KDRBGImpl(parameter, bytes(range(32)), extra_attempts, leaked_bits)
+        status, state_handle = KPRNG.instantiate(prediction_resistance_flag=False)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+
+        start = time.process_time()
+        for r in range(generate_requests):
+            status, bits = KPRNG.generate(state_handle, 512, prediction_resistance_request=False)
             if status != DRBGStatus.SUCCESS:
                 print(DRBG_status_to_string(status))
-                exit(1)
-
-            start = time.process_time()
-            for b in range(generate_requests):
-                status, bits = KHashPRNG.generate(state_handle, 512, prediction_resistance_request=False)
-                if status != DRBGStatus.SUCCESS:
-                    print(DRBG_status_to_string(status))
-                    break
-            end = time.process_time()
-
-            slowdown = (end - start) / original - 1.
-            print("%d bits, %d attempts: %0.4f seconds, %0.4f slower" % (leaked_bits, extra_attempts,
-                                                                         end - start, slowdown))
-            slowing.append(slowdown)
-            f.write("%d, %d, %f\n" % (leaked_bits, extra_attempts, slowdown))
+                break
+        end = time.process_time()
+        KPRNG.uninstantiate(state_handle)
+
+        candidates, finalizations_saved = KPRNG.get_candidate_statistics()
+        result = {"extra_attempts": extra_attempts, "candidates": candidates / generate_requests,
+                  "hashes_saved": finalizations_saved / generate_requests,
+                  "additions_saved": 3 * finalizations_saved / generate_requests,
+                  "requests_per_second": generate_requests / (end - start)}
+        print("%s, %d extra attempts: %0.2f candidates, %0.2f hashes and %0.2f additions saved per request, "
+              "%0.0f requests/s" % (KDRBGImpl.__name__, extra_attempts, result["candidates"], result["hashes_saved"],
+                                    result["additions_saved"], result["requests_per_second"]))
+        results.append(result)
+
+    return results
+
+
+def cell_seed(seed, leaked_bits, extra_attempts):
+    """Returns the seed of the entropy source for one configuration of a seeded run, so every configuration can be
+        reproduced on its own, whichever worker measures it."""
+
+    return ("%s/%d/%d" % (seed, leaked_bits, extra_attempts)).encode()
+
+
+def information_worker(KDRBGImpl, parameter, pkey, leaked_bits, extra_attempts, instantiations,
+                       requests_per_instantiation, results_path, run_id, seed):
+    """Measures the information leaked in one configuration and appends it to the results store."""
+
+    previous_source = get_entropy_source()
+    if seed is not None:
+        set_entropy_source(SeededEntropySource(cell_seed(seed, leaked_bits, extra_attempts)))
+    try:
+        start = time.process_time()
+        KPRNG = KDRBGImpl(parameter, pkey, extra_attempts, leaked_bits)
+        correct_leaks, incorrect_leaks = measure_information(KPRNG, pkey, leaked_bits, instantiations,
+                                                             requests_per_instantiation)
+        elapsed = time.process_time() - start
+        accuracy = correct_leaks / (correct_leaks + incorrect_leaks)
+        gained_info = gained_information(leaked_bits, correct_leaks, incorrect_leaks)
+
+        print("%d bits, %d attempts: %d correct, %d incorrect, %0.4f accuracy, %0.4f information" %
+              (leaked_bits, extra_attempts, correct_leaks, incorrect_leaks, accuracy, gained_info))
+        ResultsStore(results_path).add_results(run_id, [(leaked_bits, extra_attempts, "correct", correct_leaks,
+                                                         elapsed),
+                                                        (leaked_bits, extra_attempts, "incorrect", incorrect_leaks,
+                                                         elapsed),
+                                                        (leaked_bits, extra_attempts, "information", gained_info,
+                                                         elapsed)])
+    finally:
+        set_entropy_source(previous_source)
+
+
+def test_throughput(KDRBGImpl, instantiations=100, requests_per_instantiation=100, max_leaked_bits=8,
+                    max_extra_attempts=10, parameter="SHA-512", results_path="testing/results.db", seed=None,
+                    workers=1):
+    """Measures the information leaked by a subverted DRBG for each number of leaked bits and extra attempts, records
+        it as a run in the results store and plots it. With more than one worker, the configurations are measured
+        by a pool of processes appending to the store concurrently. With a seed, the subversion key and the
+        entropy of every configuration are derived from it. Returns the identifier of the run."""
+
+    previous_source = get_entropy_source()
+    if seed is not None:
+        set_entropy_source(SeededEntropySource(seed))
+    try:
+        status, pkey = get_entropy_source().get_bytes(32)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+
+        run_id = ResultsStore(results_path).start_run("information", KDRBGImpl.__name__, parameter, seed,
+                                                      instantiations=instantiations,
+                                                      requests_per_instantiation=requests_per_instantiation,
+                                                      max_leaked_bits=max_leaked_bits,
+                                                      max_extra_attempts=max_extra_attempts, workers=workers)
+        configurations = [(KDRBGImpl, parameter, pkey, leaked_bits, extra_attempts, instantiations,
+                           requests_per_instantiation, results_path, run_id, seed)
+                          for leaked_bits in range(1, max_leaked_bits + 1)
+                          for extra_attempts in range(max_extra_attempts + 1)]
+
+        if workers > 1:
+            with multiprocessing.Pool(workers) as pool:
+                pool.starmap(information_worker, configurations)
+        else:
+            for configuration in configurations:
+                information_worker(*configuration)
+
+        plot_information(results_path, run_ids=[run_id])
+        return run_id
+    finally:
+        set_entropy_source(previous_source)
+
+
+def test_speed(KDRBGImpl, generate_requests=10000, max_leaked_bits=8, max_extra_attempts=10,
+               DRBGImpl=HashDRBG, parameter="SHA-512", results_path="testing/results.db", seed=None):
+    """Measures the slowdown of a subverted DRBG against the original for each number of leaked bits and extra
+        attempts, records it as a run in the results store and plots it. Returns the identifier of the run."""
+
+    previous_source = get_entropy_source()
+    if seed is not None:
+        set_entropy_source(SeededEntropySource(seed))
+    try:
+        original = measure_time(DRBGImpl(parameter), generate_requests)
+        print("Original: %0.4f seconds" % original)
+
+        status, pkey = get_entropy_source().get_bytes(32)
+        if status != DRBGStatus.SUCCESS:
+            print(DRBG_status_to_string(status))
+            exit(1)
+
+        store = ResultsStore(results_path)
+        run_id = store.start_run("speed", KDRBGImpl.__name__, parameter, seed, original=DRBGImpl.__name__,
+                                 generate_requests=generate_requests, max_leaked_bits=max_leaked_bits,
+                                 max_extra_attempts=max_extra_attempts)
+        store.add_result(run_id, None, None, "original", original, original)
+
+        for leaked_bits in range(1, max_leaked_bits + 1):
+            for extra_attempts in range(max_extra_attempts + 1):
+                if seed is not None:
+                    set_entropy_source(SeededEntropySource(cell_seed(seed, leaked_bits, extra_attempts)))
+                elapsed = measure_time(KDRBGImpl(parameter, pkey, extra_attempts, leaked_bits), generate_requests)
+                slowdown = elapsed / original - 1.
+                print("%d bits, %d attempts: %0.4f seconds, %0.4f slower" % (leaked_bits, extra_attempts,
+                                                                             elapsed, slowdown))
+                store.add_result(run_id, leaked_bits, extra_attempts, "slowdown", slowdown, elapsed)
+
+        plot_speed(results_path, run_ids=[run_id])
+        return run_id
+    finally:
+        set_entropy_source(previous_source)
+
+
+def plot_metric(values, path):
+    """Plots the mean of a metric aggregated by the results store against the extra attempts, with a line for each
+        number of leaked bits, and saves the plot."""
 
-        axes.plot(list(range(max_extra_attempts + 1)), slowing, label=str(leaked_bits) + "BIT")
+    fig, axes = plt.subplots(figsize=(12, 8))
+    for leaked_bits in sorted(lb for lb in values.keys() if lb is not None):
+        ea_values = sorted(values[leaked_bits].keys())
+        axes.plot(ea_values, [values[leaked_bits][ea][0] for ea in ea_values], label=str(leaked_bits) + "BIT")
 
-    f.close()
     plt.legend(loc="lower right")
     plt.show()
-    fig.savefig("testing/speed.png")
+    fig.savefig(path)
     plt.close()
 
 
-def plot_efficiency():
-    """WARNING: Should only be called after both tests are completed"""
-    info = dict()
-    speed = dict()
+def plot_information(results_path="testing/results.db", mechanism=None, parameter=None, run_ids=None,
+                     path="testing/information.png"):
+    """Plots the information leaked per request, averaged over the matching stored runs."""
 
-    with open("testing/tmp_info.txt", encoding="utf-8") as f:
-        for line in f:
-            values = line.split(",")
-            leaked_bits = int(values[0].strip())
-            extra_attempts = int(values[1].strip())
-            gained_info = float(values[2].strip())
+    plot_metric(ResultsStore(results_path).aggregate("information", "information", mechanism, parameter, run_ids),
+                path)
 
-            if leaked_bits not in info.keys():
-                info[leaked_bits] = dict()
-            info[leaked_bits][extra_attempts] = gained_info
 
-    with open("testing/tmp_speed.txt", encoding="utf-8") as f:
-        for line in f:
-            values = line.split(",")
-            leaked_bits = int(values[0].strip())
-            extra_attempts = int(values[1].strip())
-            slowdown = float(values[2].strip())
+def plot_speed(results_path="testing/results.db", mechanism=None, parameter=None, run_ids=None,
+               path="testing/speed.png"):
+    """Plots the slowdown of the subversion, averaged over the matching stored runs."""
 
-            if leaked_bits not in speed.keys():
-                speed[leaked_bits] = dict()
-            speed[leaked_bits][extra_attempts] = slowdown
+    plot_metric(ResultsStore(results_path).aggregate("slowdown", "speed", mechanism, parameter, run_ids), path)
 
-    fig, axes = plt.subplots(figsize=(12, 8))
 
-    for leaked_bits in [lb for lb in info.keys() if lb in speed.keys()]:
-        ea_values = sorted([ea for ea in info[leaked_bits].keys() if ea in speed[leaked_bits].keys()])
+def plot_efficiency(results_path="testing/results.db", mechanism=None, parameter=None, information_runs=None,
+                    speed_runs=None, path="testing/efficiency.png"):
+    """Plots the information leaked per unit of slowdown, from the information and speed results averaged over the
+        matching stored runs. Configurations measured by only one of the experiments are reported and skipped."""
+
+    store = ResultsStore(results_path)
+    info = store.aggregate("information", "information", mechanism, parameter, information_runs)
+    speed = store.aggregate("slowdown", "speed", mechanism, parameter, speed_runs)
+
+    info_grid = set((lb, ea) for lb in info.keys() for ea in info[lb].keys())
+    speed_grid = set((lb, ea) for lb in speed.keys() if lb is not None for ea in speed[lb].keys())
+    for name, missing in [("speed", info_grid - speed_grid), ("information", speed_grid - info_grid)]:
+        if len(missing) > 0:
+            print("No %s results for %d configurations, e.g. %d bits, %d attempts" % ((name, len(missing)) +
+                                                                                      min(missing)))
+
+    efficiency = dict()
+    for leaked_bits, extra_attempts in info_grid & speed_grid:
+        slowdown = speed[leaked_bits][extra_attempts][0]
+        gained_info = info[leaked_bits][extra_attempts][0]
+        efficiency.setdefault(leaked_bits, dict())[extra_attempts] = (gained_info / slowdown if slowdown > 0 else 0.,
+                                                                      0., 1)
+
+    plot_metric(efficiency, path)
+
+
+def compare_mechanisms(mechanisms=None, leaked_bits=2, max_extra_attempts=10, generate_requests=1000,
+                       instantiations=10, requests_per_instantiation=100):
+    """Compares the slowdown, leaked information and efficiency of the subversion across DRBG mechanisms.
+
+    Parameters
+    ----------
+    mechanisms : list, optional
+        Triples of a subverted DRBG class, the original DRBG class and the parameter both are initialized with.
+    leaked_bits : int
+        The number of secret bits leaked by each generated output.
+    max_extra_attempts : int
+        The highest number of extra attempts measured.
+    generate_requests : int
+        The number of generate requests timed for each configuration.
+    instantiations : int
+        The number of instantiations used to measure the leaked information.
+    requests_per_instantiation : int
+        The number of generate requests per instantiation used to measure the leaked information.
+    """
+
+    if mechanisms is None:
+        mechanisms = [(KHashDRBG2, HashDRBG, "SHA-512"), (KHMACDRBG, HMACDRBG, "SHA-512"),
+                      (KCTRDRBG, CTRDRBG, "AES-256")]
+
+    status, pkey = get_entropy_source().get_bytes(32)
+    if status != DRBGStatus.SUCCESS:
+        print(DRBG_status_to_string(status))
+        exit(1)
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+
+    for KDRBGImpl, DRBGImpl, parameter in mechanisms:
+        original = measure_time(DRBGImpl(parameter), generate_requests)
+        label = KDRBGImpl.__name__ + " " + parameter
+        slowing = []
+        leaked_info = []
         efficiencies = []
-        for ea in ea_values:
-            if speed[leaked_bits][ea] > 0:
-                efficiencies.append(info[leaked_bits][ea] / speed[leaked_bits][ea])
-            else:
-                efficiencies.append(0.)
 
-        axes.plot(ea_values, efficiencies, label=str(leaked_bits) + "BIT")
+        for extra_attempts in range(max_extra_attempts + 1):
+            KPRNG = KDRBGImpl(parameter, pkey, extra_attempts, leaked_bits)
+            slowdown = measure_time(KPRNG, generate_requests) / original - 1.
+            correct_leaks, incorrect_leaks = measure_information(KPRNG, pkey, leaked_bits, instantiations,
+                                                                 requests_per_instantiation)
+            gained_info = gained_information(leaked_bits, correct_leaks, incorrect_leaks)
 
-    plt.legend(loc="lower right")
+            print("%s, %d attempts: %0.4f slower, %0.4f information" % (label, extra_attempts, slowdown, gained_info))
+            slowing.append(slowdown)
+            leaked_info.append(gained_info)
+            efficiencies.append(gained_info / slowdown if slowdown > 0 else 0.)
+
+        attempts = list(range(max_extra_attempts + 1))
+        axes[0].plot(attempts, slowing, label=label)
+        axes[1].plot(attempts, leaked_info, label=label)
+        axes[2].plot(attempts, efficiencies, label=label)
+
+    axes[0].set_title("Slowdown")
+    axes[1].set_title("Information")
+    axes[2].set_title("Efficiency")
+    axes[2].legend(loc="lower right")
     plt.show()
-    fig.savefig("testing/efficiency.png")
+    fig.savefig("testing/mechanisms.png")
     plt.close()
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from helpers.DRBG_status import DRBGStatus
+from helpers.async_drbg import AsyncDRBG
+from implementations.HashDRBG import HashDRBG
+
+
+def count_generate_calls(PRNG):
+    calls = []
+    generate = PRNG.generate
+
+    def counting_generate(*args, **kwargs):
+        calls.append(args)
+        return generate(*args, **kwargs)
+
+    PRNG.generate = counting_generate
+    return calls
+
+
+async def generate_concurrently(drbg, state_handle, n, prediction_resistance_request=None):
+    return await asyncio.gather(*[drbg.generate(state_handle, 128, prediction_resistance_request=
+                                                prediction_resistance_request) for i in range(n)])
+
+
+@pytest.mark.parametrize("prediction_resistance_request", [None, False])
+def test_requests_without_prediction_resistance_are_coalesced(prediction_resistance_request):
+    PRNG = HashDRBG("SHA-256")
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+    assert status == DRBGStatus.SUCCESS
+    calls = count_generate_calls(PRNG)
+
+    results = asyncio.run(generate_concurrently(AsyncDRBG(PRNG), state_handle, 8, prediction_resistance_request))
+    assert all(status == DRBGStatus.SUCCESS for status, bits in results)
+    assert len({bits for status, bits in results}) == 8
+    assert len(calls) < 8
+
+
+def test_default_requests_on_prediction_resistant_state_are_not_coalesced():
+    PRNG = HashDRBG("SHA-256")
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=True)
+    assert status == DRBGStatus.SUCCESS
+    calls = count_generate_calls(PRNG)
+
+    results = asyncio.run(generate_concurrently(AsyncDRBG(PRNG), state_handle, 8))
+    assert all(status == DRBGStatus.SUCCESS for status, bits in results)
+    assert len(calls) == 8
+
+
+def test_default_request_on_unknown_state_fails():
+    PRNG = HashDRBG("SHA-256")
+    status, bits = asyncio.run(AsyncDRBG(PRNG).generate(2**40, 128))
+    assert status == DRBGStatus.ERROR_FLAG and bits is None
@@ -0,0 +1,22 @@
+import sys
+
+from testing.benchmark import count_allocations
+
+
+def concatenate(n):
+    for i in range(n):
+        b = bytes(16) + bytes(i % 8)
+        del b
+
+
+def test_count_allocations_counts_freed_temporaries():
+    few = count_allocations(concatenate, 100)
+    many = count_allocations(concatenate, 1000)
+    assert many - few >= 900
+    assert count_allocations(concatenate, 1000) == many
+
+
+def test_count_allocations_restores_tracing():
+    trace, profile = sys.gettrace(), sys.getprofile()
+    count_allocations(concatenate, 10)
+    assert sys.gettrace() is trace and sys.getprofile() is profile
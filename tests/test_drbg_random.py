@@ -0,0 +1,21 @@
+import pytest
+
+from helpers.DRBG_status import DRBGStatus
+from helpers.drbg_random import DRBGRandom
+from implementations.HashDRBG import HashDRBG
+
+
+@pytest.mark.parametrize("reservoir_bits", [0, 1, 7])
+def test_reservoir_smaller_than_a_byte_is_rejected(reservoir_bits):
+    PRNG = HashDRBG("SHA-256")
+    status, state_handle = PRNG.instantiate()
+    assert status == DRBGStatus.SUCCESS
+    with pytest.raises(ValueError):
+        DRBGRandom(PRNG, state_handle, reservoir_bits=reservoir_bits)
+
+
+def test_single_byte_reservoir_serves_larger_draws():
+    PRNG = HashDRBG("SHA-256")
+    status, state_handle = PRNG.instantiate()
+    assert status == DRBGStatus.SUCCESS
+    assert len(DRBGRandom(PRNG, state_handle, reservoir_bits=8).randbytes(20)) == 20
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from helpers.general_helpers import sum_bytes, sum_bytes_multi, bytes_equal, leftmost, int_to_bytes
+from testing.general_helpers_check import reference_sum_bytes, reference_sum_bytes_multi, reference_bytes_equal, \
+    reference_leftmost, reference_int_to_bytes, modular_sum_bytes_multi, random_bytes
+
+SEEDS = range(4)
+CASES = 2000
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_sum_bytes_matches_reference(seed):
+    rng = random.Random(seed)
+    for c in range(CASES):
+        bytes1 = random_bytes(rng)
+        bytes2 = random_bytes(rng)
+        for overflow in [False, True]:
+            assert sum_bytes(bytes1, bytes2, overflow) == reference_sum_bytes(bytes1, bytes2, overflow)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_sum_bytes_multi_matches_reference_without_overflow(seed):
+    rng = random.Random(seed)
+    for c in range(CASES):
+        words = [random_bytes(rng) for i in range(rng.randint(1, 5))]
+        assert sum_bytes_multi(words) == reference_sum_bytes_multi(words)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_sum_bytes_multi_with_overflow_is_the_modular_sum(seed):
+    rng = random.Random(seed)
+    for c in range(CASES):
+        words = [random_bytes(rng) for i in range(rng.randint(1, 5))]
+        result = sum_bytes_multi(words, True)
+        assert result == modular_sum_bytes_multi(words)
+        assert len(result) == max(len(word) for word in words)
+
+        if rng.random() < 0.5:
+            words[0] = bytes([255]) * max(len(word) for word in words)
+            assert sum_bytes_multi(words, True) == reference_sum_bytes_multi(words, True)
+
+
+def test_sum_bytes_multi_keeps_carries_of_short_words():
+    words = [b'\xff', b'\x01', b'\x00\x00']
+    assert sum_bytes_multi(words, True) == b'\x01\x00'
+    assert reference_sum_bytes_multi(words, True) == b'\x00\x00'
+
+
+def test_sum_bytes_multi_does_not_reorder_its_arguments():
+    words = [b'\x01', b'\xff\xff', b'\x02']
+    sum_bytes_multi(words, True)
+    assert words == [b'\x01', b'\xff\xff', b'\x02']
+    assert sum_bytes_multi([]) is None
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bytes_equal_matches_reference(seed):
+    rng = random.Random(seed)
+    for c in range(CASES):
+        bytes1 = random_bytes(rng)
+        bytes2 = rng.choice([random_bytes(rng), bytes1, bytearray(bytes1),
+                             bytes1[:-1] + bytes([rng.getrandbits(8)]) if bytes1 else b''])
+        assert bytes_equal(bytes1, bytes2) == reference_bytes_equal(bytes1, bytes2)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_leftmost_matches_reference(seed):
+    rng = random.Random(seed)
+    for c in range(CASES):
+        bytes_in = random_bytes(rng)
+        no_of_bits = rng.randint(-8, 8 * len(bytes_in) + 16)
+        for argument in [bytes_in, bytearray(bytes_in)]:
+            result = leftmost(argument, no_of_bits)
+            assert result == reference_leftmost(argument, no_of_bits)
+            assert type(result) is bytes
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_int_to_bytes_matches_reference(seed):
+    rng = random.Random(seed)
+    for c in range(CASES):
+        no_of_bytes = rng.randint(0, 9)
+        int_in = rng.choice([0, rng.getrandbits(rng.randint(1, 53)), -rng.getrandbits(rng.randint(1, 53))])
+        assert int_to_bytes(int_in, no_of_bytes) == reference_int_to_bytes(int_in, no_of_bytes)
+
+        large_int = rng.getrandbits(rng.randint(54, 200))
+        assert int_to_bytes(large_int, no_of_bytes) == (large_int % 2**(8 * no_of_bytes)).to_bytes(no_of_bytes, 'big')
@@ -0,0 +1,33 @@
+import pytest
+
+from helpers.DRBG_status import DRBGStatus
+from implementations.KleptoDRBG import KHMACDRBG, KCTRDRBG, leak_secret
+from testing.subversion_test import measure_information
+
+PKEY = bytes(range(16))
+
+
+@pytest.mark.parametrize("KDRBGImpl, parameter", [(KHMACDRBG, "SHA-256"), (KCTRDRBG, "AES-128")])
+def test_leaked_secret_is_fixed_between_reseeds(KDRBGImpl, parameter):
+    K = KDRBGImpl(parameter, PKEY, 4, 2)
+    assert not K.has_catastrophic_error()
+    status, state_handle = K.instantiate(prediction_resistance_flag=False)
+    secret = leak_secret(K._DRBG__states[state_handle])
+
+    for i in range(3):
+        assert K.generate(state_handle, 256)[0] == DRBGStatus.SUCCESS
+    assert K._DRBG__states[state_handle].get_Key() != secret
+    assert leak_secret(K._DRBG__states[state_handle]) == secret
+
+    assert K.reseed(state_handle) == DRBGStatus.SUCCESS
+    assert leak_secret(K._DRBG__states[state_handle]) != secret
+    K.uninstantiate(state_handle)
+
+
+@pytest.mark.parametrize("KDRBGImpl, parameter", [(KHMACDRBG, "SHA-256"), (KCTRDRBG, "AES-128")])
+def test_known_answer_tests_run_on_the_honest_algorithm(KDRBGImpl, parameter):
+    K = KDRBGImpl(parameter, PKEY, 4, 2)
+    assert K.test_generate() == DRBGStatus.SUCCESS
+
+    correct_leaks, incorrect_leaks = measure_information(K, PKEY, 2, 2, 20)
+    assert correct_leaks > 3 * incorrect_leaks
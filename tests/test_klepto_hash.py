@@ -0,0 +1,55 @@
+import multiprocessing
+
+from helpers.DRBG_status import DRBGStatus
+from implementations.KleptoHashDRBG import KHashDRBG2
+
+
+def test_khash2_keeps_the_constant_across_generate_reseeds():
+    K = KHashDRBG2("SHA-256", extra_attempts=2)
+    K._reseed_interval = 2
+    status, state_handle = K.instantiate(prediction_resistance_flag=False)
+    constant = K._DRBG__states[state_handle].get_C()
+
+    for i in range(5):
+        assert K.generate(state_handle, 256)[0] == DRBGStatus.SUCCESS
+    assert K._DRBG__states[state_handle].get_C() == constant
+    assert K._DRBG__states[state_handle].reseed_counter == 2
+    K.uninstantiate(state_handle)
+
+
+def test_khash2_serves_requests_from_the_output_buffer():
+    K = KHashDRBG2("SHA-256", extra_attempts=2)
+    status, state_handle = K.instantiate(prediction_resistance_flag=False)
+    assert K.enable_buffer(state_handle, 2**12) == DRBGStatus.SUCCESS
+
+    outputs = [K.generate(state_handle, 256)[1] for i in range(4)]
+    assert len(set(outputs)) == 4
+    assert K._DRBG__states[state_handle].reseed_counter == 2
+    K.uninstantiate(state_handle)
+
+
+_shared_generator = None
+
+
+def attach_shared(attach_arguments):
+    global _shared_generator
+    _shared_generator = KHashDRBG2("SHA-256", extra_attempts=2)
+    _shared_generator.use_shared_state_store(attach_arguments=attach_arguments)
+
+
+def generate_shared(state_handle, requests):
+    return [_shared_generator.generate(state_handle, 256)[1] for i in range(requests)]
+
+
+def test_khash2_locks_shared_states_across_processes():
+    K = KHashDRBG2("SHA-256", extra_attempts=2)
+    state_store = K.use_shared_state_store(capacity=2)
+    status, state_handle = K.instantiate(prediction_resistance_flag=False)
+
+    with multiprocessing.get_context("fork").Pool(4, attach_shared, (state_store.get_attach_arguments(),)) as pool:
+        results = pool.starmap(generate_shared, [(state_handle, 25)] * 4)
+    outputs = [output for result in results for output in result]
+
+    assert len(set(outputs)) == 100
+    assert state_store[state_handle].reseed_counter == 101
+    state_store.close()
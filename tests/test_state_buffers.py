@@ -0,0 +1,57 @@
+import gc
+
+from helpers.DRBG_status import DRBGStatus
+from implementations.HashDRBG import HashDRBG
+
+
+def instantiate_mapped(path):
+    PRNG = HashDRBG("SHA-256")
+    state_store = PRNG.use_mapped_state_store(str(path), 4)
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+    assert status == DRBGStatus.SUCCESS
+    return PRNG, state_store, state_handle
+
+
+def test_buffers_are_scoped_to_the_state_table(tmp_path):
+    A, store_a, handle_a = instantiate_mapped(tmp_path / "a.bin")
+    B, store_b, handle_b = instantiate_mapped(tmp_path / "b.bin")
+    assert handle_a == handle_b
+
+    assert A.enable_buffer(handle_a, 2**12) == DRBGStatus.SUCCESS
+    status, output_a = A.generate(handle_a, 256)
+    assert status == DRBGStatus.SUCCESS
+
+    reseed_counter = store_b[handle_b].reseed_counter
+    status, output_b = B.generate(handle_b, 256)
+    assert status == DRBGStatus.SUCCESS
+    assert output_b != output_a
+    assert store_b[handle_b].reseed_counter == reseed_counter + 1
+
+    assert B.flush_buffer(handle_b) == DRBGStatus.ERROR_FLAG
+    assert A.flush_buffer(handle_a) == DRBGStatus.SUCCESS
+    store_a.close()
+    store_b.close()
+
+
+def test_set_state_store_discards_buffered_output(tmp_path):
+    A, store_a, handle_a = instantiate_mapped(tmp_path / "a.bin")
+    A.enable_buffer(handle_a, 2**12)
+    A.generate(handle_a, 256)
+    output_buffer = A._DRBG__table_buffers()[handle_a]
+    assert output_buffer.available() > 0
+
+    A.use_mapped_state_store(str(tmp_path / "b.bin"), 4)
+    assert output_buffer.available() == 0
+    store_a.close()
+
+
+def test_buffers_of_collected_stores_are_dropped(tmp_path):
+    A, store_a, handle_a = instantiate_mapped(tmp_path / "a.bin")
+    A.enable_buffer(handle_a, 2**12)
+    table_id = id(store_a)
+    assert table_id in HashDRBG._DRBG__buffers
+
+    store_a.close()
+    del A, store_a
+    gc.collect()
+    assert table_id not in HashDRBG._DRBG__buffers
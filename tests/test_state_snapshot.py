@@ -0,0 +1,49 @@
+from helpers.DRBG_status import DRBGStatus
+from implementations.HashDRBG import HashDRBG
+
+KEY = b"snapshot key"
+
+
+def instantiate(hash_function):
+    PRNG = HashDRBG(hash_function)
+    status, state_handle = PRNG.instantiate(prediction_resistance_flag=False)
+    assert status == DRBGStatus.SUCCESS
+    return PRNG, state_handle
+
+
+def test_save_states_only_saves_states_of_the_instance(tmp_path):
+    A, handle_a = instantiate("SHA-256")
+    B, handle_b = instantiate("SHA3-256")
+    C, handle_c = instantiate("SHA-256")
+
+    assert A.save_states(str(tmp_path / "a.snapshot"), KEY) == DRBGStatus.SUCCESS
+    assert B.generate(handle_b, 256)[0] == DRBGStatus.SUCCESS
+    assert C.generate(handle_c, 256)[0] == DRBGStatus.SUCCESS
+    assert A.generate(handle_a, 256)[0] == DRBGStatus.ERROR_FLAG
+
+    assert A.save_states(str(tmp_path / "b.snapshot"), KEY, [handle_b]) == DRBGStatus.ERROR_FLAG
+    assert B.generate(handle_b, 256)[0] == DRBGStatus.SUCCESS
+
+    status, state_handles = A.restore_states(str(tmp_path / "a.snapshot"), KEY)
+    assert status == DRBGStatus.SUCCESS and len(state_handles) == 1
+    for PRNG, state_handle in [(A, state_handles[0]), (B, handle_b), (C, handle_c)]:
+        assert PRNG.uninstantiate(state_handle) == DRBGStatus.SUCCESS
+
+
+def test_restored_snapshot_is_refused_by_later_processes(tmp_path):
+    from helpers import state_snapshot
+
+    A, handle_a = instantiate("SHA-256")
+    path = str(tmp_path / "a.snapshot")
+    assert A.save_states(path, KEY) == DRBGStatus.SUCCESS
+    with open(path, "rb") as f:
+        snapshot = f.read()
+
+    status, state_handles = A.restore_states(path, KEY)
+    assert status == DRBGStatus.SUCCESS
+    with open(path, "wb") as f:
+        f.write(snapshot)
+
+    state_snapshot._consumed_snapshots.clear()
+    assert A.restore_states(path, KEY) == (DRBGStatus.ERROR_FLAG, None)
+    assert A.uninstantiate(state_handles[0]) == DRBGStatus.SUCCESS